@@ -1,50 +1,172 @@
 # Explanation: Main Flask application with routes and features.
-from flask import Flask, render_template, redirect, url_for, request, session, flash
+import atexit
+import sys
+import time
+import os
+from datetime import datetime, timedelta
+import click
+from flask import (Flask, Response, g, render_template, redirect, url_for, request, session, flash, jsonify,
+                   make_response, send_from_directory, stream_with_context)
 from flask_migrate import Migrate
 from flask_wtf import CSRFProtect
-from config import Config
-from python.models import db, User, CommunityReport, Resource, EmergencyPlan, SafetyCheck, Article
+from sqlalchemy import or_
+from sqlalchemy.orm import contains_eager, joinedload
+from config import config_by_name
+from python.models import db, User, CommunityReport, ReportCluster, Resource, EmergencyPlan, SafetyCheck, Article
 from python.forms import RegisterForm, LoginForm, ReportForm, ResourceForm, PlanForm, SafetyForm
 from python.utils import login_required, admin_required
+from python.sessions import current_user, user_sessions
+from python.queryplan import history_queries, plan_problems
+from python import dashboard
+from python.dashboard import dashboard_cache, get_dashboard_summary, invalidate_dashboard
+from python.pagination import keyset_paginate
+from python import metrics, querycount, sqlite
+from python.ingest import ingest_reports, iter_json_array, iter_ndjson
+from python.writebehind import WriteBehindQueue, QueueFull
+from python.spatial import nearby_resources
+from python.search import search_articles, search_reports, rebuild_search_index
+from python.events import admin_events
+from python.pagecache import page_cache
+from python.offline import offline_bundle
+from python.passwords import passwords, HasherBusy, TooManyAttempts
+from python.admission import admission
+from python.ratelimit import rate_limiter
+from python.archive import archiver, backfill_history_rollups
+from python import moderation
+from python.clustering import cluster_reports, report_clusters
+from python.rollups import REPORT_DIMENSIONS, situation_report
+from python.dataimport import import_data
+from python.export import EXPORTS, FORMATS, export_filename, iter_export
+from python.safetystatus import ATTENTION_STATUSES, attention_roster, reconcile_safety_status, roster_order, status_counts
 
 app = Flask(__name__)
-app.config.from_object(Config)
+app.config.from_object(config_by_name[os.environ.get("APP_CONFIG", "default")])
 
 # Explanation: Initialize extensions.
 db.init_app(app)
+sqlite.init_app(app, db)
+archiver.init_app(app, db)  # before any connection is opened, so every one attaches the archive
 migrate = Migrate(app, db)  # optional migration support
 csrf = CSRFProtect(app)
+dashboard.init_app(app)
+querycount.init_app(app)
+metrics.init_app(app, current_user)
+nearby_resources.init_app(app)
+admin_events.init_app(app)
+page_cache.init_app(app)
+offline_bundle.init_app(app)
+passwords.init_app(app)
+atexit.register(passwords.shutdown)
+report_clusters.init_app(app)
+user_sessions.init_app(app)
+# Explanation: Load shedding runs before the rate limits, so a shed request spends no tokens.
+admission.init_app(app, db)
+rate_limiter.init_app(app)
+
+# Explanation: Optional write-behind mode for safety check-ins (WRITE_BEHIND_ENABLED).
+safety_queue = WriteBehindQueue(SafetyCheck, "safety")
+safety_queue.init_app(app)
+atexit.register(safety_queue.stop)
+atexit.register(archiver.stop)
+admission.watch(safety_queue)
+
+def _invalidate_checked_in_users(rows):
+    for user_id in {row["user_id"] for row in rows}:
+        invalidate_dashboard(user_id)
+
+def _publish_check_ins(rows):
+    for row in rows:
+        admin_events.publish("safety.created", _safety_event(row))
+
+safety_queue.on_commit.append(_invalidate_checked_in_users)
+safety_queue.on_commit.append(_publish_check_ins)
+
+# Explanation: Payloads pushed to admins over /admin/stream.
+def _report_event(report):
+    return dict(id=report.id, user_id=report.user_id, disaster_type=report.disaster_type, location=report.location,
+                status=report.status, verified_by_admin_id=report.verified_by_admin_id, created_at=report.created_at,
+                cluster_id=report.cluster_id)
+
+def _safety_event(entry):
+    # Accepts a SafetyCheck or a write-behind row dict (which has no id yet).
+    get = entry.get if isinstance(entry, dict) else lambda key: getattr(entry, key)
+    return dict(id=get("id"), user_id=get("user_id"), status=get("status"), created_at=get("created_at"))
+
+@app.context_processor
+def inject_current_user():
+    # Explanation: Navigation follows the stored role (cached identity), not the session's copy.
+    return dict(current_user=current_user)
+
+@app.before_request
+def start_background_writers():
+    # Explanation: Starts the writer (and replays any crashed worker's journal) and the scheduled
+    # archive job once per process.
+    safety_queue.start()
+    archiver.start()
 
 # --------------------------------
 # Index & Home
 # --------------------------------
 @app.route("/")
+@page_cache.cached("articles", "resources")
 def index():
     # Explanation: Landing page showing highlights and public resources/articles.
     latest_articles = Article.query.order_by(Article.published_at.desc()).limit(3).all()
     latest_resources = Resource.query.order_by(Resource.updated_at.desc()).limit(5).all()
     return render_template("index.html", articles=latest_articles, resources=latest_resources)
 
+@app.route("/sw.js")
+def service_worker():
+    # Explanation: Offline service worker, served from the site root so it can control every page.
+    response = send_from_directory(os.path.join(app.static_folder, "js"), "offline-sw.js",
+                                   mimetype="application/javascript", max_age=0)
+    response.cache_control.no_cache = True
+    return response
+
 @app.route("/home")
 @login_required
 def home():
     # Explanation: User dashboard showing recent reports, safety status, and plan snippet.
-    user = User.query.get(session["user_id"])
-    reports = CommunityReport.query.filter_by(user_id=user.id).order_by(CommunityReport.created_at.desc()).limit(5).all()
-    safety = SafetyCheck.query.filter_by(user_id=user.id).order_by(SafetyCheck.created_at.desc()).first()
-    plan = EmergencyPlan.query.filter_by(user_id=user.id).order_by(EmergencyPlan.created_at.desc()).first()
-    return render_template("home.html", user=user, reports=reports, safety=safety, plan=plan)
+    # Explanation: Served from the per-user summary cache; rebuilt with a single query on a miss.
+    summary = get_dashboard_summary(session["user_id"])
+    if summary is None:
+        session.clear()
+        flash("Please log in to access this page.")
+        return redirect(url_for("login"))
+    return render_template("home.html", user=summary.user, reports=summary.reports,
+                           safety=summary.safety, plan=summary.plan)
 
 # --------------------------------
 # Authentication
 # --------------------------------
+def _check_login_password(user, email, raw_password):
+    # Explanation: Hashing runs in the password pool; each client IP and email gets a few concurrent
+    # checks at most. A hash upgraded to the current PASSWORD_HASH_METHOD is saved here.
+    with passwords.limit(request.remote_addr, email):
+        valid = user.check_password(raw_password)
+    if valid and db.session.is_modified(user):
+        db.session.commit()
+    return valid
+
+def _login_busy(template, form, exc):
+    # Explanation: Overloaded hasher -> 503, one client's parallel attempts -> 429; both ask to retry.
+    flash("Sign-in is very busy right now. Please try again in a few seconds.")
+    response = make_response(render_template(template, form=form), 429 if isinstance(exc, TooManyAttempts) else 503)
+    response.headers["Retry-After"] = str(app.config["PASSWORD_RETRY_AFTER"])
+    return response
+
 @app.route("/login", methods=["GET", "POST"])
 def login():
     form = LoginForm()
     # Explanation: Authenticate user and set session.
     if form.validate_on_submit():
-        user = User.query.filter_by(email=form.email.data.lower().strip()).first()
-        if user and user.check_password(form.password.data):
+        email = form.email.data.lower().strip()
+        user = User.query.filter_by(email=email).first()
+        try:
+            valid = user is not None and _check_login_password(user, email, form.password.data)
+        except (HasherBusy, TooManyAttempts) as exc:
+            return _login_busy("login.html", form, exc)
+        if valid:
             session["user_id"] = user.id
             session["role"] = user.role
             flash("Logged in successfully.")
@@ -67,7 +189,10 @@ def register():
             address=form.address.data.strip() if form.address.data else None,
             role="user",
         )
-        user.set_password(form.password.data)
+        try:
+            user.set_password(form.password.data)
+        except HasherBusy as exc:
+            return _login_busy("register.html", form, exc)
         db.session.add(user)
         db.session.commit()
         flash("Registration successful. Please log in.")
@@ -97,8 +222,13 @@ def adminlogin():
     form = LoginForm()
     # Explanation: Admin login using existing User accounts with 'admin' role.
     if form.validate_on_submit():
-        admin = User.query.filter_by(email=form.email.data.lower().strip(), role="admin").first()
-        if admin and admin.check_password(form.password.data):
+        email = form.email.data.lower().strip()
+        admin = User.query.filter_by(email=email, role="admin").first()
+        try:
+            valid = admin is not None and _check_login_password(admin, email, form.password.data)
+        except (HasherBusy, TooManyAttempts) as exc:
+            return _login_busy("adminlogin.html", form, exc)
+        if valid:
             session["user_id"] = admin.id
             session["role"] = "admin"
             flash("Admin login successful.")
@@ -109,9 +239,19 @@ def adminlogin():
 @app.route("/admin_dashboard")
 @admin_required
 def admin_dashboard():
-    recent_reports = CommunityReport.query.order_by(CommunityReport.created_at.desc()).limit(10).all()
+    # Explanation: Relationships rendered per row are eager-loaded so the page runs a fixed number of queries.
+    # Near-duplicates collapse into one row per incident: only a cluster's latest report is listed.
+    recent_reports = (CommunityReport.query
+                      .outerjoin(ReportCluster, ReportCluster.id == CommunityReport.cluster_id)
+                      .filter(or_(ReportCluster.id.is_(None), ReportCluster.latest_report_id == CommunityReport.id))
+                      .options(contains_eager(CommunityReport.cluster), joinedload(CommunityReport.user),
+                               joinedload(CommunityReport.verified_by_admin))
+                      .order_by(CommunityReport.created_at.desc()).limit(10).all())
     recent_users = User.query.order_by(User.created_at.desc()).limit(10).all()
-    recent_safety = SafetyCheck.query.order_by(SafetyCheck.created_at.desc()).limit(10).all()
+    q = request.args.get("q", "").strip()
+    report_results = search_reports(q, limit=app.config["SEARCH_LIMIT"]) if q else None
+    recent_safety = (SafetyCheck.query.options(joinedload(SafetyCheck.user))
+                     .order_by(SafetyCheck.created_at.desc()).limit(10).all())
     resources = Resource.query.order_by(Resource.updated_at.desc()).limit(10).all()
     form = ResourceForm()   # <-- add this
     return render_template("admin_dashboard.html",
@@ -119,17 +259,144 @@ def admin_dashboard():
                            recent_users=recent_users,
                            recent_safety=recent_safety,
                            resources=resources,
+                           q=q,
+                           report_results=report_results,
                            form=form)   # <-- pass it
 
+@app.route("/admin/users/<int:user_id>/sessions/revoke", methods=["POST"])
+@admin_required
+def revoke_user_sessions(user_id):
+    # Explanation: Log a user out everywhere; their next request, in any worker, is anonymous.
+    user = User.query.get_or_404(user_id)
+    removed = user_sessions.revoke(user.id)
+    flash(f"Signed {user.full_name} out of {removed} session(s).")
+    return redirect(url_for("admin_dashboard"))
+
+@app.route("/admin/roster")
+@admin_required
+def admin_roster():
+    # Explanation: Everyone whose latest check-in is Missing or Needs Help, read from current_safety_status.
+    status = request.args.get("status")
+    statuses = (status,) if status in ATTENTION_STATUSES else ATTENTION_STATUSES
+    roster = keyset_paginate(attention_roster(statuses), roster_order())
+    return render_template("admin_roster.html", roster=roster, counts=status_counts(),
+                           statuses=ATTENTION_STATUSES, status=status if status in ATTENTION_STATUSES else None)
+
+@app.route("/admin/cache/stats")
+@admin_required
+def admin_cache_stats():
+    # Explanation: Hit/miss counters for the dashboard summary cache, the public page cache and the
+    # session identity cache (this worker), plus session store counts.
+    return jsonify(dashboard=dashboard_cache.stats(), pages=page_cache.stats(), sessions=user_sessions.stats())
+
+@app.route("/admin/queue/stats")
+@admin_required
+def admin_queue_stats():
+    # Explanation: Write-behind queue depth, throughput and commit latency; event, password pool and
+    # report clustering counters; rate limiting and load shedding state; archive partitions and last run.
+    return jsonify(safety=safety_queue.stats(), events=admin_events.stats(), passwords=passwords.stats(),
+                   clusters=report_clusters.stats(), rate_limits=rate_limiter.stats(), admission=admission.stats(),
+                   archive=archiver.stats())
+
+@app.route("/admin/stats")
+@admin_required
+def admin_stats():
+    # Explanation: Situation-report counts answered from the rollup tables, e.g.
+    # /admin/stats?disaster_type=Flood&status=pending&area=Alitagtag&minutes=60
+    # Optional: since/until (ISO), group_by=disaster_type,status,area and interval=minute|hour.
+    try:
+        until = datetime.fromisoformat(request.args["until"]) if request.args.get("until") else datetime.utcnow()
+        if request.args.get("since"):
+            since = datetime.fromisoformat(request.args["since"])
+        else:
+            since = until - timedelta(minutes=int(request.args.get("minutes", 60)))
+    except ValueError:
+        return jsonify(error="since/until must be ISO datetimes and minutes an integer."), 400
+    group_by = [d for d in request.args.get("group_by", ",".join(REPORT_DIMENSIONS)).split(",") if d]
+    interval = request.args.get("interval") or None
+    if set(group_by) - set(REPORT_DIMENSIONS) or interval not in (None, "minute", "hour") or since >= until:
+        return jsonify(error=f"group_by must be within {', '.join(REPORT_DIMENSIONS)}, interval minute or hour, "
+                             "and since before until."), 400
+    filters = {name: request.args.get(name) for name in REPORT_DIMENSIONS + ("safety_status",)}
+    return jsonify(situation_report(since, until, group_by, interval, **filters))
+
+@app.route("/admin/export/<name>.<fmt>")
+@admin_required
+def admin_export(name, fmt):
+    # Explanation: Stream a table as CSV or NDJSON, e.g. /admin/export/community_report.csv?since=2025-12-01&gzip=1
+    # Rows are read in EXPORT_CHUNK_SIZE batches from one cursor, so memory stays flat for any table size.
+    if name not in EXPORTS or fmt not in FORMATS:
+        return jsonify(error=f"Tables: {', '.join(EXPORTS)}; formats: {', '.join(FORMATS)}."), 404
+    try:
+        since = datetime.fromisoformat(request.args["since"]) if request.args.get("since") else None
+        until = datetime.fromisoformat(request.args["until"]) if request.args.get("until") else None
+    except ValueError:
+        return jsonify(error="since/until must be ISO datetimes."), 400
+    compress = request.args.get("gzip") in ("1", "true", "yes")
+    chunks = iter_export(name, fmt, since, until, compress, app.config["EXPORT_CHUNK_SIZE"])
+    filename = export_filename(name, fmt, compress)
+    return Response(stream_with_context(chunks), mimetype="application/gzip" if compress else FORMATS[fmt],
+                    headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+@app.route("/admin/metrics")
+def admin_metrics():
+    # Explanation: Prometheus text exposition of this worker's metrics (METRICS_ENABLED=1). An admin user,
+    # or "Authorization: Bearer <METRICS_TOKEN>" for scrapers.
+    if not metrics.enabled():
+        return jsonify(error="Metrics are disabled. Set METRICS_ENABLED=1."), 404
+    if not metrics.metrics_authorized(app):
+        return jsonify(error="Admin access required."), 403
+    return Response(metrics.render_metrics(), mimetype="text/plain; version=0.0.4")
+
+@app.route("/admin/profiles/<name>")
+@admin_required
+def admin_profile(name):
+    # Explanation: Top functions of a request profiled with the X-Profile header (see its X-Profile-Id response header).
+    report = metrics.profile_report(app, name)
+    if report is None:
+        return jsonify(error="Unknown profile."), 404
+    return Response(report, mimetype="text/plain")
+
+@app.route("/admin/stream")
+@admin_required
+def admin_stream():
+    # Explanation: Server-sent events feed of new reports, status changes and check-ins.
+    # EventSource reconnects with Last-Event-ID and is replayed from the in-process ring buffer.
+    last_event_id = request.headers.get("Last-Event-ID", type=int)
+    if last_event_id is None:
+        last_event_id = request.args.get("last_event_id", type=int)
+    stream = admin_events.stream(last_event_id, heartbeat=app.config["SSE_HEARTBEAT_SECONDS"])
+    return Response(stream, mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 # --------------------------------
 # Educational Hub
 # --------------------------------
 @app.route("/educationalhub")
+@page_cache.cached("articles")
 def educationalhub():
     # Explanation: List of educational articles, guides, and contingency plans.
-    articles = Article.query.order_by(Article.published_at.desc()).all()
+    q = request.args.get("q", "").strip()
+    if q:
+        return render_template("educationalhub.html", q=q, results=search_articles(q, limit=app.config["SEARCH_LIMIT"]))
+    articles = keyset_paginate(Article.query, [Article.published_at.desc(), Article.id.desc()])
     return render_template("educationalhub.html", articles=articles)
 
+@app.route("/api/search/articles")
+def api_search_articles():
+    # Explanation: Ranked (bm25) article search with highlighted snippets; "word*" or a trailing word matches prefixes.
+    limit = max(1, min(request.args.get("limit", app.config["SEARCH_LIMIT"], type=int), 100))
+    results = search_articles(request.args.get("q", ""), limit=limit)
+    return jsonify(results=[dict(r, snippet=str(r["snippet"])) for r in results])
+
+@app.route("/api/search/reports")
+@admin_required
+def api_search_reports():
+    # Explanation: Ranked report search over location and description, optionally filtered by status.
+    limit = max(1, min(request.args.get("limit", app.config["SEARCH_LIMIT"], type=int), 100))
+    results = search_reports(request.args.get("q", ""), limit=limit, status=request.args.get("status") or None)
+    return jsonify(results=[dict(r, snippet=str(r["snippet"])) for r in results])
+
 # --------------------------------
 # Community Reporting
 # --------------------------------
@@ -147,13 +414,41 @@ def communityreport():
             status="pending"
         )
         db.session.add(report)
+        db.session.flush()
+        # Explanation: Grouped with near-duplicates of the same incident in the same transaction.
+        report_clusters.assign([report])
         db.session.commit()
+        invalidate_dashboard(report.user_id)
+        admin_events.publish("report.created", _report_event(report))
         flash("Report submitted.")
         return redirect(url_for("communityreport"))
     # Explanation: Show user's reports.
-    my_reports = CommunityReport.query.filter_by(user_id=session["user_id"]).order_by(CommunityReport.created_at.desc()).all()
+    my_reports = keyset_paginate(CommunityReport.latest_for_user(session["user_id"]), CommunityReport.history_order())
     return render_template("communityreport.html", form=form, my_reports=my_reports)
 
+@app.route("/api/reports/bulk", methods=["POST"])
+@login_required
+def bulk_reports():
+    # Explanation: Bulk sync of offline reports. Accepts a JSON array or NDJSON (application/x-ndjson),
+    # streamed and validated with ReportForm's rules, inserted in one transaction per chunk.
+    # Send the CSRF token in the X-CSRFToken header. Retries are safe when each record carries a
+    # "client_ref" (unique per user): already stored ones come back as "duplicate" with their id.
+    # A body that breaks off part way returns 207 with the per-record results so far plus "error";
+    # the reports listed as created are stored.
+    if request.mimetype in ("application/x-ndjson", "application/jsonl"):
+        records = iter_ndjson(request.stream)
+    elif request.mimetype == "application/json":
+        records = iter_json_array(request.stream)
+    else:
+        return jsonify(error="Send application/json or application/x-ndjson."), 415
+    summary = ingest_reports(records, session["user_id"], batch_size=app.config["INGEST_BATCH_SIZE"])
+    if "error" in summary and not summary["results"]:
+        return jsonify(error=summary["error"]), 400
+    invalidate_dashboard(session["user_id"])
+    if summary["created"]:
+        admin_events.publish("report.bulk_created", dict(user_id=session["user_id"], count=summary["created"]))
+    return jsonify(summary), 200 if not summary["rejected"] and "error" not in summary else 207
+
 # Explanation: Admin actions on reports (verify/resolve).
 @app.route("/admin/reports/<int:report_id>/verify", methods=["POST"])
 @admin_required
@@ -162,6 +457,8 @@ def verify_report(report_id):
     report.status = "verified"
     report.verified_by_admin_id = session["user_id"]
     db.session.commit()
+    invalidate_dashboard(report.user_id)
+    admin_events.publish("report.status", _report_event(report))
     flash("Report verified.")
     return redirect(url_for("admin_dashboard"))
 
@@ -171,18 +468,101 @@ def resolve_report(report_id):
     report = CommunityReport.query.get_or_404(report_id)
     report.status = "resolved"
     db.session.commit()
+    invalidate_dashboard(report.user_id)
+    admin_events.publish("report.status", _report_event(report))
     flash("Report marked as resolved.")
     return redirect(url_for("admin_dashboard"))
 
+def _moderation_request():
+    # Explanation: (action, ids, filters) from a JSON body {"action", "ids"} / {"action", "filter"}
+    # or from the dashboard form (action, report_id checkboxes and filter fields).
+    if request.is_json:
+        body = request.get_json(silent=True)
+        if not isinstance(body, dict):
+            raise ValueError("Send a JSON object.")
+        action, ids, filters = body.get("action"), body.get("ids"), body.get("filter") or {}
+        if not isinstance(filters, dict):
+            raise ValueError("filter must be an object.")
+    else:
+        action, ids = request.form.get("action"), request.form.getlist("report_id") or None
+        filters = {name: request.form.get(name) for name in moderation.FILTERS}
+    if action not in moderation.ACTIONS:
+        raise ValueError(f"action must be one of {', '.join(moderation.ACTIONS)}.")
+    if ids is not None:
+        if not isinstance(ids, list) or not ids:
+            raise ValueError("ids must be a non-empty list of report ids.")
+        try:
+            ids = sorted({int(report_id) for report_id in ids})
+        except (TypeError, ValueError):
+            raise ValueError("ids must be integers.")
+    filters = {name: str(value).strip() for name, value in filters.items()
+               if name in moderation.FILTERS and isinstance(value, (str, int)) and str(value).strip()}
+    if filters.get("status") not in (None,) + moderation.STATUSES:
+        raise ValueError(f"status must be one of {', '.join(moderation.STATUSES)}.")
+    for name in ("since", "until"):
+        if name in filters:
+            try:
+                filters[name] = datetime.fromisoformat(filters[name])
+            except ValueError:
+                raise ValueError("since/until must be ISO datetimes.")
+    if "cluster_id" in filters:
+        try:
+            filters["cluster_id"] = int(filters["cluster_id"])
+        except ValueError:
+            raise ValueError("cluster_id must be an integer.")
+    if ids is None and not filters:
+        # Never moderate every report by accident.
+        raise ValueError("Select reports or give at least one filter.")
+    return action, ids, filters
+
+@app.route("/admin/reports/bulk", methods=["POST"])
+@admin_required
+def bulk_moderate_reports():
+    # Explanation: Verify/resolve many reports in one transaction with one set-based UPDATE per
+    # MODERATION_BATCH_SIZE ids, e.g. {"action": "verify", "filter": {"disaster_type": "Flood",
+    # "area": "Alitagtag", "status": "pending", "since": "2025-12-01T00:00"}}. Publishes one event.
+    wants_json = request.is_json
+    try:
+        action, ids, filters = _moderation_request()
+    except ValueError as exc:
+        if wants_json:
+            return jsonify(error=str(exc)), 400
+        flash(str(exc))
+        return redirect(url_for("admin_dashboard"))
+    summary = moderation.moderate_reports(action, session["user_id"], ids,
+                                          batch_size=app.config["MODERATION_BATCH_SIZE"], **filters)
+    for user_id in summary.pop("user_ids"):
+        invalidate_dashboard(user_id)
+    if summary["updated"]:
+        admin_events.publish("report.bulk_status", dict(status=summary["status"], count=summary["updated"],
+                                                        admin_id=session["user_id"]))
+    if wants_json:
+        return jsonify(summary)
+    flash(f"{summary['updated']} report(s) marked {summary['status']} ({summary['skipped']} already were).")
+    return redirect(url_for("admin_dashboard"))
+
 # --------------------------------
 # Resource Directory
 # --------------------------------
 @app.route("/resourcedirectory", methods=["GET"])
+@page_cache.cached("resources")
 def resourcedirectory():
     # Explanation: Public view of resources.
-    resources = Resource.query.order_by(Resource.category.asc()).all()
+    resources = keyset_paginate(Resource.query, [Resource.category.asc(), Resource.id.asc()])
     return render_template("resourcedirectory.html", resources=resources)
 
+@app.route("/resources/nearby")
+def resources_nearby():
+    # Explanation: Nearest k resources to a point, e.g. /resources/nearby?lat=13.87&lon=121.0&category=Evacuation+Center
+    lat = request.args.get("lat", type=float)
+    lon = request.args.get("lon", type=float)
+    k = request.args.get("k", 5, type=int)
+    if lat is None or lon is None or not -90 <= lat <= 90 or not -180 <= lon <= 180:
+        return jsonify(error="lat and lon are required (degrees)."), 400
+    k = max(1, min(k, app.config["NEARBY_MAX_K"]))
+    category = request.args.get("category") or None
+    return jsonify(results=nearby_resources.nearest(lat, lon, k=k, category=category))
+
 @app.route("/admin/resources", methods=["GET", "POST"])
 @admin_required
 def admin_resources():
@@ -199,9 +579,11 @@ def admin_resources():
         )
         db.session.add(resource)
         db.session.commit()
+        nearby_resources.invalidate()
+        offline_bundle.schedule_rebuild()
         flash("Resource added.")
         return redirect(url_for("admin_resources"))
-    resources = Resource.query.order_by(Resource.updated_at.desc()).all()
+    resources = keyset_paginate(Resource.query, [Resource.updated_at.desc(), Resource.id.desc()])
     return render_template("resourcedirectory.html", resources=resources, form=form, admin=True)
 
 # --------------------------------
@@ -223,9 +605,10 @@ def emergencyplangenerator():
         )
         db.session.add(plan)
         db.session.commit()
+        invalidate_dashboard(plan.user_id)
         flash("Emergency plan saved.")
         return redirect(url_for("emergencyplangenerator"))
-    plans = EmergencyPlan.query.filter_by(user_id=session["user_id"]).order_by(EmergencyPlan.created_at.desc()).all()
+    plans = keyset_paginate(EmergencyPlan.latest_for_user(session["user_id"]), EmergencyPlan.history_order())
     return render_template("emergencyplangenerator.html", form=form, plans=plans)
 
 # --------------------------------
@@ -234,16 +617,19 @@ def emergencyplangenerator():
 @app.route("/personalinformation", methods=["GET", "POST"])
 @login_required
 def personalinformation():
-    # Explanation: Simple profile view/update for user details.
-    user = User.query.get_or_404(session["user_id"])
+    # Explanation: Simple profile view/update for user details. Viewing uses the identity loaded by
+    # login_required; only an update loads the row.
     if request.method == "POST":
+        user = User.query.get_or_404(session["user_id"])
         user.full_name = request.form.get("full_name") or user.full_name
         user.phone = request.form.get("phone") or user.phone
         user.address = request.form.get("address") or user.address
         db.session.commit()
+        invalidate_dashboard(user.id)
+        user_sessions.user_changed(user.id)
         flash("Profile updated.")
         return redirect(url_for("personalinformation"))
-    return render_template("personalinformation.html", user=user)
+    return render_template("personalinformation.html", user=g.user)
 
 # --------------------------------
 # Safety Check-in
@@ -254,12 +640,27 @@ def safetycheck():
     form = SafetyForm()
     # Explanation: Log safety status entry for the current user.
     if form.validate_on_submit():
+        if safety_queue.enabled:
+            # Explanation: Acknowledge immediately; the background writer group-commits the entry.
+            try:
+                safety_queue.submit(dict(user_id=session["user_id"], status=form.status.data,
+                                         note=form.note.data, created_at=datetime.utcnow()))
+            except QueueFull:
+                flash("Check-ins are very busy right now. Please try again in a few seconds.")
+                history = keyset_paginate(SafetyCheck.latest_for_user(session["user_id"]), SafetyCheck.history_order())
+                response = make_response(render_template("safetycheck.html", form=form, history=history), 503)
+                response.headers["Retry-After"] = str(app.config["WRITE_BEHIND_RETRY_AFTER"])
+                return response
+            flash("Safety status received.")
+            return redirect(url_for("safetycheck"))
         entry = SafetyCheck(user_id=session["user_id"], status=form.status.data, note=form.note.data)
         db.session.add(entry)
         db.session.commit()
+        invalidate_dashboard(entry.user_id)
+        admin_events.publish("safety.created", _safety_event(entry))
         flash("Safety status updated.")
         return redirect(url_for("safetycheck"))
-    history = SafetyCheck.query.filter_by(user_id=session["user_id"]).order_by(SafetyCheck.created_at.desc()).all()
+    history = keyset_paginate(SafetyCheck.latest_for_user(session["user_id"]), SafetyCheck.history_order())
     return render_template("safetycheck.html", form=form, history=history)
 
 # --------------------------------
@@ -286,6 +687,7 @@ def admin_add_article():
     )
     db.session.add(article)
     db.session.commit()
+    offline_bundle.schedule_rebuild()
 
     flash("Article added successfully.")
     return redirect(url_for("admin_dashboard"))
@@ -310,6 +712,147 @@ def init_db():
         db.session.commit()
         print("Database initialized with admin and sample articles.")
 
+@app.cli.command("search-rebuild")
+def search_rebuild():
+    # Explanation: Rebuild the FTS5 search indexes from the article and community_report tables.
+    with app.app_context():
+        rebuild_search_index()
+        print("Search indexes rebuilt.")
+
+@app.cli.command("rollup-backfill")
+def rollup_backfill():
+    # Explanation: Rebuild the situation-report rollups from the report and safety history
+    # (archive partitions included, so archived rows keep their counts).
+    with app.app_context():
+        counts = backfill_history_rollups()
+        print(f"Rollups rebuilt: {counts['report_rollup']} report and {counts['safety_rollup']} safety counters.")
+
+@app.cli.command("safety-status-reconcile")
+def safety_status_reconcile():
+    # Explanation: Rebuild current_safety_status (latest check-in per user) from safety_check history.
+    with app.app_context():
+        result = reconcile_safety_status()
+        print(f"current_safety_status rebuilt for {result['users']} users ({result['drifted']} rows had drifted).")
+
+@app.cli.command("cluster-reports")
+@click.option("--hours", type=float, default=None, help="How far back to look (default: the clustering window).")
+def cluster_reports_command(hours):
+    # Explanation: Group unclustered reports (older data, imports) into incidents and drop empty clusters.
+    with app.app_context():
+        if hours is None:
+            hours = app.config["REPORT_CLUSTER_WINDOW_MINUTES"] / 60
+        result = cluster_reports(hours)
+        print(f"{result['assigned']} reports clustered; {result['empty_clusters_removed']} empty clusters removed.")
+
+@app.cli.command("archive")
+@click.option("--report-days", type=int, default=None, help="Archive resolved reports older than this (default: ARCHIVE_REPORT_DAYS).")
+@click.option("--safety-days", type=int, default=None, help="Archive check-ins older than this (default: ARCHIVE_SAFETY_DAYS).")
+@click.option("--batch-size", type=int, default=None, help="Rows moved per transaction (default: ARCHIVE_BATCH_SIZE).")
+@click.option("--dry-run", is_flag=True, help="Only count the rows that would move.")
+def archive_command(report_days, safety_days, batch_size, dry_run):
+    # Explanation: Move old resolved reports and safety check-ins into the monthly archive partitions
+    # (also run every ARCHIVE_INTERVAL_MINUTES when set). Exports and history_query() still see them.
+    with app.app_context():
+        try:
+            result = archiver.run(report_days, safety_days, batch_size, dry_run)
+        except RuntimeError as exc:
+            raise click.ClickException(str(exc))
+        verb = "would be archived" if dry_run else "archived"
+        print(f"{result['community_report']} reports and {result['safety_check']} safety check-ins {verb}"
+              + (f"; {result['report_clusters']} empty incidents removed." if not dry_run else "."))
+
+@app.cli.command("sessions-revoke")
+@click.argument("email", required=False)
+@click.option("--all", "revoke_all", is_flag=True, help="Sign every user out.")
+def sessions_revoke(email, revoke_all):
+    # Explanation: Kill a user's server-side sessions (or everyone's), effective on their next request.
+    with app.app_context():
+        if revoke_all:
+            print(f"{user_sessions.revoke_all()} sessions revoked.")
+            return
+        user = User.query.filter_by(email=(email or "").lower().strip()).first()
+        if user is None:
+            sys.exit("No such user (give an email, or --all).")
+        print(f"{user_sessions.revoke(user.id)} sessions revoked for {user.email}.")
+
+@app.cli.command("sessions-purge")
+def sessions_purge():
+    # Explanation: Delete expired server-side sessions (also done in the background every SESSION_PURGE_SECONDS).
+    with app.app_context():
+        print(f"{user_sessions.purge()} expired sessions removed.")
+
+@app.cli.command("export")
+@click.argument("table", type=click.Choice(list(EXPORTS)))
+@click.option("--format", "fmt", type=click.Choice(list(FORMATS)), default="csv")
+@click.option("--since", type=click.DateTime(), help="Only rows on or after this time.")
+@click.option("--until", type=click.DateTime(), help="Only rows before this time.")
+@click.option("--gzip", "compress", is_flag=True, help="Gzip the output.")
+@click.option("--output", "-o", type=click.Path(dir_okay=False), help="File to write (default: stdout).")
+def export_table(table, fmt, since, until, compress, output):
+    # Explanation: Stream a table to a file or stdout, e.g. `flask export community_report --format ndjson -o reports.ndjson`.
+    with app.app_context():
+        out = open(output, "wb") if output else sys.stdout.buffer
+        try:
+            for chunk in iter_export(table, fmt, since, until, compress, app.config["EXPORT_CHUNK_SIZE"]):
+                out.write(chunk)
+        finally:
+            if output:
+                out.close()
+    if output:
+        print(f"Exported {table} to {output}.")
+
+@app.cli.command("import-data")
+@click.argument("paths", nargs=-1, type=click.Path(exists=True))
+@click.option("--state", "state_path", type=click.Path(dir_okay=False),
+              help="Checkpoint file used to resume (default: instance/import-state.json).")
+@click.option("--batch-size", type=int, default=None, help="Rows per transaction (default: IMPORT_BATCH_SIZE).")
+@click.option("--offline", is_flag=True, help="Drop derived-table triggers while loading, rebuild them at the end.")
+@click.option("--restart", is_flag=True, help="Ignore the checkpoint and start from the first row.")
+def import_data_command(paths, state_path, batch_size, offline, restart):
+    # Explanation: Load CSV table dumps (default: instance/data) in FK order. Re-running after an interruption
+    # resumes from the last committed batch. Use --offline only when nothing else is writing to the database.
+    paths = paths or (os.path.join(app.instance_path, "data"),)
+    state_path = state_path or os.path.join(app.instance_path, "import-state.json")
+    started = time.perf_counter()
+
+    def progress(table, entry):
+        print(f"{table}: {entry['rows']} rows read, {entry['inserted']} inserted, {entry['rejected']} rejected "
+              f"[{time.perf_counter() - started:.1f}s]{' - done' if entry['done'] else ''}")
+        sys.stdout.flush()
+
+    with app.app_context():
+        db.create_all()
+        try:
+            summary = import_data(paths, state_path, batch_size or app.config["IMPORT_BATCH_SIZE"],
+                                  offline=offline, restart=restart, progress=progress)
+        except ValueError as exc:
+            raise SystemExit(f"Import refused: {exc}")
+    if not summary:
+        print("No importable files found.")
+    print(f"Import finished in {time.perf_counter() - started:.1f}s.")
+
+@app.cli.command("build-offline")
+@click.option("--force", is_flag=True, help="Re-render every file even if its content is unchanged.")
+def build_offline(force):
+    # Explanation: Render the offline bundle (educational hub, resource directory, data.json) into
+    # OFFLINE_BUNDLE_DIR with hashed names and .gz (and .br) variants. Admin edits rebuild it incrementally.
+    with app.app_context():
+        manifest = offline_bundle.build(force=force)
+    print(f"Offline bundle {manifest['version']} in {offline_bundle.directory}: "
+          f"rebuilt {', '.join(manifest['rebuilt']) or 'nothing (up to date)'}.")
+
+@app.cli.command("check-query-plans")
+def check_query_plans():
+    # Explanation: Exit non-zero if any per-user history query falls back to a full scan or sort.
+    failures = 0
+    for name, query in history_queries(user_id=1).items():
+        problems = plan_problems(query)
+        status = "FAIL" if problems else "ok"
+        print(f"[{status}] {name}" + (f": {'; '.join(problems)}" if problems else ""))
+        failures += bool(problems)
+    if failures:
+        raise SystemExit(f"{failures} query plan(s) fall back to a full scan. Run 'flask db upgrade'.")
+
 if __name__ == "__main__":
     # Explanation: Run development server.
     app.run(debug=True)
@@ -0,0 +1,6 @@
+# Explanation: ASGI entry point (async read path + the Flask app), e.g.
+# pip install -r requirements-asgi.txt && uvicorn asgi:application --workers 4
+from app import app
+from python.asgi import AsyncReadApp
+
+application = AsyncReadApp(app)
@@ -0,0 +1,185 @@
+# Explanation: Concurrent connection capacity of the ASGI mode (asgi.py under uvicorn) versus the
+# threaded WSGI server: hold N open admin SSE feeds, then load the public pages from C concurrent
+# keep-alive clients and report how many feeds were accepted plus page throughput and latency.
+# --wsgi-threads mirrors gunicorn's gthread worker (0 = one thread per connection).
+# Usage: python bench/bench_asgi.py --feeds 200 --clients 50 --duration 10
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from common import ROOT, load_app, percentiles, seed
+from bench_routes import HttpSession, csrf_token
+
+PASSWORD = "bench-password"
+PAGES = ["/", "/educationalhub", "/resourcedirectory"]
+
+
+def _free_port():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def _serve_wsgi(db_path, port, threads):
+    import logging
+    from concurrent.futures import ThreadPoolExecutor
+    from werkzeug.serving import BaseWSGIServer, ThreadedWSGIServer
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    m = load_app(db_path, csrf=True)
+
+    class PooledWSGIServer(BaseWSGIServer):
+        # Fixed worker threads, each owning a connection until it closes (gthread-style).
+        multithread = True
+        pool = ThreadPoolExecutor(threads or 1)
+
+        def process_request(self, request, client_address):
+            self.pool.submit(self._handle, request, client_address)
+
+        def _handle(self, request, client_address):
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+    server_class = PooledWSGIServer if threads else ThreadedWSGIServer
+    server = server_class("127.0.0.1", port, m.app)
+    server.request_queue_size = 1024
+    server.serve_forever()
+
+
+def start_server(mode, db_path, port, threads):
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}")
+    if mode == "asgi":
+        command = [sys.executable, "-m", "uvicorn", "asgi:application", "--port", str(port),
+                   "--log-level", "warning", "--backlog", "4096"]
+        process = subprocess.Popen(command, cwd=ROOT, env=env)
+    else:
+        process = multiprocessing.get_context("spawn").Process(target=_serve_wsgi, args=(db_path, port, threads))
+        process.start()
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{mode} server did not start")
+
+
+def admin_cookie(port):
+    session = HttpSession(port)
+    token = csrf_token(session.request("GET", "/adminlogin")[1].decode())
+    session.request("POST", "/adminlogin", f"email=admin%40bench.example.org&password={PASSWORD}&csrf_token={token}")
+    return "; ".join(f"{k}={v}" for k, v in session.cookies.items())
+
+
+async def _read_response(reader):
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    length, keep_alive = 0, True
+    for line in head.split(b"\r\n"):
+        if line.lower().startswith(b"content-length:"):
+            length = int(line.split(b":", 1)[1])
+        elif line.lower() == b"connection: close":
+            keep_alive = False
+    await reader.readexactly(length)
+    return status, keep_alive
+
+
+async def open_feed(port, cookie, timeout):
+    # Connected once the first SSE frame ("retry: ...") arrives.
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection("127.0.0.1", port), timeout)
+        writer.write(f"GET /admin/stream HTTP/1.1\r\nHost: bench\r\nCookie: {cookie}\r\n\r\n".encode())
+        await asyncio.wait_for(reader.readuntil(b"retry:"), timeout)
+        return writer
+    except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+        return None
+
+
+async def page_client(port, deadline, timeout, samples, errors):
+    reader = writer = None
+    i = 0
+    while time.monotonic() < deadline:
+        path = PAGES[i % len(PAGES)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.wait_for(asyncio.open_connection("127.0.0.1", port), timeout)
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: bench\r\n\r\n".encode())
+            status, keep_alive = await asyncio.wait_for(_read_response(reader), timeout)
+            if status != 200:
+                errors.append(status)
+            samples.append(time.perf_counter() - start)
+            if not keep_alive:
+                # werkzeug's dev server closes after each response; reconnect as a browser would.
+                writer.close()
+                reader = writer = None
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+            errors.append("timeout")
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+
+
+async def run_load(port, cookie, feeds, clients, duration, timeout):
+    writers = await asyncio.gather(*(open_feed(port, cookie, timeout) for _ in range(feeds)))
+    open_feeds = [w for w in writers if w is not None]
+    samples, errors = [], []
+    deadline = time.monotonic() + duration
+    started = time.perf_counter()
+    await asyncio.gather(*(page_client(port, deadline, timeout, samples, errors) for _ in range(clients)))
+    elapsed = time.perf_counter() - started
+    for writer in open_feeds:
+        writer.close()
+    return {"feeds_requested": feeds, "feeds_open": len(open_feeds), "page_requests": len(samples),
+            "pages_per_second": round(len(samples) / elapsed, 1), "errors": len(errors),
+            "latency": percentiles(samples) if samples else None}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--feeds", type=int, default=200, help="Admin SSE connections held open.")
+    parser.add_argument("--clients", type=int, default=50, help="Concurrent page clients.")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--timeout", type=float, default=5.0, help="Per-request timeout (counts as an error).")
+    parser.add_argument("--wsgi-threads", type=int, default=32)
+    parser.add_argument("--modes", default="wsgi,asgi")
+    parser.add_argument("--resources", type=int, default=500)
+    parser.add_argument("--articles", type=int, default=200)
+    args = parser.parse_args()
+
+    m = load_app(csrf=True)
+    db_path = m.app.config["SQLALCHEMY_DATABASE_URI"].replace("sqlite:///", "")
+    from werkzeug.security import generate_password_hash
+    seed(m, users=50, reports_per_user=5, checks_per_user=5, resources=args.resources, articles=args.articles)
+    with m.app.app_context():
+        m.db.session.add(m.User(email="admin@bench.example.org", full_name="Bench Admin", role="admin",
+                                password_hash=generate_password_hash(PASSWORD)))
+        m.db.session.commit()
+
+    results = {"feeds": args.feeds, "clients": args.clients, "duration": args.duration,
+               "wsgi_threads": args.wsgi_threads, "cpus": os.cpu_count()}
+    for mode in args.modes.split(","):
+        port = _free_port()
+        server = start_server(mode, db_path, port, args.wsgi_threads)
+        try:
+            cookie = admin_cookie(port)
+            results[mode] = asyncio.run(run_load(port, cookie, args.feeds, args.clients, args.duration, args.timeout))
+        finally:
+            server.terminate()
+            server.wait() if mode == "asgi" else server.join()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# Explanation: Compare /home latency for the legacy four-query view against the cached single-query summary.
+# Usage: python bench/bench_dashboard.py --users 500 --rows 200 --iterations 2000
+import argparse
+import json
+import random
+
+from common import load_app, seed, percentiles, timed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--rows", type=int, default=100, help="reports and safety checks per user")
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    m = load_app()
+    from flask import render_template
+    from python.dashboard import build_dashboard_summary, get_dashboard_summary, dashboard_cache
+    user_ids = seed(m, users=args.users, reports_per_user=args.rows, checks_per_user=args.rows)
+    rnd = random.Random(7)
+    picks = [rnd.choice(user_ids) for _ in range(args.iterations)]
+
+    def legacy(i):
+        # The original home() body: four queries, then render.
+        user = m.User.query.get(picks[i])
+        reports = m.CommunityReport.query.filter_by(user_id=user.id).order_by(m.CommunityReport.created_at.desc()).limit(5).all()
+        safety = m.SafetyCheck.query.filter_by(user_id=user.id).order_by(m.SafetyCheck.created_at.desc()).first()
+        plan = m.EmergencyPlan.query.filter_by(user_id=user.id).order_by(m.EmergencyPlan.created_at.desc()).first()
+        render_template("home.html", user=user, reports=reports, safety=safety, plan=plan)
+        m.db.session.remove()
+
+    def combined(i):
+        s = build_dashboard_summary(picks[i])
+        render_template("home.html", user=s.user, reports=s.reports, safety=s.safety, plan=s.plan)
+        m.db.session.remove()
+
+    def cached(i):
+        s = get_dashboard_summary(picks[i])
+        render_template("home.html", user=s.user, reports=s.reports, safety=s.safety, plan=s.plan)
+        m.db.session.remove()
+
+    results = {"users": args.users, "rows_per_user": args.rows, "iterations": args.iterations}
+    with m.app.test_request_context("/home"):
+        results["legacy_four_queries"] = percentiles(timed(legacy, args.iterations))
+        results["single_query"] = percentiles(timed(combined, args.iterations))
+        dashboard_cache.clear()
+        results["single_query_cached"] = percentiles(timed(cached, args.iterations))
+        results["cache"] = dashboard_cache.stats()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# Explanation: Time `flask import-data` on a generated community_report dump (default 1M rows).
+# Usage: python bench/bench_import.py --rows 1000000 [--offline]
+import argparse
+import csv
+import json
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from common import load_app
+
+
+def write_dumps(directory, rows, users=1000, seed=42):
+    # Same layout as instance/data: "<table> table.txt" CSV with a header row.
+    rnd = random.Random(seed)
+    now = datetime.utcnow()
+    with open(os.path.join(directory, "user table.txt"), "w", newline="") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(["id", "email", "full_name", "phone", "address", "role", "password_hash", "created_at"])
+        for i in range(1, users + 1):
+            writer.writerow([i, f"user{i}@bench.local", f"Bench User {i}", "", "", "user", "!", now - timedelta(days=60)])
+    with open(os.path.join(directory, "community_report table.txt"), "w", newline="") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(["id", "user_id", "disaster_type", "location", "description", "status",
+                         "verified_by_admin_id", "created_at"])
+        for i in range(1, rows + 1):
+            writer.writerow([i, rnd.randint(1, users), rnd.choice(["Typhoon", "Flood", "Earthquake", "Fire"]),
+                             f"{rnd.randint(1, 99):02d} Munlawin Sur, Alitagtag, Batangas",
+                             "Water rising near the creek, road impassable", rnd.choice(["pending", "verified", "resolved"]),
+                             "", now - timedelta(seconds=rnd.randint(0, 30 * 86400))])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--batch-size", type=int, default=20000)
+    parser.add_argument("--offline", action="store_true", help="Drop derived-table triggers while loading.")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="disaster_import_")
+    started = time.perf_counter()
+    write_dumps(directory, args.rows)
+    generated = time.perf_counter() - started
+    size_mb = os.path.getsize(os.path.join(directory, "community_report table.txt")) / 1e6
+
+    m = load_app(os.path.join(directory, "bench.db"))
+    from python.dataimport import import_data
+    with m.app.app_context():
+        m.db.create_all()
+        started = time.perf_counter()
+        summary = import_data([directory], os.path.join(directory, "state.json"), args.batch_size, offline=args.offline)
+        elapsed = time.perf_counter() - started
+    report = summary["community_report"]
+    print(json.dumps({
+        "rows": args.rows, "file_mb": round(size_mb, 1), "batch_size": args.batch_size, "offline": args.offline,
+        "generate_seconds": round(generated, 2), "import_seconds": round(elapsed, 2),
+        "rows_per_second": round(report["rows"] / elapsed), "inserted": report["inserted"],
+        "rejected": report["rejected"],
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+# Explanation: Time the bulk report ingestion API for NDJSON and JSON-array bodies.
+# Usage: python bench/bench_ingest.py --records 100000
+import argparse
+import json
+import time
+
+from common import load_app
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--records", type=int, default=100000)
+    parser.add_argument("--batch-size", type=int, default=None)
+    args = parser.parse_args()
+
+    m = load_app()
+    if args.batch_size:
+        m.app.config["INGEST_BATCH_SIZE"] = args.batch_size
+    with m.app.app_context():
+        m.db.create_all()
+        user = m.User(email="field@bench.local", full_name="Field Team", role="user", password_hash="!")
+        m.db.session.add(user)
+        m.db.session.commit()
+        user_id = user.id
+    client = m.app.test_client()
+    with client.session_transaction() as sess:
+        sess["user_id"] = user_id
+        sess["role"] = "user"
+
+    records = [{"disaster_type": "Flood", "location": f"{i % 99:02d} Munlawin Sur, Alitagtag, Batangas",
+                "description": "Water rising near the creek"} for i in range(args.records)]
+    bodies = {
+        "ndjson": ("application/x-ndjson", "\n".join(json.dumps(r) for r in records)),
+        "json": ("application/json", json.dumps(records)),
+    }
+    results = {"records": args.records, "batch_size": m.app.config["INGEST_BATCH_SIZE"]}
+    for name, (content_type, body) in bodies.items():
+        start = time.perf_counter()
+        response = client.post("/api/reports/bulk", data=body, content_type=content_type)
+        elapsed = time.perf_counter() - start
+        assert response.status_code == 200 and response.json["created"] == args.records, response.status_code
+        results[name] = {"seconds": round(elapsed, 3), "records_per_second": round(args.records / elapsed)}
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+# Explanation: Latency of /resources/nearby lookups over a large synthetic resource directory.
+# Usage: python bench/bench_nearby.py --resources 100000 --queries 5000
+import argparse
+import json
+import random
+
+from sqlalchemy import insert
+
+from common import load_app, percentiles, timed
+
+CATEGORIES = ["Hospital", "Evacuation Center", "Hotline", "Police", "Fire Station", "Other"]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--resources", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=5000)
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+
+    m = load_app()
+    from python.spatial import nearby_resources
+    rnd = random.Random(3)
+    with m.app.app_context():
+        m.db.create_all()
+        # Spread over the Philippine archipelago's bounding box.
+        m.db.session.execute(insert(m.Resource), [
+            dict(name=f"Resource {i}", category=rnd.choice(CATEGORIES), contact="911",
+                 latitude=round(rnd.uniform(4.5, 21.0), 6), longitude=round(rnd.uniform(116.0, 127.0), 6))
+            for i in range(args.resources)])
+        m.db.session.commit()
+
+    points = [(rnd.uniform(4.5, 21.0), rnd.uniform(116.0, 127.0), rnd.choice([None] + CATEGORIES))
+              for _ in range(args.queries)]
+    results = {"resources": args.resources, "queries": args.queries, "k": args.k}
+    with m.app.app_context():
+        results["index_build"] = percentiles(timed(lambda i: (nearby_resources.invalidate(),
+                                                              nearby_resources.nearest(13.9, 121.0, 1)), 3))
+        results["lookup_all_categories"] = percentiles(timed(
+            lambda i: nearby_resources.nearest(points[i][0], points[i][1], k=args.k), args.queries))
+        results["lookup_one_category"] = percentiles(timed(
+            lambda i: nearby_resources.nearest(points[i][0], points[i][1], k=args.k, category=points[i][2]),
+            args.queries))
+    client = m.app.test_client()
+    results["http_endpoint"] = percentiles(timed(
+        lambda i: client.get(f"/resources/nearby?lat={points[i][0]}&lon={points[i][1]}&k={args.k}"), args.queries))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
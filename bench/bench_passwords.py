@@ -0,0 +1,92 @@
+# Explanation: Login throughput per hashing method and pool size, plus the latency of a cheap route
+# (/sw.js) measured during the login burst. Shows logins/sec per core and whether hashing starves
+# other requests (PASSWORD_HASH_WORKERS=0 hashes in the request threads).
+# Usage: python bench/bench_passwords.py --methods scrypt,pbkdf2:sha256:600000 --workers 0,2 --threads 8
+import argparse
+import json
+import multiprocessing
+import os
+import threading
+import time
+
+from common import load_app, percentiles, seed
+
+PASSWORD = "bench-password"
+
+
+def _run(method, workers, threads, duration, users, queue):
+    os.environ["PASSWORD_HASH_METHOD"] = method
+    os.environ["PASSWORD_HASH_WORKERS"] = str(workers)
+    m = load_app()
+    from python.passwords import passwords
+    seed(m, users=users, reports_per_user=0, checks_per_user=0, plans_per_user=0,
+         password_hash=passwords.hash(PASSWORD))
+    logins, probes, statuses = [], [], {}
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    def login_loop(n):
+        client = m.app.test_client()
+        i = 0
+        while not stop.is_set():
+            email = f"user{1 + (n + i * threads) % users}@bench.example.org"
+            i += 1
+            start = time.perf_counter()
+            status = client.post("/login", data={"email": email, "password": PASSWORD},
+                                 environ_base={"REMOTE_ADDR": f"10.0.{n // 250}.{n % 250}"}).status_code
+            with lock:
+                logins.append(time.perf_counter() - start)
+                statuses[status] = statuses.get(status, 0) + 1
+            client.get("/logout")
+
+    def probe_loop():
+        client = m.app.test_client()
+        while not stop.is_set():
+            start = time.perf_counter()
+            client.get("/sw.js")
+            probes.append(time.perf_counter() - start)
+            time.sleep(0.01)
+
+    pool = [threading.Thread(target=login_loop, args=(n,)) for n in range(threads)]
+    pool.append(threading.Thread(target=probe_loop))
+    started = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    cores = min(workers, os.cpu_count() or 1) if workers else 1
+    queue.put({"method": passwords.prefix, "workers": workers, "threads": threads,
+               "logins_per_second": round(len(logins) / elapsed, 1),
+               "logins_per_second_per_core": round(len(logins) / elapsed / cores, 1),
+               "statuses": statuses, "login_latency": percentiles(logins) if logins else None,
+               "other_route_latency": percentiles(probes) if probes else None,
+               "hasher": passwords.stats()})
+    passwords.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--methods", default="scrypt,scrypt:16384:8:1,pbkdf2:sha256:600000")
+    parser.add_argument("--workers", default=f"0,{os.cpu_count() or 1}", help="Comma-separated pool sizes.")
+    parser.add_argument("--threads", type=int, default=8, help="Concurrent login clients.")
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--users", type=int, default=200)
+    args = parser.parse_args()
+    ctx = multiprocessing.get_context("spawn")
+    results = []
+    for method in args.methods.split(","):
+        for workers in (int(w) for w in args.workers.split(",")):
+            # A fresh process per run: the app reads its configuration at import time.
+            queue = ctx.Queue()
+            process = ctx.Process(target=_run, args=(method, workers, args.threads, args.duration, args.users, queue))
+            process.start()
+            results.append(queue.get())
+            process.join()
+    print(json.dumps({"cpus": os.cpu_count(), "runs": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
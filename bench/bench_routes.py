@@ -0,0 +1,352 @@
+# Explanation: Benchmark every route in app.py on synthetic data, through the Flask test client and
+# optionally over HTTP with several load-generating processes. Prints throughput and p50/p95/p99
+# latency as JSON; --compare flags routes that got slower than a previous run.
+# Usage: python bench/bench_routes.py --users 200 --iterations 50 -o bench_output.json
+#        python bench/bench_routes.py --http --processes 4 --duration 10 --compare bench_output.json
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import re
+import socket
+import sqlite3
+import subprocess
+import sys
+import time
+import http.client
+from datetime import datetime, timedelta
+
+from common import ROOT, load_app, percentiles, seed
+
+PASSWORD = "bench-password"
+CSRF_INPUT = re.compile(r'name="csrf_token"[^>]*value="([^"]+)"|value="([^"]+)"[^>]*name="csrf_token"')
+
+
+def csrf_token(html):
+    match = CSRF_INPUT.search(html)
+    return match.group(1) or match.group(2) if match else None
+
+
+def route_specs(report_count):
+    # (name, client, method, path(i), request kwargs(i), expected statuses). Clients: "anon" (no session),
+    # "user" / "admin" (logged in through the real login forms) and "fresh" (logs in/out repeatedly).
+    since = (datetime.utcnow() - timedelta(days=1)).isoformat(timespec="seconds")
+    report = lambda i: 1 + (i * 7919) % report_count
+    bulk = "\n".join(json.dumps({"disaster_type": "Flood", "location": f"{n:02d} Munlawin Sur, Alitagtag",
+                                 "description": "Water rising near the creek"}) for n in range(100))
+    return [
+        ("index", "anon", "GET", "/", None, (200,)),
+        ("index (logged in)", "user", "GET", "/", None, (200,)),
+        ("service_worker", "anon", "GET", "/sw.js", None, (200,)),
+        ("home", "user", "GET", "/home", None, (200,)),
+        ("login (form)", "anon", "GET", "/login", None, (200,)),
+        ("login (submit)", "fresh", "POST", "/login",
+         lambda i: {"data": {"email": f"user{1 + i % 10}@bench.example.org", "password": PASSWORD}}, (302,)),
+        ("register (form)", "anon", "GET", "/register", None, (200,)),
+        ("register (submit)", "fresh", "POST", "/register",
+         lambda i: {"data": {"full_name": f"New User {i}", "email": f"new{i}-{os.getpid()}@bench.example.org",
+                             "password": PASSWORD}}, (302,)),
+        ("forgot_password (form)", "anon", "GET", "/forgot_password", None, (200,)),
+        ("forgot_password (submit)", "fresh", "POST", "/forgot_password", lambda i: {"data": {}}, (302,)),
+        ("logout", "fresh", "GET", "/logout", None, (302,)),
+        ("adminlogin (form)", "anon", "GET", "/adminlogin", None, (200,)),
+        ("adminlogin (submit)", "fresh", "POST", "/adminlogin",
+         lambda i: {"data": {"email": "admin@bench.example.org", "password": PASSWORD}}, (302,)),
+        ("admin_dashboard", "admin", "GET", "/admin_dashboard", None, (200,)),
+        ("admin_dashboard (search)", "admin", "GET", "/admin_dashboard?q=munlawin", None, (200,)),
+        ("admin_roster", "admin", "GET", "/admin/roster", None, (200,)),
+        ("admin_cache_stats", "admin", "GET", "/admin/cache/stats", None, (200,)),
+        ("admin_queue_stats", "admin", "GET", "/admin/queue/stats", None, (200,)),
+        ("admin_stats", "admin", "GET", "/admin/stats?minutes=1440", None, (200,)),
+        ("admin_export (resource.csv)", "admin", "GET", "/admin/export/resource.csv", None, (200,)),
+        ("admin_export (reports, last day, gzip)", "admin", "GET",
+         f"/admin/export/community_report.ndjson?since={since}&gzip=1", None, (200,)),
+        ("admin_metrics", "admin", "GET", "/admin/metrics", None, (200, 404)),
+        # Users 2-10 are signed in only by the "fresh" login bench above.
+        ("revoke_user_sessions", "admin", "POST", lambda i: f"/admin/users/{2 + i % 9}/sessions/revoke", None, (302,)),
+        ("admin_profile (unknown)", "admin", "GET", "/admin/profiles/none", None, (404,)),
+        ("admin_stream (first event)", "admin", "STREAM", "/admin/stream", None, (200,)),
+        ("educationalhub", "anon", "GET", "/educationalhub", None, (200,)),
+        ("educationalhub (search)", "anon", "GET", "/educationalhub?q=water", None, (200,)),
+        ("api_search_articles", "anon", "GET", "/api/search/articles?q=meeting", None, (200,)),
+        ("api_search_reports", "admin", "GET", "/api/search/reports?q=munlawin", None, (200,)),
+        ("communityreport (list)", "user", "GET", "/communityreport", None, (200,)),
+        ("communityreport (submit)", "user", "POST", "/communityreport",
+         lambda i: {"data": {"disaster_type": "Flood", "location": f"{i % 99:02d} Munlawin Sur",
+                             "description": "Water rising"}}, (302,)),
+        ("bulk_reports (100 NDJSON)", "user", "POST", "/api/reports/bulk",
+         lambda i: {"data": bulk, "content_type": "application/x-ndjson"}, (200,)),
+        ("verify_report", "admin", "POST", lambda i: f"/admin/reports/{report(i)}/verify", None, (302,)),
+        ("resolve_report", "admin", "POST", lambda i: f"/admin/reports/{report(i)}/resolve", None, (302,)),
+        ("bulk_moderate_reports (area filter)", "admin", "POST", "/admin/reports/bulk",
+         lambda i: {"json": {"action": ["verify", "resolve"][i % 2], "filter": {"area": "Alitagtag", "since": since}}},
+         (200,)),
+        ("resourcedirectory", "anon", "GET", "/resourcedirectory", None, (200,)),
+        ("resources_nearby", "anon", "GET", "/resources/nearby?lat=13.9&lon=121.0&k=5", None, (200,)),
+        ("admin_resources (list)", "admin", "GET", "/admin/resources", None, (200,)),
+        ("admin_resources (add)", "admin", "POST", "/admin/resources",
+         lambda i: {"data": {"name": f"Bench Shelter {i}", "category": "Evacuation Center",
+                             "latitude": "13.9", "longitude": "121.0"}}, (302,)),
+        ("emergencyplangenerator (list)", "user", "GET", "/emergencyplangenerator", None, (200,)),
+        ("emergencyplangenerator (save)", "user", "POST", "/emergencyplangenerator",
+         lambda i: {"data": {"household_members": "4", "meeting_point": "Barangay Hall"}}, (302,)),
+        ("personalinformation (view)", "user", "GET", "/personalinformation", None, (200,)),
+        ("personalinformation (update)", "user", "POST", "/personalinformation",
+         lambda i: {"data": {"phone": f"0917-{i:07d}"}}, (302,)),
+        ("safetycheck (history)", "user", "GET", "/safetycheck", None, (200,)),
+        ("safetycheck (check in)", "user", "POST", "/safetycheck",
+         lambda i: {"data": {"status": ["Safe", "Needs Help", "Missing"][i % 3]}}, (302, 503)),
+        ("admin_add_article", "admin", "POST", "/admin/articles",
+         lambda i: {"data": {"title": f"Bench Article {i}", "category": "Emergency Kit Guide",
+                             "content": "Pack water and a radio."}}, (302,)),
+    ]
+
+
+def make_clients(app):
+    clients = {"anon": app.test_client()}
+    for name, path, email in (("user", "/login", "user1@bench.example.org"), ("admin", "/adminlogin", "admin@bench.example.org")):
+        client = app.test_client()
+        token = csrf_token(client.get(path).get_data(as_text=True))
+        response = client.post(path, data={"email": email, "password": PASSWORD, "csrf_token": token})
+        assert response.status_code == 302, f"{name} login failed ({response.status_code})"
+        clients[name] = client
+    clients["fresh"] = app.test_client()
+    tokens = {name: csrf_token(client.get("/login").get_data(as_text=True)) for name, client in clients.items()
+              if name in ("anon", "fresh")}
+    tokens["user"] = csrf_token(clients["user"].get("/communityreport").get_data(as_text=True))
+    tokens["admin"] = csrf_token(clients["admin"].get("/admin_dashboard").get_data(as_text=True))
+    return clients, tokens
+
+
+def run_spec(client, token, method, path, kwargs, i):
+    path = path(i) if callable(path) else path
+    kwargs = dict(kwargs(i)) if kwargs else {}
+    if method == "STREAM":
+        response = client.get(path, buffered=False)
+        next(iter(response.response))
+        response.close()
+        return response.status_code
+    if method == "POST":
+        kwargs.setdefault("headers", {})["X-CSRFToken"] = token
+        return client.post(path, **kwargs).status_code
+    return client.get(path).status_code
+
+
+def bench_test_client(m, specs, iterations, warmup, only):
+    clients, tokens = make_clients(m.app)
+    results = {}
+    for name, client_name, method, path, kwargs, expected in specs:
+        if only and not re.search(only, name):
+            continue
+        client, token = clients[client_name], tokens[client_name]
+        samples, statuses = [], {}
+        for i in range(warmup + iterations):
+            start = time.perf_counter()
+            status = run_spec(client, token, method, path, kwargs, i)
+            elapsed = time.perf_counter() - start
+            if method == "POST":
+                # Redirect targets are not followed, so drop the flash queue outside the timing.
+                with client.session_transaction() as sess:
+                    sess.pop("_flashes", None)
+                if client_name == "fresh":
+                    tokens["fresh"] = csrf_token(client.get("/login").get_data(as_text=True))
+                    token = tokens["fresh"]
+            if i >= warmup:
+                samples.append(elapsed)
+                statuses[status] = statuses.get(status, 0) + 1
+        total = sum(samples)
+        results[name] = dict(percentiles(samples), rps=round(len(samples) / total, 1) if total else None,
+                             statuses=statuses, ok=all(s in expected for s in statuses))
+    return results
+
+
+def coverage(app, specs):
+    adapter = app.url_map.bind("localhost")
+    covered = set()
+    for _, _, method, path, _, _ in specs:
+        path = path(0) if callable(path) else path
+        endpoint, _ = adapter.match(path.split("?")[0], method="GET" if method == "STREAM" else method)
+        covered.add(endpoint)
+    return sorted({rule.endpoint for rule in app.url_map.iter_rules()} - covered - {"static"})
+
+
+# --- HTTP load generation -------------------------------------------------------------------
+
+HTTP_MIX = [
+    ("GET /", "GET", "/", None), ("GET /educationalhub", "GET", "/educationalhub", None),
+    ("GET /resourcedirectory", "GET", "/resourcedirectory", None),
+    ("GET /resources/nearby", "GET", "/resources/nearby?lat=13.9&lon=121.0&k=5", None),
+    ("GET /home", "GET", "/home", None), ("GET /safetycheck", "GET", "/safetycheck", None),
+    ("GET /communityreport", "GET", "/communityreport", None),
+    ("POST /safetycheck", "POST", "/safetycheck", "status=Safe"),
+    ("POST /communityreport", "POST", "/communityreport",
+     "disaster_type=Flood&location=Munlawin+Sur&description=Water+rising"),
+]
+
+
+class HttpSession:
+    # Minimal keep-alive client with a cookie jar (the stdlib only, so it runs offline).
+    def __init__(self, port):
+        self.conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        self.cookies = {}
+
+    def request(self, method, path, body=None, headers=None):
+        headers = dict(headers or {})
+        if self.cookies:
+            headers["Cookie"] = "; ".join(f"{k}={v}" for k, v in self.cookies.items())
+        if body is not None:
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        self.conn.request(method, path, body=body, headers=headers)
+        response = self.conn.getresponse()
+        data = response.read()
+        for header, value in response.getheaders():
+            if header.lower() == "set-cookie":
+                name, _, rest = value.partition("=")
+                self.cookies[name] = rest.split(";", 1)[0]
+        return response.status, data
+
+
+def _serve(db_path, port, ready):
+    import logging
+    from werkzeug.serving import make_server
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    m = load_app(db_path, csrf=True)
+    server = make_server("127.0.0.1", port, m.app, threaded=True)
+    ready.set()
+    server.serve_forever()
+
+
+def _load_worker(port, user_number, duration, queue):
+    session = HttpSession(port)
+    _, body = session.request("GET", "/login")
+    token = csrf_token(body.decode())
+    session.request("POST", "/login", f"email=user{user_number}%40bench.example.org&password={PASSWORD}&csrf_token={token}")
+    _, body = session.request("GET", "/communityreport")
+    token = csrf_token(body.decode())
+    samples = {name: [] for name, *_ in HTTP_MIX}
+    errors = 0
+    deadline = time.perf_counter() + duration
+    i = 0
+    while time.perf_counter() < deadline:
+        name, method, path, body = HTTP_MIX[i % len(HTTP_MIX)]
+        i += 1
+        start = time.perf_counter()
+        status, _ = session.request(method, path, body, {"X-CSRFToken": token} if method == "POST" else None)
+        samples[name].append(time.perf_counter() - start)
+        errors += status >= 400
+    queue.put((samples, errors))
+
+
+def bench_http(db_path, processes, duration):
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    ctx = multiprocessing.get_context("spawn")
+    ready = ctx.Event()
+    server = ctx.Process(target=_serve, args=(db_path, port, ready), daemon=True)
+    server.start()
+    ready.wait(60)
+    time.sleep(0.2)
+    queue = ctx.Queue()
+    workers = [ctx.Process(target=_load_worker, args=(port, 1 + n, duration, queue)) for n in range(processes)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    outcomes = [queue.get() for _ in workers]
+    elapsed = time.perf_counter() - started
+    for worker in workers:
+        worker.join()
+    server.terminate()
+    merged, errors = {name: [] for name, *_ in HTTP_MIX}, 0
+    for samples, worker_errors in outcomes:
+        errors += worker_errors
+        for name, values in samples.items():
+            merged[name].extend(values)
+    every = [v for values in merged.values() for v in values]
+    return {"processes": processes, "duration_s": round(elapsed, 2), "errors": errors,
+            "overall": dict(percentiles(every), rps=round(len(every) / elapsed, 1)),
+            "routes": {name: percentiles(values) for name, values in merged.items() if values}}
+
+
+# --- Report -----------------------------------------------------------------------------------
+
+def meta(args):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {"commit": commit, "timestamp": datetime.utcnow().isoformat(timespec="seconds"),
+            "python": platform.python_version(), "sqlite": sqlite3.sqlite_version, "cpus": os.cpu_count(),
+            "scale": {k: getattr(args, k) for k in ("users", "reports_per_user", "checks_per_user",
+                                                    "plans_per_user", "resources", "articles")},
+            "iterations": args.iterations}
+
+
+def compare(current, baseline, tolerance):
+    # Routes whose p50 or p95 grew by more than `tolerance` (ratio) versus the baseline run.
+    regressions = {}
+    for name, result in current["routes"].items():
+        before = baseline.get("routes", {}).get(name)
+        if not before:
+            continue
+        for key in ("p50_ms", "p95_ms"):
+            if before[key] and result[key] / before[key] > tolerance:
+                regressions.setdefault(name, {})[key] = [before[key], result[key]]
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--reports-per-user", type=int, default=20)
+    parser.add_argument("--checks-per-user", type=int, default=20)
+    parser.add_argument("--plans-per-user", type=int, default=2)
+    parser.add_argument("--resources", type=int, default=500)
+    parser.add_argument("--articles", type=int, default=200)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--only", help="Regex on route names to run a subset.")
+    parser.add_argument("--http", action="store_true", help="Also load the app over HTTP from several processes.")
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--compare", help="Previous JSON output; exit 1 if a route regressed.")
+    parser.add_argument("--tolerance", type=float, default=1.25)
+    parser.add_argument("--output", "-o", help="Also write the JSON report to this file.")
+    args = parser.parse_args()
+
+    m = load_app(csrf=True)
+    db_path = m.app.config["SQLALCHEMY_DATABASE_URI"].replace("sqlite:///", "")
+    from werkzeug.security import generate_password_hash
+    password_hash = generate_password_hash(PASSWORD)
+    seed(m, users=args.users, reports_per_user=args.reports_per_user, checks_per_user=args.checks_per_user,
+         plans_per_user=args.plans_per_user, resources=args.resources, articles=args.articles,
+         password_hash=password_hash)
+    with m.app.app_context():
+        m.db.session.add(m.User(email="admin@bench.example.org", full_name="Bench Admin", role="admin",
+                                password_hash=password_hash))
+        m.db.session.commit()
+
+    specs = route_specs(max(1, args.users * args.reports_per_user))
+    report = {"meta": meta(args), "uncovered": coverage(m.app, specs),
+              "routes": bench_test_client(m, specs, args.iterations, args.warmup, args.only)}
+    if args.http:
+        report["http"] = bench_http(db_path, args.processes, args.duration)
+    if args.compare:
+        with open(args.compare) as handle:
+            report["regressions"] = compare(report, json.load(handle), args.tolerance)
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as handle:
+            handle.write(output + "\n")
+    failed = [name for name, result in report["routes"].items() if not result["ok"]]
+    if failed or report.get("regressions"):
+        print(f"Unexpected statuses: {failed}; regressions: {sorted(report.get('regressions', {}))}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
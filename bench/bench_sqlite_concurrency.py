@@ -0,0 +1,81 @@
+# Explanation: Read/write throughput with N worker processes sharing one SQLite file, per config profile.
+# Usage: python bench/bench_sqlite_concurrency.py --workers 8 --duration 10 --write-ratio 0.2
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from common import load_app, seed, percentiles
+
+
+def _seed(profile, db_path, users):
+    os.environ["APP_CONFIG"] = profile
+    m = load_app(db_path)
+    seed(m, users=users, reports_per_user=20, checks_per_user=20)
+
+
+def _worker(profile, db_path, duration, write_ratio, users, worker_id):
+    os.environ["APP_CONFIG"] = profile
+    m = load_app(db_path)
+    client = m.app.test_client()
+    rnd = random.Random(worker_id)
+    reads, writes, errors = [], [], 0
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        with client.session_transaction() as sess:
+            sess["user_id"] = rnd.randint(1, users)
+            sess["role"] = "user"
+        is_write = rnd.random() < write_ratio
+        start = time.perf_counter()
+        try:
+            if is_write:
+                response = client.post("/safetycheck", data={"status": rnd.choice(["Safe", "Needs Help"])})
+            else:
+                response = client.get(rnd.choice(["/safetycheck", "/communityreport", "/educationalhub"]))
+            ok = response.status_code < 400
+        except Exception:
+            ok = False
+        elapsed = time.perf_counter() - start
+        if not ok:
+            errors += 1
+        (writes if is_write else reads).append(elapsed)
+    return reads, writes, errors
+
+
+def run_profile(profile, workers, duration, write_ratio, users):
+    db_path = os.path.join(tempfile.mkdtemp(prefix="disaster_conc_"), "bench.db")
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(1) as pool:
+        pool.apply(_seed, (profile, db_path, users))
+    with ctx.Pool(workers) as pool:
+        outcomes = pool.starmap(_worker, [(profile, db_path, duration, write_ratio, users, i) for i in range(workers)])
+    reads = [s for r, _, _ in outcomes for s in r]
+    writes = [s for _, w, _ in outcomes for s in w]
+    return {
+        "reads_per_second": round(len(reads) / duration, 1),
+        "writes_per_second": round(len(writes) / duration, 1),
+        "errors": sum(e for _, _, e in outcomes),
+        "read_latency": percentiles(reads) if reads else None,
+        "write_latency": percentiles(writes) if writes else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--profiles", default="default,production-sqlite")
+    args = parser.parse_args()
+    results = {"workers": args.workers, "duration": args.duration, "write_ratio": args.write_ratio}
+    for profile in args.profiles.split(","):
+        results[profile] = run_profile(profile, args.workers, args.duration, args.write_ratio, args.users)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
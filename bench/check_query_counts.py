@@ -0,0 +1,60 @@
+# Explanation: Fail (exit 1) if a listing view's SQL statement count grows with the number of rows.
+# Usage: python bench/check_query_counts.py
+import sys
+
+from sqlalchemy import insert
+
+from common import load_app
+
+
+def query_count(client, path):
+    response = client.get(path)
+    assert response.status_code == 200, (path, response.status_code)
+    return int(response.headers["X-Query-Count"])
+
+
+def main():
+    m = load_app()
+    m.app.config["QUERY_COUNT_HEADER"] = True
+    with m.app.app_context():
+        m.db.create_all()
+        admin = m.User(email="admin@bench.local", full_name="Bench Admin", role="admin", password_hash="!")
+        m.db.session.add(admin)
+        m.db.session.commit()
+        admin_id = admin.id
+    client = m.app.test_client()
+    with client.session_transaction() as sess:
+        sess["user_id"] = admin_id
+        sess["role"] = "admin"
+
+    # Warm-up: the first request also loads the admin's identity into the per-worker session cache.
+    query_count(client, "/admin_dashboard")
+    counts = {"empty": query_count(client, "/admin_dashboard")}
+    # Ids start past the admin row so the bulk seed does not collide with it.
+    with m.app.app_context():
+        m.db.session.execute(insert(m.User), [dict(id=admin_id + i, email=f"u{i}@bench.local", full_name=f"U{i}",
+                                                   role="user", password_hash="!") for i in range(1, 4)])
+        m.db.session.execute(insert(m.CommunityReport), [dict(user_id=admin_id + 1, disaster_type="Flood",
+                                                              location="L", description="d") for _ in range(3)])
+        m.db.session.commit()
+    counts["few_rows"] = query_count(client, "/admin_dashboard")
+    seed_start = admin_id + 100
+    with m.app.app_context():
+        m.db.session.execute(insert(m.User), [dict(id=seed_start + i, email=f"s{i}@bench.local", full_name=f"S{i}",
+                                                   role="user", password_hash="!") for i in range(50)])
+        m.db.session.execute(insert(m.CommunityReport), [dict(user_id=seed_start + i, disaster_type="Fire", location="L",
+                                                              description="d", verified_by_admin_id=admin_id)
+                                                         for i in range(50)])
+        m.db.session.execute(insert(m.SafetyCheck), [dict(user_id=seed_start + i, status="Safe") for i in range(50)])
+        m.db.session.commit()
+    counts["many_rows"] = query_count(client, "/admin_dashboard")
+
+    print(counts)
+    if len(set(counts.values())) != 1:
+        print("FAIL: /admin_dashboard query count depends on row count (N+1 lazy loads).")
+        sys.exit(1)
+    print("ok: /admin_dashboard runs", counts["many_rows"], "queries regardless of row count")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# Explanation: Shared helpers for the benchmark scripts (temp database, synthetic data, percentiles).
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_app(db_path=None, csrf=False):
+    # The app reads DATABASE_URL at import time, so point it at a scratch file first.
+    db_path = db_path or os.path.join(tempfile.mkdtemp(prefix="disaster_bench_"), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    # Load generators hit the write routes from one address far past the production limits; export
+    # RATE_LIMIT_ENABLED=1 / LOAD_SHED_ENABLED=1 to benchmark with them on.
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+    os.environ.setdefault("LOAD_SHED_ENABLED", "0")
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    import app as app_module
+    app_module.app.config["WTF_CSRF_ENABLED"] = csrf
+    return app_module
+
+
+def seed(app_module, users=100, reports_per_user=20, checks_per_user=20, plans_per_user=2, resources=0,
+         articles=0, password_hash="!", seed=42):
+    # Bulk-insert synthetic rows with spread-out timestamps; returns the list of user ids.
+    from sqlalchemy import insert
+    m = app_module
+    rnd = random.Random(seed)
+    now = datetime.utcnow()
+
+    def bulk(model, rows):
+        if rows:
+            m.db.session.execute(insert(model), rows)
+
+    with m.app.app_context():
+        m.db.create_all()
+        bulk(m.User, [
+            dict(id=i, email=f"user{i}@bench.example.org", full_name=f"Bench User {i}", role="user",
+                 password_hash=password_hash, created_at=now - timedelta(days=30)) for i in range(1, users + 1)])
+        bulk(m.CommunityReport, [
+            dict(user_id=u, disaster_type=rnd.choice(["Typhoon", "Flood", "Earthquake", "Fire", "Landslide"]),
+                 location=f"{rnd.randint(1, 99):02d} Munlawin Sur, Alitagtag, Batangas", description="Bench report",
+                 status=rnd.choice(["pending", "verified", "resolved"]),
+                 created_at=now - timedelta(minutes=rnd.randint(0, 43200)))
+            for u in range(1, users + 1) for _ in range(reports_per_user)])
+        bulk(m.SafetyCheck, [
+            dict(user_id=u, status=rnd.choice(["Safe", "Needs Help", "Missing"]), note=None,
+                 created_at=now - timedelta(minutes=rnd.randint(0, 43200)))
+            for u in range(1, users + 1) for _ in range(checks_per_user)])
+        bulk(m.EmergencyPlan, [
+            dict(user_id=u, household_members=rnd.randint(1, 8), meeting_point="Barangay Hall",
+                 created_at=now - timedelta(minutes=rnd.randint(0, 43200)))
+            for u in range(1, users + 1) for _ in range(plans_per_user)])
+        bulk(m.Resource, [
+            dict(name=f"Bench Resource {i}", category=rnd.choice(["Hospital", "Evacuation Center", "Hotline", "Police"]),
+                 address=f"{i} National Road, Alitagtag, Batangas", contact=f"0917-000-{i % 10000:04d}",
+                 latitude=round(13.7 + rnd.random() * 0.4, 6), longitude=round(120.9 + rnd.random() * 0.4, 6))
+            for i in range(1, resources + 1)])
+        bulk(m.Article, [
+            dict(title=f"Preparedness Guide {i}", category=rnd.choice(["Emergency Kit Guide", "Contingency Plan", "Article"]),
+                 content="Pack water, food, first aid, flashlight and radio. Agree on a meeting point. " * 5,
+                 published_at=now - timedelta(hours=i)) for i in range(1, articles + 1)])
+        m.db.session.commit()
+    return list(range(1, users + 1))
+
+
+def percentiles(samples):
+    # Latency summary in milliseconds.
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+    return {
+        "n": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 4),
+        "p50_ms": round(pick(0.50), 4),
+        "p95_ms": round(pick(0.95), 4),
+        "p99_ms": round(pick(0.99), 4),
+    }
+
+
+def timed(fn, iterations):
+    samples = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        fn(i)
+        samples.append(time.perf_counter() - start)
+    return samples
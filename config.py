@@ -11,3 +11,204 @@ class Config:
 
     # Explanation: Disable tracking modifications overhead.
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Explanation: Session storage. "sqlite" (default) keeps sessions server-side in SESSION_DATABASE
+    # (default: sessions.db next to the app database; a /dev/shm path makes it a shared-memory store),
+    # so logouts and admin revocations are immediate; "memory" is per process (single worker only);
+    # "cookie" is Flask's signed cookie. Sessions expire after SESSION_IDLE_MINUTES without a request,
+    # and the logged-in user's identity/role is cached per worker (revalidated by a per-user version).
+    SESSION_BACKEND = os.environ.get("SESSION_BACKEND", "sqlite")
+    SESSION_DATABASE = os.environ.get("SESSION_DATABASE")
+    SESSION_IDLE_MINUTES = int(os.environ.get("SESSION_IDLE_MINUTES", 720))
+    SESSION_TOUCH_SECONDS = int(os.environ.get("SESSION_TOUCH_SECONDS", 300))
+    SESSION_PURGE_SECONDS = int(os.environ.get("SESSION_PURGE_SECONDS", 600))
+    SESSION_IDENTITY_CACHE_SIZE = int(os.environ.get("SESSION_IDENTITY_CACHE_SIZE", 4096))
+    SESSION_IDENTITY_CACHE_TTL = float(os.environ.get("SESSION_IDENTITY_CACHE_TTL", 300))
+
+    # Explanation: Per-user dashboard summary cache (entries per worker, seconds to live).
+    DASHBOARD_CACHE_SIZE = int(os.environ.get("DASHBOARD_CACHE_SIZE", 4096))
+    DASHBOARD_CACHE_TTL = float(os.environ.get("DASHBOARD_CACHE_TTL", 30))
+
+    # Explanation: Rendered-page cache for anonymous visitors of the public pages. Backend "memory" is
+    # per worker; "filesystem" shares renders across workers via PAGE_CACHE_DIR (e.g. /dev/shm/disaster_pages).
+    PAGE_CACHE_ENABLED = os.environ.get("PAGE_CACHE_ENABLED", "1") == "1"
+    PAGE_CACHE_BACKEND = os.environ.get("PAGE_CACHE_BACKEND", "memory")
+    PAGE_CACHE_DIR = os.environ.get("PAGE_CACHE_DIR")
+    PAGE_CACHE_SIZE = int(os.environ.get("PAGE_CACHE_SIZE", 512))
+    PAGE_CACHE_TTL = float(os.environ.get("PAGE_CACHE_TTL", 300))
+
+    # Explanation: Offline bundle written by `flask build-offline` (default static/offline); once built,
+    # admin article/resource changes rebuild it in the background after OFFLINE_REBUILD_DELAY seconds.
+    OFFLINE_BUNDLE_DIR = os.environ.get("OFFLINE_BUNDLE_DIR")
+    OFFLINE_AUTO_REBUILD = os.environ.get("OFFLINE_AUTO_REBUILD", "1") == "1"
+    OFFLINE_REBUILD_DELAY = float(os.environ.get("OFFLINE_REBUILD_DELAY", 2))
+
+    # Explanation: Keyset pagination page size for list views (?per_page= is capped at MAX_PAGE_SIZE).
+    PAGE_SIZE = int(os.environ.get("PAGE_SIZE", 20))
+    MAX_PAGE_SIZE = int(os.environ.get("MAX_PAGE_SIZE", 100))
+
+    # Explanation: Add an X-Query-Count header with the number of SQL statements each request ran.
+    QUERY_COUNT_HEADER = os.environ.get("QUERY_COUNT_HEADER", "0") == "1"
+
+    # Explanation: Opt-in instrumentation served at /admin/metrics (Prometheus text). Statements slower than
+    # METRICS_SLOW_QUERY_MS are logged with their EXPLAIN QUERY PLAN. An admin (or a request whose X-Profile
+    # header equals METRICS_PROFILE_TOKEN) can profile one request; results go to METRICS_PROFILE_DIR.
+    METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "0") == "1"
+    METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+    METRICS_SLOW_QUERY_MS = float(os.environ.get("METRICS_SLOW_QUERY_MS", 100))
+    METRICS_PROFILE_TOKEN = os.environ.get("METRICS_PROFILE_TOKEN")
+    METRICS_PROFILE_DIR = os.environ.get("METRICS_PROFILE_DIR")
+
+    # Explanation: Password hashing (werkzeug method string with cost, e.g. "scrypt:16384:8:1" or
+    # "pbkdf2:sha256:600000"); older hashes are upgraded at login. Hashes run in PASSWORD_HASH_WORKERS
+    # processes (0 = in the request thread) with at most PASSWORD_HASH_MAX_PENDING waiting, and each
+    # client IP/email may have PASSWORD_LOGIN_CONCURRENCY checks in flight before getting a 429.
+    PASSWORD_HASH_METHOD = os.environ.get("PASSWORD_HASH_METHOD", "scrypt")
+    PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", os.cpu_count() or 1))
+    PASSWORD_HASH_MAX_PENDING = int(os.environ.get("PASSWORD_HASH_MAX_PENDING", 64))
+    PASSWORD_HASH_TIMEOUT = float(os.environ.get("PASSWORD_HASH_TIMEOUT", 10))
+    PASSWORD_LOGIN_CONCURRENCY = int(os.environ.get("PASSWORD_LOGIN_CONCURRENCY", 2))
+    PASSWORD_RETRY_AFTER = int(os.environ.get("PASSWORD_RETRY_AFTER", 2))
+
+    # Explanation: Rows per INSERT/commit for the bulk report ingestion API.
+    INGEST_BATCH_SIZE = int(os.environ.get("INGEST_BATCH_SIZE", 2000))
+
+    # Explanation: Near-duplicate report clustering at ingest. Reports of the same disaster type within the
+    # window whose estimated similarity (location trigrams + description words, MinHash) reaches the
+    # threshold join one incident. BANDS x rows = PERMUTATIONS; more bands finds more candidates.
+    REPORT_CLUSTERING_ENABLED = os.environ.get("REPORT_CLUSTERING_ENABLED", "1") == "1"
+    REPORT_CLUSTER_WINDOW_MINUTES = int(os.environ.get("REPORT_CLUSTER_WINDOW_MINUTES", 360))
+    REPORT_CLUSTER_THRESHOLD = float(os.environ.get("REPORT_CLUSTER_THRESHOLD", 0.65))
+    REPORT_CLUSTER_PERMUTATIONS = int(os.environ.get("REPORT_CLUSTER_PERMUTATIONS", 64))
+    REPORT_CLUSTER_BANDS = int(os.environ.get("REPORT_CLUSTER_BANDS", 16))
+
+    # Explanation: Report ids per UPDATE for bulk moderation (/admin/reports/bulk); one transaction overall.
+    MODERATION_BATCH_SIZE = int(os.environ.get("MODERATION_BATCH_SIZE", 500))
+
+    # Explanation: Rows fetched per batch by the streaming CSV/NDJSON exports.
+    EXPORT_CHUNK_SIZE = int(os.environ.get("EXPORT_CHUNK_SIZE", 1000))
+
+    # Explanation: Rows per transaction for `flask import-data`.
+    IMPORT_BATCH_SIZE = int(os.environ.get("IMPORT_BATCH_SIZE", 20000))
+
+    # Explanation: Write-behind mode for safety check-ins. Entries are journaled (fsync, journal or none),
+    # queued, and group-committed every WRITE_BEHIND_FLUSH_MS or WRITE_BEHIND_BATCH_SIZE rows. Rows that
+    # cannot be inserted at all go to <journal dir>/<queue>.deadletter (default dir instance/journal).
+    WRITE_BEHIND_ENABLED = os.environ.get("WRITE_BEHIND_ENABLED", "0") == "1"
+    WRITE_BEHIND_MAX_QUEUE = int(os.environ.get("WRITE_BEHIND_MAX_QUEUE", 10000))
+    WRITE_BEHIND_BATCH_SIZE = int(os.environ.get("WRITE_BEHIND_BATCH_SIZE", 500))
+    WRITE_BEHIND_FLUSH_MS = int(os.environ.get("WRITE_BEHIND_FLUSH_MS", 50))
+    WRITE_BEHIND_ENQUEUE_TIMEOUT = float(os.environ.get("WRITE_BEHIND_ENQUEUE_TIMEOUT", 0.5))
+    WRITE_BEHIND_RETRY_AFTER = int(os.environ.get("WRITE_BEHIND_RETRY_AFTER", 5))
+    WRITE_BEHIND_DURABILITY = os.environ.get("WRITE_BEHIND_DURABILITY", "fsync")
+    WRITE_BEHIND_JOURNAL_DIR = os.environ.get("WRITE_BEHIND_JOURNAL_DIR")
+
+    # Explanation: Nearest-resource search grid (cell size in degrees), cross-worker staleness check, result cap.
+    NEARBY_CELL_DEG = float(os.environ.get("NEARBY_CELL_DEG", 0.05))
+    NEARBY_INDEX_CHECK_SECONDS = float(os.environ.get("NEARBY_INDEX_CHECK_SECONDS", 5))
+    NEARBY_MAX_K = int(os.environ.get("NEARBY_MAX_K", 50))
+
+    # Explanation: Maximum hits returned by the full-text search pages.
+    SEARCH_LIMIT = int(os.environ.get("SEARCH_LIMIT", 20))
+
+    # Explanation: ASGI mode (asgi.py): pool of the read-only aiosqlite engine behind the async pages,
+    # and threads running the remaining (synchronous) Flask routes and the async pages' blocking steps.
+    ASYNC_DB_POOL_SIZE = int(os.environ.get("ASYNC_DB_POOL_SIZE", 20))
+    ASYNC_DB_MAX_OVERFLOW = int(os.environ.get("ASYNC_DB_MAX_OVERFLOW", 20))
+    ASGI_WSGI_THREADS = int(os.environ.get("ASGI_WSGI_THREADS", 32))
+
+    # Explanation: Admin live feed: events kept for Last-Event-ID resume, per-client backlog, heartbeat.
+    EVENT_BUFFER_SIZE = int(os.environ.get("EVENT_BUFFER_SIZE", 1000))
+    EVENT_SUBSCRIBER_QUEUE_SIZE = int(os.environ.get("EVENT_SUBSCRIBER_QUEUE_SIZE", 1000))
+    SSE_HEARTBEAT_SECONDS = float(os.environ.get("SSE_HEARTBEAT_SECONDS", 15))
+
+    # Explanation: Token-bucket rate limits on write/auth routes: endpoint -> {scope: (burst, seconds to
+    # refill the burst)}. "ip" is per client address (kept generous: a shelter shares one NAT address),
+    # "user" is per account (the logged-in user, else the email a login/registration form names).
+    # RATE_LIMIT_BACKEND "memory" is per worker; "sqlite" shares buckets across workers through
+    # RATE_LIMIT_DATABASE (default: ratelimit.db next to the app database; /dev/shm for shared memory).
+    RATE_LIMIT_ENABLED = os.environ.get("RATE_LIMIT_ENABLED", "1") == "1"
+    RATE_LIMIT_BACKEND = os.environ.get("RATE_LIMIT_BACKEND", "memory")
+    RATE_LIMIT_DATABASE = os.environ.get("RATE_LIMIT_DATABASE")
+    RATE_LIMIT_PURGE_SECONDS = int(os.environ.get("RATE_LIMIT_PURGE_SECONDS", 300))
+    RATE_LIMITS = {
+        "login": {"ip": (60, 60), "user": (10, 300)},
+        "adminlogin": {"ip": (30, 60), "user": (10, 300)},
+        "register": {"ip": (30, 600), "user": (3, 600)},
+        "communityreport": {"ip": (120, 60), "user": (5, 60)},
+        "bulk_reports": {"ip": (60, 60), "user": (6, 60)},
+        "safetycheck": {"ip": (240, 60), "user": (6, 60)},
+    }
+
+    # Explanation: Load shedding. Past LOAD_SHED_WRITE_LATENCY_MS average write-statement time (over the
+    # last LOAD_SHED_WINDOW_SECONDS), LOAD_SHED_QUEUE_RATIO write-behind queue fill or
+    # LOAD_SHED_MAX_IN_FLIGHT requests per worker (0 = no limit), "low" routes get 503 + Retry-After;
+    # past twice that, "normal" ones (every route not listed) too. "critical" routes and admins are
+    # always admitted.
+    LOAD_SHED_ENABLED = os.environ.get("LOAD_SHED_ENABLED", "1") == "1"
+    LOAD_SHED_WRITE_LATENCY_MS = float(os.environ.get("LOAD_SHED_WRITE_LATENCY_MS", 200))
+    LOAD_SHED_QUEUE_RATIO = float(os.environ.get("LOAD_SHED_QUEUE_RATIO", 0.5))
+    LOAD_SHED_MAX_IN_FLIGHT = int(os.environ.get("LOAD_SHED_MAX_IN_FLIGHT", 0))
+    LOAD_SHED_WINDOW_SECONDS = float(os.environ.get("LOAD_SHED_WINDOW_SECONDS", 10))
+    LOAD_SHED_RETRY_AFTER = int(os.environ.get("LOAD_SHED_RETRY_AFTER", 5))
+    LOAD_SHED_PRIORITIES = {
+        "educationalhub": "low",
+        "api_search_articles": "low",
+        "personalinformation": "low",
+        "safetycheck": "critical",
+        "login": "critical",
+        "adminlogin": "critical",
+        "logout": "critical",
+        "static": "critical",
+        "service_worker": "critical",
+    }
+
+    # Explanation: Retention. `flask archive` (and, every ARCHIVE_INTERVAL_MINUTES when > 0, a background
+    # job) moves resolved reports older than ARCHIVE_REPORT_DAYS and safety check-ins older than
+    # ARCHIVE_SAFETY_DAYS (never a user's latest) into per-month tables in ARCHIVE_DATABASE (default:
+    # archive.db next to the app database), ARCHIVE_BATCH_SIZE rows per transaction with a pause between.
+    ARCHIVE_ENABLED = os.environ.get("ARCHIVE_ENABLED", "1") == "1"
+    ARCHIVE_DATABASE = os.environ.get("ARCHIVE_DATABASE")
+    ARCHIVE_REPORT_DAYS = int(os.environ.get("ARCHIVE_REPORT_DAYS", 180))
+    ARCHIVE_SAFETY_DAYS = int(os.environ.get("ARCHIVE_SAFETY_DAYS", 90))
+    ARCHIVE_BATCH_SIZE = int(os.environ.get("ARCHIVE_BATCH_SIZE", 500))
+    ARCHIVE_PAUSE_MS = float(os.environ.get("ARCHIVE_PAUSE_MS", 50))
+    ARCHIVE_INTERVAL_MINUTES = float(os.environ.get("ARCHIVE_INTERVAL_MINUTES", 0))
+
+
+class ProductionSQLiteConfig(Config):
+    # Explanation: SQLite tuned for several gunicorn workers: WAL so readers never block the writer,
+    # NORMAL sync (durable at checkpoints, safe with WAL), a busy timeout instead of instant
+    # "database is locked", memory-mapped reads and a larger page cache.
+    SQLITE_PRAGMAS = {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", 15000)),
+        "mmap_size": int(os.environ.get("SQLITE_MMAP_SIZE", 268435456)),
+        "cache_size": int(os.environ.get("SQLITE_CACHE_SIZE_KB", 65536)) * -1,
+        "temp_store": "MEMORY",
+        "foreign_keys": "ON",
+    }
+
+    # Explanation: Pooled connections per worker; the pysqlite timeout mirrors busy_timeout.
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "pool_size": int(os.environ.get("SQLITE_POOL_SIZE", 8)),
+        "max_overflow": int(os.environ.get("SQLITE_MAX_OVERFLOW", 16)),
+        "pool_timeout": 30,
+        "connect_args": {"timeout": 15, "check_same_thread": False},
+    }
+
+    # Explanation: Route SELECTs made during GET/HEAD requests to separate read-only connections.
+    SQLITE_READ_SPLIT = os.environ.get("SQLITE_READ_SPLIT", "1") == "1"
+    SQLITE_READ_ENGINE_OPTIONS = {
+        "pool_size": int(os.environ.get("SQLITE_READ_POOL_SIZE", 16)),
+        "max_overflow": int(os.environ.get("SQLITE_READ_MAX_OVERFLOW", 32)),
+        "connect_args": {"timeout": 15, "check_same_thread": False},
+    }
+
+
+# Explanation: Select a profile with APP_CONFIG (default or production-sqlite).
+config_by_name = {
+    "default": Config,
+    "production-sqlite": ProductionSQLiteConfig,
+}
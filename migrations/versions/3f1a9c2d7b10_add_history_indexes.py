@@ -0,0 +1,35 @@
+"""add per-user history and report status indexes
+
+Revision ID: 3f1a9c2d7b10
+Revises: 
+Create Date: 2026-10-17 09:12:41.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1a9c2d7b10'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Databases built with `flask init-db` already carry these, hence if_not_exists.
+    op.create_index('ix_community_report_user_created', 'community_report',
+                    ['user_id', sa.text('created_at DESC'), sa.text('id DESC')], if_not_exists=True)
+    op.create_index('ix_community_report_status_created', 'community_report',
+                    ['status', 'created_at'], if_not_exists=True)
+    op.create_index('ix_safety_check_user_created', 'safety_check',
+                    ['user_id', sa.text('created_at DESC'), sa.text('id DESC')], if_not_exists=True)
+    op.create_index('ix_emergency_plan_user_created', 'emergency_plan',
+                    ['user_id', sa.text('created_at DESC'), sa.text('id DESC')], if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_emergency_plan_user_created', table_name='emergency_plan', if_exists=True)
+    op.drop_index('ix_safety_check_user_created', table_name='safety_check', if_exists=True)
+    op.drop_index('ix_community_report_status_created', table_name='community_report', if_exists=True)
+    op.drop_index('ix_community_report_user_created', table_name='community_report', if_exists=True)
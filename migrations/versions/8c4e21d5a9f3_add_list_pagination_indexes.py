@@ -0,0 +1,30 @@
+"""add article and resource indexes for keyset pagination
+
+Revision ID: 8c4e21d5a9f3
+Revises: 3f1a9c2d7b10
+Create Date: 2026-10-17 11:40:03.527719
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c4e21d5a9f3'
+down_revision = '3f1a9c2d7b10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_article_published', 'article',
+                    [sa.text('published_at DESC'), sa.text('id DESC')], if_not_exists=True)
+    op.create_index('ix_resource_category', 'resource', ['category', 'id'], if_not_exists=True)
+    op.create_index('ix_resource_updated', 'resource',
+                    [sa.text('updated_at DESC'), sa.text('id DESC')], if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_resource_updated', table_name='resource', if_exists=True)
+    op.drop_index('ix_resource_category', table_name='resource', if_exists=True)
+    op.drop_index('ix_article_published', table_name='article', if_exists=True)
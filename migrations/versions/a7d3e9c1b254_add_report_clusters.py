@@ -0,0 +1,63 @@
+"""add report_cluster table and community_report.cluster_id for near-duplicate incidents
+
+Revision ID: a7d3e9c1b254
+Revises: f3b18c6a2e05
+Create Date: 2026-10-17 22:05:41.318207
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7d3e9c1b254'
+down_revision = 'f3b18c6a2e05'
+branch_labels = None
+depends_on = None
+
+
+def _join(row):
+    return (f"UPDATE report_cluster SET report_count = report_count + 1, "
+            f"latest_report_id = max(coalesce(latest_report_id, 0), {row}.id), "
+            f"last_seen_at = max(last_seen_at, coalesce({row}.created_at, last_seen_at)) "
+            f"WHERE id = {row}.cluster_id; ")
+
+
+def _leave(row):
+    return (f"UPDATE report_cluster SET report_count = report_count - 1, "
+            f"latest_report_id = (SELECT max(id) FROM community_report WHERE cluster_id = {row}.cluster_id) "
+            f"WHERE id = {row}.cluster_id; ")
+
+
+def upgrade():
+    op.create_table(
+        'report_cluster',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('disaster_type', sa.String(length=100), nullable=False),
+        sa.Column('location', sa.String(length=255), nullable=False),
+        sa.Column('report_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('latest_report_id', sa.Integer()),
+        sa.Column('first_seen_at', sa.DateTime(), nullable=False),
+        sa.Column('last_seen_at', sa.DateTime(), nullable=False),
+        if_not_exists=True,
+    )
+    op.create_index('ix_report_cluster_last_seen', 'report_cluster', ['last_seen_at'], if_not_exists=True)
+    op.add_column('community_report', sa.Column('cluster_id', sa.Integer()))
+    op.create_index('ix_community_report_cluster', 'community_report', ['cluster_id'], if_not_exists=True)
+    op.execute("CREATE TRIGGER IF NOT EXISTS report_cluster_ai AFTER INSERT ON community_report "
+               f"WHEN new.cluster_id IS NOT NULL BEGIN {_join('new')}END")
+    op.execute("CREATE TRIGGER IF NOT EXISTS report_cluster_ad AFTER DELETE ON community_report "
+               f"WHEN old.cluster_id IS NOT NULL BEGIN {_leave('old')}END")
+    op.execute("CREATE TRIGGER IF NOT EXISTS report_cluster_au AFTER UPDATE OF cluster_id ON community_report "
+               f"WHEN old.cluster_id IS NOT new.cluster_id BEGIN {_leave('old')}{_join('new')}END")
+    # Existing reports stay unclustered; `flask cluster-reports --hours N` groups recent ones.
+
+
+def downgrade():
+    for suffix in ('ai', 'ad', 'au'):
+        op.execute(f"DROP TRIGGER IF EXISTS report_cluster_{suffix}")
+    op.drop_index('ix_community_report_cluster', table_name='community_report', if_exists=True)
+    # Plain ALTER TABLE (SQLite 3.35+): a batch rebuild would drop the table's other triggers.
+    op.execute("ALTER TABLE community_report DROP COLUMN cluster_id")
+    op.drop_index('ix_report_cluster_last_seen', table_name='report_cluster', if_exists=True)
+    op.drop_table('report_cluster', if_exists=True)
@@ -0,0 +1,46 @@
+"""add FTS5 search index over articles and community reports
+
+Revision ID: b71d0e6f2c48
+Revises: 8c4e21d5a9f3
+Create Date: 2026-10-17 14:05:12.904417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b71d0e6f2c48'
+down_revision = '8c4e21d5a9f3'
+branch_labels = None
+depends_on = None
+
+
+def _fts(table, columns):
+    cols = ", ".join(columns)
+    new = ", ".join(f"new.{c}" for c in columns)
+    old = ", ".join(f"old.{c}" for c in columns)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {table}_fts USING fts5({cols}, content='{table}', "
+        f"content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_fts_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {table}_fts(rowid, {cols}) VALUES (new.id, {new}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_fts_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {table}_fts({table}_fts, rowid, {cols}) VALUES ('delete', old.id, {old}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_fts_au AFTER UPDATE OF {cols} ON {table} BEGIN "
+        f"INSERT INTO {table}_fts({table}_fts, rowid, {cols}) VALUES ('delete', old.id, {old}); "
+        f"INSERT INTO {table}_fts(rowid, {cols}) VALUES (new.id, {new}); END",
+        f"INSERT INTO {table}_fts({table}_fts) VALUES ('rebuild')",
+    ]
+
+
+def upgrade():
+    for statement in _fts('article', ['title', 'content']) + _fts('community_report', ['location', 'description']):
+        op.execute(statement)
+
+
+def downgrade():
+    for table in ('article', 'community_report'):
+        for suffix in ('ai', 'ad', 'au'):
+            op.execute(f"DROP TRIGGER IF EXISTS {table}_fts_{suffix}")
+        op.execute(f"DROP TABLE IF EXISTS {table}_fts")
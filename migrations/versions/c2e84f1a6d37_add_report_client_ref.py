@@ -0,0 +1,28 @@
+"""add community_report.client_ref for idempotent offline report uploads
+
+Revision ID: c2e84f1a6d37
+Revises: a7d3e9c1b254
+Create Date: 2026-10-18 09:12:04.551930
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c2e84f1a6d37'
+down_revision = 'a7d3e9c1b254'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('community_report', sa.Column('client_ref', sa.String(length=64)))
+    op.create_index('ux_community_report_client_ref', 'community_report', ['user_id', 'client_ref'], unique=True,
+                    sqlite_where=sa.text('client_ref IS NOT NULL'), if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ux_community_report_client_ref', table_name='community_report', if_exists=True)
+    # Plain ALTER TABLE (SQLite 3.35+): a batch rebuild would drop the table's triggers.
+    op.execute("ALTER TABLE community_report DROP COLUMN client_ref")
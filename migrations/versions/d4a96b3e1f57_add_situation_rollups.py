@@ -0,0 +1,71 @@
+"""add situation-report rollup tables and triggers
+
+Revision ID: d4a96b3e1f57
+Revises: b71d0e6f2c48
+Create Date: 2026-10-17 16:22:41.318806
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4a96b3e1f57'
+down_revision = 'b71d0e6f2c48'
+branch_labels = None
+depends_on = None
+
+GRANULARITIES = {'minute': '%Y-%m-%d %H:%M:00.000000', 'hour': '%Y-%m-%d %H:00:00.000000'}
+TABLES = {
+    'report_rollup': ('community_report', ['disaster_type', 'status', 'area'],
+                      {'area': 'lower(trim({row}.location))'}, ['disaster_type', 'status', 'location', 'created_at']),
+    'safety_rollup': ('safety_check', ['status'], {}, ['status', 'created_at']),
+}
+
+
+def _upserts(rollup, row, delta):
+    source, keys, exprs, _ = TABLES[rollup]
+    values = ", ".join(exprs.get(k, '{row}.' + k).format(row=row) for k in keys)
+    return "".join(
+        f"INSERT INTO {rollup} (granularity, bucket, {', '.join(keys)}, count) "
+        f"VALUES ('{g}', strftime('{fmt}', coalesce({row}.created_at, CURRENT_TIMESTAMP)), {values}, {delta}) "
+        f"ON CONFLICT DO UPDATE SET count = count + excluded.count; "
+        for g, fmt in GRANULARITIES.items())
+
+
+def _backfill(rollup):
+    source, keys, exprs, _ = TABLES[rollup]
+    values = ", ".join(exprs.get(k, '{row}.' + k).format(row='t') for k in keys)
+    return [
+        f"INSERT INTO {rollup} (granularity, bucket, {', '.join(keys)}, count) "
+        f"SELECT '{g}', strftime('{fmt}', coalesce(t.created_at, CURRENT_TIMESTAMP)) AS b, {values}, count(*) "
+        f"FROM {source} t GROUP BY b, {values}"
+        for g, fmt in GRANULARITIES.items()]
+
+
+def upgrade():
+    op.execute("""CREATE TABLE IF NOT EXISTS report_rollup (
+        granularity VARCHAR(10) NOT NULL, bucket DATETIME NOT NULL, disaster_type VARCHAR(100) NOT NULL,
+        status VARCHAR(50) NOT NULL, area VARCHAR(255) NOT NULL, count INTEGER NOT NULL,
+        PRIMARY KEY (granularity, bucket, disaster_type, status, area)) WITHOUT ROWID""")
+    op.execute("""CREATE TABLE IF NOT EXISTS safety_rollup (
+        granularity VARCHAR(10) NOT NULL, bucket DATETIME NOT NULL, status VARCHAR(50) NOT NULL,
+        count INTEGER NOT NULL, PRIMARY KEY (granularity, bucket, status)) WITHOUT ROWID""")
+    for rollup, (source, keys, exprs, watched) in TABLES.items():
+        changed = " OR ".join(f"old.{c} IS NOT new.{c}" for c in watched)
+        op.execute(f"CREATE TRIGGER IF NOT EXISTS {rollup}_ai AFTER INSERT ON {source} BEGIN "
+                   f"{_upserts(rollup, 'new', 1)}END")
+        op.execute(f"CREATE TRIGGER IF NOT EXISTS {rollup}_ad AFTER DELETE ON {source} BEGIN "
+                   f"{_upserts(rollup, 'old', -1)}END")
+        op.execute(f"CREATE TRIGGER IF NOT EXISTS {rollup}_au AFTER UPDATE OF {', '.join(watched)} ON {source} "
+                   f"WHEN {changed} BEGIN {_upserts(rollup, 'old', -1)}{_upserts(rollup, 'new', 1)}END")
+        op.execute(f"DELETE FROM {rollup}")
+        for statement in _backfill(rollup):
+            op.execute(statement)
+
+
+def downgrade():
+    for rollup in TABLES:
+        for suffix in ('ai', 'ad', 'au'):
+            op.execute(f"DROP TRIGGER IF EXISTS {rollup}_{suffix}")
+        op.execute(f"DROP TABLE IF EXISTS {rollup}")
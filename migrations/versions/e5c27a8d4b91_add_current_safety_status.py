@@ -0,0 +1,61 @@
+"""add current_safety_status table maintained from safety_check
+
+Revision ID: e5c27a8d4b91
+Revises: d4a96b3e1f57
+Create Date: 2026-10-17 17:48:09.552130
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5c27a8d4b91'
+down_revision = 'd4a96b3e1f57'
+branch_labels = None
+depends_on = None
+
+LATEST_FOR = ("INSERT OR IGNORE INTO current_safety_status (user_id, safety_check_id, status, note, checked_at) "
+              "SELECT user_id, id, status, note, coalesce(created_at, CURRENT_TIMESTAMP) FROM safety_check "
+              "WHERE user_id = {row}.user_id ORDER BY created_at DESC, id DESC LIMIT 1; ")
+
+
+def upgrade():
+    op.create_table(
+        'current_safety_status',
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('user.id'), primary_key=True),
+        sa.Column('safety_check_id', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(length=50), nullable=False),
+        sa.Column('note', sa.Text()),
+        sa.Column('checked_at', sa.DateTime(), nullable=False),
+        if_not_exists=True,
+    )
+    op.create_index('ix_current_safety_status_status', 'current_safety_status',
+                    ['status', sa.text('checked_at DESC'), sa.text('user_id DESC')], if_not_exists=True)
+    op.execute("""CREATE TRIGGER IF NOT EXISTS current_safety_status_ai AFTER INSERT ON safety_check BEGIN
+        INSERT INTO current_safety_status (user_id, safety_check_id, status, note, checked_at)
+        VALUES (new.user_id, new.id, new.status, new.note, coalesce(new.created_at, CURRENT_TIMESTAMP))
+        ON CONFLICT (user_id) DO UPDATE SET safety_check_id = excluded.safety_check_id,
+            status = excluded.status, note = excluded.note, checked_at = excluded.checked_at
+        WHERE (excluded.checked_at, excluded.safety_check_id)
+              >= (current_safety_status.checked_at, current_safety_status.safety_check_id);
+    END""")
+    op.execute("CREATE TRIGGER IF NOT EXISTS current_safety_status_ad AFTER DELETE ON safety_check BEGIN "
+               "DELETE FROM current_safety_status WHERE user_id = old.user_id AND safety_check_id = old.id; "
+               + LATEST_FOR.format(row="old") + "END")
+    op.execute("CREATE TRIGGER IF NOT EXISTS current_safety_status_au AFTER UPDATE OF user_id, status, note, created_at "
+               "ON safety_check BEGIN "
+               "DELETE FROM current_safety_status WHERE user_id IN (old.user_id, new.user_id); "
+               + LATEST_FOR.format(row="old") + LATEST_FOR.format(row="new") + "END")
+    op.execute("DELETE FROM current_safety_status")
+    op.execute("""INSERT INTO current_safety_status (user_id, safety_check_id, status, note, checked_at)
+        SELECT user_id, id, status, note, coalesce(created_at, CURRENT_TIMESTAMP) FROM (
+            SELECT *, row_number() OVER (PARTITION BY user_id ORDER BY created_at DESC, id DESC) AS n
+            FROM safety_check) WHERE n = 1""")
+
+
+def downgrade():
+    for suffix in ('ai', 'ad', 'au'):
+        op.execute(f"DROP TRIGGER IF EXISTS current_safety_status_{suffix}")
+    op.drop_index('ix_current_safety_status_status', table_name='current_safety_status', if_exists=True)
+    op.drop_table('current_safety_status', if_exists=True)
@@ -0,0 +1,66 @@
+"""key report_rollup.area by comma-separated location parts
+
+Revision ID: e8b53d2c9a14
+Revises: c2e84f1a6d37
+Create Date: 2026-10-18 14:37:52.208416
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8b53d2c9a14'
+down_revision = 'c2e84f1a6d37'
+branch_labels = None
+depends_on = None
+
+GRANULARITIES = {'minute': '%Y-%m-%d %H:%M:00.000000', 'hour': '%Y-%m-%d %H:00:00.000000'}
+OLD_AREA = "lower(trim({}))"
+NEW_AREA = "replace(replace(replace(lower(trim({})), ', ', ','), ' ,', ','), ',', ', ')"
+
+
+def _upserts(area, row, delta):
+    key = f"{row}.disaster_type, {row}.status, {area.format(row + '.location')}"
+    return "".join(
+        f"INSERT INTO report_rollup (granularity, bucket, disaster_type, status, area, count) "
+        f"VALUES ('{g}', strftime('{fmt}', coalesce({row}.created_at, CURRENT_TIMESTAMP)), {key}, {delta}) "
+        f"ON CONFLICT DO UPDATE SET count = count + excluded.count; "
+        for g, fmt in GRANULARITIES.items())
+
+
+def _create_triggers(area):
+    for suffix in ('ai', 'ad', 'au'):
+        op.execute(f"DROP TRIGGER IF EXISTS report_rollup_{suffix}")
+    op.execute(f"CREATE TRIGGER report_rollup_ai AFTER INSERT ON community_report BEGIN "
+               f"{_upserts(area, 'new', 1)}END")
+    op.execute(f"CREATE TRIGGER report_rollup_ad AFTER DELETE ON community_report BEGIN "
+               f"{_upserts(area, 'old', -1)}END")
+    op.execute(f"CREATE TRIGGER report_rollup_au AFTER UPDATE OF disaster_type, status, location, created_at "
+               f"ON community_report WHEN old.disaster_type IS NOT new.disaster_type OR old.status IS NOT new.status "
+               f"OR old.location IS NOT new.location OR old.created_at IS NOT new.created_at BEGIN "
+               f"{_upserts(area, 'old', -1)}{_upserts(area, 'new', 1)}END")
+
+
+def upgrade():
+    _create_triggers(NEW_AREA)
+    # Re-key the existing counters rather than recount community_report: rows already moved to the
+    # archive database are only counted here. The new key is a function of the old one.
+    op.execute(f"CREATE TEMP TABLE report_rollup_rekey AS "
+               f"SELECT granularity, bucket, disaster_type, status, {NEW_AREA.format('area')} AS area, "
+               f"sum(count) AS count FROM report_rollup GROUP BY 1, 2, 3, 4, 5")
+    op.execute("DELETE FROM report_rollup")
+    op.execute("INSERT INTO report_rollup (granularity, bucket, disaster_type, status, area, count) "
+               "SELECT granularity, bucket, disaster_type, status, area, count FROM report_rollup_rekey")
+    op.execute("DROP TABLE report_rollup_rekey")
+
+
+def downgrade():
+    # The old key cannot be derived from the new one, so the counters are recounted from the hot table.
+    _create_triggers(OLD_AREA)
+    op.execute("DELETE FROM report_rollup")
+    for g, fmt in GRANULARITIES.items():
+        op.execute(f"INSERT INTO report_rollup (granularity, bucket, disaster_type, status, area, count) "
+                   f"SELECT '{g}', strftime('{fmt}', coalesce(t.created_at, CURRENT_TIMESTAMP)) AS b, "
+                   f"t.disaster_type, t.status, lower(trim(t.location)), count(*) FROM community_report t "
+                   f"GROUP BY b, t.disaster_type, t.status, lower(trim(t.location))")
@@ -0,0 +1,47 @@
+"""add content_version counters for the public page cache
+
+Revision ID: f3b18c6a2e05
+Revises: e5c27a8d4b91
+Create Date: 2026-10-17 19:31:26.740213
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3b18c6a2e05'
+down_revision = 'e5c27a8d4b91'
+branch_labels = None
+depends_on = None
+
+CONTENT_TABLES = {'articles': 'article', 'resources': 'resource'}
+OPERATIONS = {'i': 'INSERT', 'u': 'UPDATE', 'd': 'DELETE'}
+
+
+def _bump(name):
+    return (f"INSERT INTO content_version (name, version, updated_at) "
+            f"VALUES ('{name}', 1, strftime('%Y-%m-%d %H:%M:%S.000000', 'now')) "
+            f"ON CONFLICT (name) DO UPDATE SET version = version + 1, updated_at = excluded.updated_at; ")
+
+
+def upgrade():
+    op.create_table(
+        'content_version',
+        sa.Column('name', sa.String(length=50), primary_key=True),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        if_not_exists=True,
+    )
+    for name, table in CONTENT_TABLES.items():
+        for suffix, operation in OPERATIONS.items():
+            op.execute(f"CREATE TRIGGER IF NOT EXISTS content_version_{table}_{suffix} "
+                       f"AFTER {operation} ON {table} BEGIN {_bump(name)}END")
+        op.execute(_bump(name))
+
+
+def downgrade():
+    for table in CONTENT_TABLES.values():
+        for suffix in OPERATIONS:
+            op.execute(f"DROP TRIGGER IF EXISTS content_version_{table}_{suffix}")
+    op.drop_table('content_version', if_exists=True)
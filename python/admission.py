@@ -0,0 +1,136 @@
+# Explanation: Admission control under surge. When SQLite write latency, write-behind queue depth
+# or requests in flight cross their thresholds, low-priority traffic (article browsing, profile
+# edits) is turned away with 503 + Retry-After, and at twice the threshold everything but the
+# critical routes (safety check-ins, sign-in, admins) is, so check-ins keep flowing.
+import threading
+import time
+from flask import g, request
+from sqlalchemy import event
+from python.ratelimit import busy_response
+from python.sessions import current_user
+
+PRIORITIES = ("low", "normal", "critical")
+# Load level at which each priority starts being shed (critical never is).
+SHED_AT = {"low": 1, "normal": 2}
+_WRITE_PREFIXES = ("INSERT", "UPDATE", "DELETE", "REPLACE")
+
+
+class AdmissionController:
+    def __init__(self):
+        self.enabled = False
+        self.priorities = {}
+        self.latency_threshold = 0.2
+        self.queue_threshold = 0.5
+        self.max_in_flight = 0
+        self.window = 10.0
+        self.retry_after = 5
+        self.queues = []  # objects with stats() -> {"depth", "maxsize"} (write-behind queues)
+        self._lock = threading.Lock()
+        self._latency = 0.0  # moving average of write statement time, seconds
+        self._latency_at = 0.0
+        self._in_flight = 0
+        self.metrics = {"admitted": 0, "shed_low": 0, "shed_normal": 0}
+
+    def init_app(self, app, db):
+        self.enabled = app.config.get("LOAD_SHED_ENABLED", True)
+        self.priorities = app.config.get("LOAD_SHED_PRIORITIES") or {}
+        unknown = set(self.priorities.values()) - set(PRIORITIES)
+        if unknown:
+            raise ValueError(f"Unknown LOAD_SHED_PRIORITIES value(s) {sorted(unknown)}; use {PRIORITIES}")
+        self.latency_threshold = app.config.get("LOAD_SHED_WRITE_LATENCY_MS", 200) / 1000.0
+        self.queue_threshold = app.config.get("LOAD_SHED_QUEUE_RATIO", 0.5)
+        self.max_in_flight = app.config.get("LOAD_SHED_MAX_IN_FLIGHT", 0)
+        self.window = app.config.get("LOAD_SHED_WINDOW_SECONDS", 10)
+        self.retry_after = app.config.get("LOAD_SHED_RETRY_AFTER", 5)
+        if not self.enabled:
+            return
+        with app.app_context():
+            engine = db.engine
+        # Write statements on the primary database include any wait for SQLite's write lock.
+        event.listen(engine, "before_cursor_execute", self._before_execute)
+        event.listen(engine, "after_cursor_execute", self._after_execute)
+
+        @app.before_request
+        def admit_request():
+            g.admission_counted = True
+            with self._lock:
+                self._in_flight += 1
+            return self.admit()
+
+        @app.teardown_request
+        def release_request(exc):
+            if g.pop("admission_counted", False):
+                with self._lock:
+                    self._in_flight -= 1
+
+    def watch(self, queue):
+        self.queues.append(queue)
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        # Kept on the execution context (as in python.metrics), so failed statements leave nothing behind.
+        if context is not None and statement.lstrip()[:7].upper().startswith(_WRITE_PREFIXES):
+            context._admission_start = time.perf_counter()
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, "_admission_start", None)
+        if start is not None:
+            self.observe_write(time.perf_counter() - start)
+
+    def observe_write(self, seconds):
+        now = time.monotonic()
+        with self._lock:
+            # Exponential moving average; after a quiet window it starts over from the next sample.
+            if now - self._latency_at > self.window:
+                self._latency = seconds
+            else:
+                self._latency += 0.2 * (seconds - self._latency)
+            self._latency_at = now
+
+    def write_latency(self):
+        # The average only counts while recent: no writes for a window means no write pressure.
+        return self._latency if time.monotonic() - self._latency_at <= self.window else 0.0
+
+    def queue_ratio(self):
+        ratios = [0.0]
+        for queue in self.queues:
+            stats = queue.stats()
+            if stats.get("enabled") and stats.get("maxsize"):
+                ratios.append(stats["depth"] / stats["maxsize"])
+        return max(ratios)
+
+    def load_level(self):
+        # 0: normal, 1: over a threshold (shed low), 2: over twice a threshold (shed low and normal).
+        pressure = max(self.write_latency() / self.latency_threshold if self.latency_threshold else 0.0,
+                       self.queue_ratio() / self.queue_threshold if self.queue_threshold else 0.0,
+                       self._in_flight / self.max_in_flight if self.max_in_flight else 0.0)
+        return 2 if pressure >= 2 else 1 if pressure >= 1 else 0
+
+    def priority(self):
+        # Admins by their stored role (the identity cache admin_required uses), not the cookie's copy.
+        user = current_user()
+        if user is not None and user.role == "admin":
+            return "critical"
+        return self.priorities.get(request.endpoint, "normal")
+
+    def admit(self):
+        priority = self.priority()
+        if priority != "critical" and self.load_level() >= SHED_AT[priority]:
+            self._count(f"shed_{priority}")
+            return busy_response(503, "The service is very busy right now. Please try again in a few seconds.",
+                                 self.retry_after)
+        self._count("admitted")
+        return None
+
+    def _count(self, name):
+        with self._lock:
+            self.metrics[name] += 1
+
+    def stats(self):
+        return dict(self.metrics, enabled=self.enabled, level=self.load_level(),
+                    write_latency_ms=round(self.write_latency() * 1000, 3), queue_ratio=round(self.queue_ratio(), 4),
+                    in_flight=self._in_flight, thresholds={"write_latency_ms": self.latency_threshold * 1000,
+                                                            "queue_ratio": self.queue_threshold,
+                                                            "max_in_flight": self.max_in_flight})
+
+
+admission = AdmissionController()
@@ -0,0 +1,277 @@
+# Explanation: Data retention. Resolved community reports and safety check-ins older than their
+# retention age move, in small batches, out of the hot tables into per-month partition tables in a
+# separate archive database (ATTACHed as "archive" on every connection), so everyday queries only
+# see recent rows. history_query() unions the partitions back in when a range reaches into them.
+import fcntl
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from sqlalchemy import Column, DateTime, MetaData, Table, bindparam, delete, event, insert, select, text, union_all
+from sqlalchemy.schema import CreateTable
+from python.models import db, CommunityReport, SafetyCheck
+from python.rollups import backfill_rollups, preserve_rollups
+
+# Archivable tables: model, partitioning column, and which old rows may move. A user's latest
+# check-in always stays, so current_safety_status and their history keep it.
+ARCHIVES = {
+    "community_report": (CommunityReport, "created_at", "t.status = 'resolved'"),
+    "safety_check": (SafetyCheck, "created_at",
+                     "NOT EXISTS (SELECT 1 FROM current_safety_status c "
+                     "WHERE c.user_id = t.user_id AND c.safety_check_id = t.id)"),
+}
+SCHEMA = "archive"
+
+
+def _month_start(month):
+    return datetime(int(month[:4]), int(month[4:]), 1)
+
+
+def _next_month(month):
+    start = _month_start(month)
+    return datetime(start.year + start.month // 12, start.month % 12 + 1, 1)
+
+
+class Archiver:
+    def __init__(self):
+        self.enabled = False
+        self.app = None
+        self.path = None
+        self.report_days = 180
+        self.safety_days = 90
+        self.batch_size = 500
+        self.pause = 0.05
+        self.interval = 0
+        self._metadata = MetaData()
+        self._partitions = {}  # partition name -> Table
+        self._ready = set()  # partitions created/checked by this process
+        self._pid = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self.last_run = None
+
+    def init_app(self, app, db):
+        self.app = app
+        self.enabled = app.config.get("ARCHIVE_ENABLED", True)
+        self.report_days = app.config.get("ARCHIVE_REPORT_DAYS", 180)
+        self.safety_days = app.config.get("ARCHIVE_SAFETY_DAYS", 90)
+        self.batch_size = app.config.get("ARCHIVE_BATCH_SIZE", 500)
+        self.pause = app.config.get("ARCHIVE_PAUSE_MS", 50) / 1000.0
+        self.interval = app.config.get("ARCHIVE_INTERVAL_MINUTES", 0) * 60
+        self.lock_path = os.path.join(app.instance_path, "archive.lock")
+        with app.app_context():
+            engine = db.engine
+        database = engine.url.database
+        self.path = app.config.get("ARCHIVE_DATABASE")
+        if not self.path and database and database != ":memory:":
+            self.path = os.path.join(os.path.dirname(os.path.abspath(database)), "archive.db")
+        if not self.enabled or engine.dialect.name != "sqlite" or not self.path:
+            self.enabled = False
+            return
+        path = os.path.abspath(self.path)
+
+        @event.listens_for(engine, "connect")
+        def attach_archive(dbapi_connection, connection_record):
+            dbapi_connection.execute(f"ATTACH DATABASE ? AS {SCHEMA}", (path,))
+
+        # Same journal mode as the primary (WAL is a property of the file, set once).
+        journal_mode = (app.config.get("SQLITE_PRAGMAS") or {}).get("journal_mode")
+        if journal_mode:
+            with engine.connect() as connection:
+                connection.exec_driver_sql(f"PRAGMA {SCHEMA}.journal_mode={journal_mode}")
+        read_engine = app.extensions.get("sqlite_read_engine")
+        if read_engine is not None:
+            @event.listens_for(read_engine, "connect")
+            def attach_archive_read_only(dbapi_connection, connection_record):
+                dbapi_connection.execute(f"ATTACH DATABASE ? AS {SCHEMA}", (f"file:{path}?mode=ro",))
+
+    # -- partitions ------------------------------------------------------------
+
+    def partition(self, name, month):
+        # Table object for archive.<name>_<YYYYMM>: the hot table's columns without its foreign keys
+        # (they cannot point across databases) or indexes (created per partition, below).
+        key = f"{name}_{month}"
+        table = self._partitions.get(key)
+        if table is None:
+            model = ARCHIVES[name][0]
+            table = Table(key, self._metadata,
+                          *[Column(c.name, c.type, primary_key=c.primary_key) for c in model.__table__.columns],
+                          schema=SCHEMA)
+            self._partitions[key] = table
+        return table
+
+    def _ensure(self, name, month):
+        table = self.partition(name, month)
+        if table.name in self._ready:
+            return table
+        db.session.execute(CreateTable(table, if_not_exists=True))
+        db.session.execute(text(f"CREATE INDEX IF NOT EXISTS {SCHEMA}.ix_{table.name}_{ARCHIVES[name][1]} "
+                                f"ON {table.name} ({ARCHIVES[name][1]})"))
+        # Columns added to the hot table since the partition was created.
+        existing = {row[1] for row in db.session.execute(text(f"PRAGMA {SCHEMA}.table_info({table.name})"))}
+        for column in table.columns:
+            if column.name not in existing:
+                db.session.execute(text(f"ALTER TABLE {SCHEMA}.{table.name} ADD COLUMN {column.name} "
+                                        f"{column.type.compile(db.engine.dialect)}"))
+        self._ready.add(table.name)
+        return table
+
+    def months(self, name):
+        # Months that have an archive partition, oldest first.
+        if not self.enabled:
+            return []
+        rows = db.session.execute(text(
+            f"SELECT name FROM {SCHEMA}.sqlite_master WHERE type = 'table' AND name GLOB :pattern ORDER BY name"),
+            {"pattern": f"{name}_[0-9][0-9][0-9][0-9][0-9][0-9]"}).scalars()
+        return [row[-6:] for row in rows]
+
+    # -- archiving -------------------------------------------------------------
+
+    def archive(self, name, older_than, batch_size=None, pause=None, dry_run=False):
+        # Moves eligible rows created before `older_than` in id order, one short transaction per
+        # batch (copy into the month partitions, keep their rollup counts, delete), pausing between
+        # batches so request writers get the lock. Returns how many rows moved (or would move).
+        # The row holding max(id) always stays: the hot tables have no AUTOINCREMENT, so SQLite
+        # would hand an archived id to the next insert and history/exports would show it twice.
+        model, time_column, condition = ARCHIVES[name]
+        batch_size = batch_size or self.batch_size
+        pause = self.pause if pause is None else pause
+        cutoff = bindparam("cutoff", older_than, type_=DateTime)
+        top = db.session.execute(text(f"SELECT max(id) FROM {name}")).scalar() or 0
+        if dry_run:
+            return db.session.execute(text(
+                f"SELECT count(*) FROM {name} t WHERE t.id < :top AND t.{time_column} < :cutoff AND {condition}")
+                .bindparams(cutoff), {"top": top}).scalar()
+        hot = model.__table__
+        columns = [column.name for column in hot.columns]
+        moved, last_id = 0, 0
+        while True:
+            rows = db.session.execute(text(
+                f"SELECT t.id, strftime('%Y%m', t.{time_column}) FROM {name} t "
+                f"WHERE t.id > :last_id AND t.id < :top AND t.{time_column} < :cutoff AND {condition} "
+                f"ORDER BY t.id LIMIT :limit").bindparams(cutoff), {"last_id": last_id, "top": top, "limit": batch_size}).all()
+            if not rows:
+                break
+            by_month = defaultdict(list)
+            for row_id, month in rows:
+                by_month[month].append(row_id)
+            ids = [row_id for row_id, _ in rows]
+            try:
+                for month, month_ids in sorted(by_month.items()):
+                    partition = self._ensure(name, month)
+                    # OR REPLACE: a batch interrupted after the archive commit but before the hot delete
+                    # is simply copied again.
+                    db.session.execute(insert(partition).prefix_with("OR REPLACE").from_select(
+                        columns, select(*hot.columns).where(hot.c.id.in_(month_ids))))
+                preserve_rollups(name, ids)
+                db.session.execute(delete(hot).where(hot.c.id.in_(ids)).execution_options(synchronize_session=False))
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            moved += len(ids)
+            last_id = ids[-1]
+            if len(rows) < batch_size:
+                break
+            if pause:
+                time.sleep(pause)
+        return moved
+
+    def run(self, report_days=None, safety_days=None, batch_size=None, dry_run=False, now=None):
+        if not self.enabled:
+            raise RuntimeError("Archiving is disabled (ARCHIVE_ENABLED=0 or no archive database).")
+        now = now or datetime.utcnow()
+        report_days = self.report_days if report_days is None else report_days
+        safety_days = self.safety_days if safety_days is None else safety_days
+        started = time.perf_counter()
+        summary = {
+            "community_report": self.archive("community_report", now - timedelta(days=report_days), batch_size,
+                                             dry_run=dry_run),
+            "safety_check": self.archive("safety_check", now - timedelta(days=safety_days), batch_size,
+                                         dry_run=dry_run),
+        }
+        if not dry_run:
+            # Incidents whose reports have all been archived.
+            summary["report_clusters"] = db.session.execute(text(
+                "DELETE FROM report_cluster WHERE report_count <= 0 AND last_seen_at < :cutoff")
+                .bindparams(bindparam("cutoff", now - timedelta(days=report_days), type_=DateTime))).rowcount
+            db.session.commit()
+            self.last_run = dict(summary, finished_at=datetime.utcnow().isoformat(),
+                                 seconds=round(time.perf_counter() - started, 3))
+        return dict(summary, dry_run=dry_run)
+
+    # -- scheduled job ---------------------------------------------------------
+
+    def start(self):
+        # Per-process background job (ARCHIVE_INTERVAL_MINUTES > 0); a file lock lets one worker
+        # run each round while the others skip it.
+        if not self.enabled or self.interval <= 0 or self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._loop, name="archiver", daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def _loop(self):
+        while not self._stopping.wait(self.interval):
+            os.makedirs(os.path.dirname(self.lock_path), exist_ok=True)
+            with open(self.lock_path, "w") as lock:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue
+                with self.app.app_context():
+                    try:
+                        self.run()
+                    except Exception:
+                        self.app.logger.exception("Scheduled archive run failed")
+                    finally:
+                        db.session.remove()
+
+    def stop(self):
+        self._stopping.set()
+
+    def stats(self):
+        stats = {"enabled": self.enabled, "path": self.path, "interval_minutes": self.interval / 60,
+                 "retention_days": {"community_report": self.report_days, "safety_check": self.safety_days},
+                 "last_run": self.last_run}
+        if self.enabled:
+            stats["partitions"] = {name: self.months(name) for name in ARCHIVES}
+        return stats
+
+
+archiver = Archiver()
+
+
+def history_query(name, columns=None, since=None, until=None):
+    # SELECT of `columns` (default: all) over the hot table plus every archive partition whose month
+    # overlaps [since, until), each part filtered on the partitioning column so it uses its index.
+    # Without archived months in range this is just the hot table query.
+    model, time_column, _ = ARCHIVES[name]
+    names = [column.name for column in columns or model.__table__.columns]
+    sources = [model.__table__]
+    for month in archiver.months(name):
+        if (until is None or _month_start(month) < until) and (since is None or _next_month(month) > since):
+            sources.append(archiver.partition(name, month))
+    parts = []
+    for source in sources:
+        query = select(*[source.c[column] for column in names])
+        if since:
+            query = query.where(source.c[time_column] >= since)
+        if until:
+            query = query.where(source.c[time_column] < until)
+        parts.append(query)
+    return parts[0] if len(parts) == 1 else union_all(*parts)
+
+
+def backfill_history_rollups():
+    # backfill_rollups over the full history, so counters for archived rows survive a rebuild.
+    return backfill_rollups(
+        history_query("community_report", [CommunityReport.created_at, CommunityReport.disaster_type,
+                                           CommunityReport.status, CommunityReport.location]),
+        history_query("safety_check", [SafetyCheck.created_at, SafetyCheck.status]))
@@ -0,0 +1,318 @@
+# Explanation: ASGI serving mode. The read-heavy public pages (index, educationalhub,
+# resourcedirectory) and the admin SSE feed run natively on the event loop with async SQLAlchemy
+# over aiosqlite; every other route is the unchanged Flask app, run in a thread pool.
+# Needs aiosqlite and greenlet, plus an ASGI server (requirements-asgi.txt): uvicorn asgi:application
+import asyncio
+import contextvars
+import functools
+import io
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from flask import render_template, request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from werkzeug.exceptions import HTTPException
+from python.events import admin_events
+from python.models import db, Article, Resource
+from python.pagecache import content_versions, page_cache, versions_query
+from python.pagination import keyset_paginate_async
+from python.sessions import current_user
+from python.sqlite import apply_pragmas
+
+
+def _environ(scope, body=b""):
+    # WSGI environ for an ASGI HTTP scope, so Flask's request context, session and url_for work.
+    server = scope.get("server") or ("localhost", 80)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1] or 80),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": scope["client"][0] if scope.get("client") else "",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope.get("headers", ()):
+        name = name.decode("latin-1").upper().replace("-", "_")
+        key = name if name in ("CONTENT_TYPE", "CONTENT_LENGTH") else f"HTTP_{name}"
+        value = value.decode("latin-1")
+        environ[key] = f"{environ[key]}; {value}" if key == "HTTP_COOKIE" and key in environ else value
+    return environ
+
+
+async def _send_response(send, response, environ):
+    # get_app_iter() drops the body for HEAD requests and 304/204 responses, as under WSGI.
+    body = b"".join(response.get_app_iter(environ))
+    headers = [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in response.headers.items()]
+    await send({"type": "http.response.start", "status": response.status_code, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+def _last_event_id():
+    last_event_id = request.headers.get("Last-Event-ID", type=int)
+    return request.args.get("last_event_id", type=int) if last_event_id is None else last_event_id
+
+
+async def _wait_for_disconnect(receive):
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+class WSGIBridge:
+    # Runs the Flask app for every other route in a bounded thread pool (ASGI_WSGI_THREADS), like
+    # a threaded WSGI server. Response chunks are sent as the app yields them, so streaming
+    # exports stay streamed; a thread waits while its chunk is written (backpressure).
+    def __init__(self, app, threads):
+        self.app = app
+        self.executor = ThreadPoolExecutor(threads, thread_name_prefix="wsgi")
+
+    async def __call__(self, scope, receive, send):
+        body = bytearray()
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.executor, self._run, _environ(scope, bytes(body)), send, loop)
+
+    def _run(self, environ, send, loop):
+        pending = {}
+
+        def emit(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        def start_response(status, headers, exc_info=None):
+            # Sent with the first non-empty chunk, so an error before it can still replace the headers.
+            pending["start"] = {"type": "http.response.start", "status": int(status.split(" ", 1)[0]),
+                                "headers": [(name.lower().encode("latin-1"), value.encode("latin-1"))
+                                            for name, value in headers]}
+
+        app_iter = self.app(environ, start_response)
+        try:
+            for chunk in app_iter:
+                if chunk:
+                    if "start" in pending:
+                        emit(pending.pop("start"))
+                    emit({"type": "http.response.body", "body": chunk, "more_body": True})
+            if "start" in pending:
+                emit(pending.pop("start"))
+            emit({"type": "http.response.body", "body": b""})
+        finally:
+            if hasattr(app_iter, "close"):
+                app_iter.close()
+
+
+class _RequestThread:
+    # Runs one request's blocking Flask work (session store reads and writes, identity lookups,
+    # before/after_request hooks, template rendering, page-cache files) in the bridge's thread
+    # pool, so a slow SQLite write never stalls the event loop and the SSE feeds on it. Every step
+    # runs in the request's own contextvars, so Flask's request context follows it between the
+    # pool threads and the loop (one step at a time).
+    def __init__(self, executor):
+        self.executor = executor
+        self.context = contextvars.copy_context()
+
+    def __call__(self, fn, *args):
+        return asyncio.get_running_loop().run_in_executor(self.executor, functools.partial(self.context.run, fn, *args))
+
+    def run(self, fn, *args):
+        # Non-blocking reads of the request context, on the loop.
+        return self.context.run(fn, *args)
+
+    def task(self, coro):
+        # The view's async queries, awaited on the loop in the request context.
+        return asyncio.get_running_loop().create_task(coro, context=self.context)
+
+
+class AsyncReadApp:
+    def __init__(self, app):
+        self.app = app
+        self.wsgi = WSGIBridge(app, app.config.get("ASGI_WSGI_THREADS", 32))
+        self.engine = None
+        self.sessions = None
+        # Path -> (content versions the page depends on, async loader returning the rendered page).
+        self.pages = {
+            "/": (("articles", "resources"), self.index),
+            "/educationalhub": (("articles",), self.educationalhub),
+            "/resourcedirectory": (("resources",), self.resourcedirectory),
+        }
+
+    def _start_engine(self):
+        # Read-only aiosqlite connections to the app's database file, tuned like the sync read engine.
+        if self.engine is not None:
+            return
+        with self.app.app_context():
+            url = db.engine.url
+        if url.get_backend_name() != "sqlite" or not url.database or url.database == ":memory:":
+            raise RuntimeError("The ASGI read path needs a file-backed SQLite database")
+        self.engine = create_async_engine(
+            f"sqlite+aiosqlite:///file:{url.database}?mode=ro&uri=true",
+            pool_size=self.app.config.get("ASYNC_DB_POOL_SIZE", 20),
+            max_overflow=self.app.config.get("ASYNC_DB_MAX_OVERFLOW", 20),
+        )
+        pragmas = {name: value for name, value in (self.app.config.get("SQLITE_PRAGMAS") or {}).items()
+                   if name != "journal_mode"}
+        apply_pragmas(self.engine.sync_engine, dict(pragmas, query_only=1))
+        self.sessions = async_sessionmaker(self.engine, expire_on_commit=False)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self._lifespan(receive, send)
+        if scope["type"] == "http" and scope["method"] in ("GET", "HEAD"):
+            if scope["path"] in self.pages and await self._page(scope, send):
+                return
+            if scope["path"] == "/admin/stream" and await self._admin_stream(scope, receive, send):
+                return
+        await self.wsgi(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                self._start_engine()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                if self.engine is not None:
+                    await self.engine.dispose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _page(self, scope, send):
+        # Same pipeline as Flask's full_dispatch_request (before/after_request hooks, session save,
+        # error handlers, page cache), with the view's queries awaited on the loop and everything
+        # blocking in the thread pool. Returns False to hand the request to the Flask view instead
+        # (full-text search).
+        self._start_engine()
+        content, load = self.pages[scope["path"]]
+        environ = _environ(scope)
+        if self.app.request_class(environ).args.get("q", "").strip():
+            return False
+        thread = _RequestThread(self.wsgi.executor)
+        ctx = self.app.request_context(environ)
+        response = await thread(self._begin, ctx)
+        if response is None:
+            try:
+                response = await self._cached(thread, content, load)
+            except HTTPException as exc:
+                response = exc
+            except BaseException:
+                await thread(ctx.pop)
+                raise
+        response = await thread(self._finish, ctx, response)
+        await _send_response(send, response, environ)
+        return True
+
+    def _begin(self, ctx):
+        # Opens the session (a session-store read) and runs the before_request hooks.
+        ctx.push()
+        try:
+            return self.app.preprocess_request()
+        except HTTPException as exc:
+            return self.app.handle_user_exception(exc)
+        except BaseException:
+            ctx.pop()
+            raise
+
+    def _finish(self, ctx, rv):
+        # Error handlers, after_request hooks and the session save (a session-store write).
+        try:
+            if isinstance(rv, HTTPException):
+                rv = self.app.handle_user_exception(rv)
+            return self.app.process_response(self.app.make_response(rv))
+        finally:
+            ctx.pop()
+
+    def _render(self, page):
+        template, context = page
+        return self.app.make_response(render_template(template, **context))
+
+    def _store(self, page, key, last_modified):
+        # Renders and caches a page; returns the response to send.
+        response = self._render(page)
+        entry = page_cache.store(key, response, last_modified)
+        return response if entry is None else page_cache.respond(entry)
+
+    async def _cached(self, thread, content, load):
+        async with self.sessions() as db_session:
+            if thread.run(page_cache.bypass):
+                return await thread(self._render, await thread.task(load(db_session)))
+            rows = (await db_session.execute(versions_query(content))).all()
+            versions, last_modified = content_versions(content, rows)
+            key = thread.run(page_cache.key, versions)
+            entry = await thread(page_cache.lookup, key)  # a file read with the filesystem backend
+            if entry is None:
+                return await thread(self._store, await thread.task(load(db_session)), key, last_modified)
+        return thread.run(page_cache.respond, entry)
+
+    # Loaders: the page's queries, awaited on the loop; they return (template, context) and the
+    # render (which may look up the current user) runs in the thread pool.
+    async def index(self, db_session):
+        articles = (await db_session.execute(
+            select(Article).order_by(Article.published_at.desc()).limit(3))).scalars().all()
+        resources = (await db_session.execute(
+            select(Resource).order_by(Resource.updated_at.desc()).limit(5))).scalars().all()
+        return "index.html", dict(articles=articles, resources=resources)
+
+    async def educationalhub(self, db_session):
+        articles = await keyset_paginate_async(db_session, select(Article),
+                                               [Article.published_at.desc(), Article.id.desc()])
+        return "educationalhub.html", dict(articles=articles)
+
+    async def resourcedirectory(self, db_session):
+        resources = await keyset_paginate_async(db_session, select(Resource),
+                                                [Resource.category.asc(), Resource.id.asc()])
+        return "resourcedirectory.html", dict(resources=resources)
+
+    def _stream_start(self, environ):
+        # The client's Last-Event-ID (None for a fresh feed), or False when not a logged-in admin.
+        with self.app.request_context(environ):
+            user = current_user()
+            if user is None or user.role != "admin":
+                return False
+            return _last_event_id()
+
+    async def _admin_stream(self, scope, receive, send):
+        # An open feed costs one small coroutine instead of a worker thread. Anyone but a logged-in
+        # admin is handed to the Flask view, which redirects to the login page. The session and
+        # identity lookups are SQLite reads, so they run in the thread pool.
+        last_event_id = await asyncio.get_running_loop().run_in_executor(
+            self.wsgi.executor, self._stream_start, _environ(scope))
+        if last_event_id is False:
+            return False
+        heartbeat = self.app.config["SSE_HEARTBEAT_SECONDS"]
+        await send({"type": "http.response.start", "status": 200, "headers": [
+            (b"content-type", b"text/event-stream; charset=utf-8"), (b"cache-control", b"no-cache"),
+            (b"x-accel-buffering", b"no")]})
+        # Wait on the next event and the client's disconnect together, so a closed tab unsubscribes
+        # at once rather than at the next heartbeat.
+        disconnected = asyncio.ensure_future(_wait_for_disconnect(receive))
+        stream = admin_events.astream(last_event_id, heartbeat=heartbeat)
+        try:
+            while True:
+                chunk = asyncio.ensure_future(stream.__anext__())
+                await asyncio.wait({chunk, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+                if disconnected.done():
+                    chunk.cancel()
+                    await asyncio.gather(chunk, return_exceptions=True)
+                    break
+                try:
+                    body = chunk.result().encode("utf-8")
+                except StopAsyncIteration:
+                    await send({"type": "http.response.body", "body": b""})
+                    break
+                await send({"type": "http.response.body", "body": body, "more_body": True})
+        finally:
+            disconnected.cancel()
+            await stream.aclose()
+        return True
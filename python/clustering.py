@@ -0,0 +1,316 @@
+# Explanation: Near-duplicate report clustering at ingest time. Each report gets a MinHash
+# signature of its normalized location (character trigrams) and description words; an in-memory
+# LSH index over the last REPORT_CLUSTER_WINDOW_MINUTES of reports finds candidates of the same
+# disaster type without scanning them, and a report joins the cluster of its most similar match.
+import hashlib
+import heapq
+from functools import lru_cache
+import re
+import struct
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import bindparam, event, func, insert, select, text, update
+from sqlalchemy.orm import Session
+from python.models import db, CommunityReport, ReportCluster
+
+# A joining report is indexed only if it adds a new variant of the incident: not a near-copy of
+# the member it matched, and while the cluster has fewer than this many indexed members. Keeps
+# lookups bounded when one incident is reported thousands of times.
+_NEAR_COPY = 0.9
+_MEMBERS_PER_CLUSTER = 16
+_ABBREVIATIONS = {"brgy": "barangay", "bgy": "barangay", "st": "street", "sto": "santo", "sta": "santa"}
+_STOP_WORDS = {"the", "and", "near", "with", "from", "our", "are", "was", "has", "have", "there", "this", "that",
+               "for", "not", "but", "all", "some", "very", "now", "still", "please"}
+
+
+def _join(row):
+    return (f"UPDATE report_cluster SET report_count = report_count + 1, "
+            f"latest_report_id = max(coalesce(latest_report_id, 0), {row}.id), "
+            f"last_seen_at = max(last_seen_at, coalesce({row}.created_at, last_seen_at)) "
+            f"WHERE id = {row}.cluster_id; ")
+
+
+def _leave(row):
+    return (f"UPDATE report_cluster SET report_count = report_count - 1, "
+            f"latest_report_id = (SELECT max(id) FROM community_report WHERE cluster_id = {row}.cluster_id) "
+            f"WHERE id = {row}.cluster_id; ")
+
+
+# Triggers keep each cluster's count, latest report and last-seen time right for every write
+# path (ingest, backfill, deletes, raw SQL).
+CLUSTER_SCHEMA = [
+    f"CREATE TRIGGER IF NOT EXISTS report_cluster_ai AFTER INSERT ON community_report "
+    f"WHEN new.cluster_id IS NOT NULL BEGIN {_join('new')}END",
+    f"CREATE TRIGGER IF NOT EXISTS report_cluster_ad AFTER DELETE ON community_report "
+    f"WHEN old.cluster_id IS NOT NULL BEGIN {_leave('old')}END",
+    f"CREATE TRIGGER IF NOT EXISTS report_cluster_au AFTER UPDATE OF cluster_id ON community_report "
+    f"WHEN old.cluster_id IS NOT new.cluster_id BEGIN {_leave('old')}{_join('new')}END",
+]
+
+
+@event.listens_for(db.metadata, "after_create")
+def create_cluster_triggers(target, connection, **kw):
+    if connection.dialect.name == "sqlite":
+        for statement in CLUSTER_SCHEMA:
+            connection.exec_driver_sql(statement)
+
+
+def normalize_location(location):
+    # "01 Munlawin Sur, Alitagtag" -> "munlawin sur alitagtag": lowercase, no punctuation,
+    # house/lot numbers dropped and common abbreviations expanded.
+    tokens = re.findall(r"[a-z0-9]+", (location or "").lower())
+    return " ".join(_ABBREVIATIONS.get(token, token) for token in tokens if not token.isdigit())
+
+
+def report_features(location, description):
+    # Location trigrams (tolerant of typos and reordering, and the bulk of the set, so the
+    # location dominates) plus the description's content words.
+    padded = f" {normalize_location(location)} "
+    features = {"l:" + padded[i:i + 3] for i in range(len(padded) - 2)}
+    features.update("d:" + word for word in re.findall(r"[a-z]{3,}", (description or "").lower())
+                    if word not in _STOP_WORDS)
+    return features
+
+
+class MinHasher:
+    # k independent hash values per feature come from one SHAKE-128 digest (k * 8 bytes); the
+    # signature is their element-wise minimum over the features, computed by C builtins rather
+    # than k Python-level permutations per feature.
+    def __init__(self, permutations=64):
+        self.permutations = permutations
+        self._unpack = struct.Struct(f"<{permutations}Q").unpack
+
+    def signature(self, features):
+        if not features:
+            return None
+        size = 8 * self.permutations
+        rows = [self._unpack(hashlib.shake_128(f.encode("utf-8")).digest(size)) for f in features]
+        return tuple(map(min, zip(*rows)))
+
+
+def similarity(a, b):
+    # Fraction of equal MinHash positions estimates the Jaccard similarity of the feature sets.
+    return sum(x == y for x, y in zip(a, b)) / len(a)
+
+
+class _LSHIndex:
+    # Banded LSH: reports sharing any band (rows_per_band signature positions) of the same
+    # disaster type are candidates. Entries expire once older than the window.
+    def __init__(self, bands, rows_per_band):
+        self.bands = bands
+        self.rows = rows_per_band
+        self.buckets = {}   # (disaster_type, band, band values) -> {report id}
+        self.entries = {}   # report id -> (cluster id, created_at, signature, bucket keys)
+        self.members = {}   # cluster id -> indexed reports
+        self.expiry = []    # heap of (created_at, report id)
+        self.newest = None  # created_at of the newest report clustered so far (the window's end)
+
+    def _keys(self, disaster_type, signature):
+        return [(disaster_type, band, signature[band * self.rows:(band + 1) * self.rows])
+                for band in range(self.bands)]
+
+    def add(self, report_id, cluster_id, disaster_type, created_at, signature):
+        # Replaces any entry under the same id: SQLite reuses the rowid of a deleted last row.
+        self._remove(report_id)
+        if signature is None:
+            return
+        keys = self._keys(disaster_type, signature)
+        for key in keys:
+            self.buckets.setdefault(key, set()).add(report_id)
+        self.entries[report_id] = (cluster_id, created_at, signature, keys)
+        self.members[cluster_id] = self.members.get(cluster_id, 0) + 1
+        heapq.heappush(self.expiry, (created_at, report_id))
+
+    def full(self, cluster_id):
+        return self.members.get(cluster_id, 0) >= _MEMBERS_PER_CLUSTER
+
+    def _remove(self, report_id):
+        entry = self.entries.pop(report_id, None)
+        if entry is None:
+            return False
+        for key in entry[3]:
+            bucket = self.buckets[key]
+            bucket.discard(report_id)
+            if not bucket:
+                del self.buckets[key]
+        if self.members[entry[0]] <= 1:
+            del self.members[entry[0]]
+        else:
+            self.members[entry[0]] -= 1
+        return True
+
+    def evict(self, window, now):
+        # The window follows the reports being clustered rather than the clock, so a backfill of
+        # older reports works the same way as live ingest.
+        if self.newest is None or now > self.newest:
+            self.newest = now
+        evicted = 0
+        while self.expiry and self.newest - self.expiry[0][0] > window:
+            created_at, report_id = heapq.heappop(self.expiry)
+            entry = self.entries.get(report_id)
+            # Heap items of replaced entries are stale; only the current one evicts.
+            if entry is not None and entry[1] == created_at and self._remove(report_id):
+                evicted += 1
+        return evicted
+
+    def best_match(self, disaster_type, created_at, signature, window):
+        # (cluster id, similarity, candidates checked) of the most similar report in the window.
+        candidates = set()
+        for key in self._keys(disaster_type, signature):
+            candidates.update(self.buckets.get(key, ()))
+        best = (None, 0.0)
+        for report_id in candidates:
+            cluster_id, seen_at, other, _ = self.entries[report_id]
+            if abs(seen_at - created_at) <= window:
+                score = similarity(signature, other)
+                if score > best[1]:
+                    best = (cluster_id, score)
+        return best + (len(candidates),)
+
+
+class ReportClusterer:
+    def __init__(self):
+        self.enabled = True
+        self.window = timedelta(minutes=360)
+        self.threshold = 0.65
+        self.bands = 16
+        self.hasher = MinHasher(64)
+        self._lock = threading.Lock()
+        self._index = None
+        self._last_id = None
+        self._cached_signature = None
+        self.metrics = {"assigned": 0, "joined": 0, "created": 0, "candidates": 0, "evicted": 0, "loaded": 0}
+        self.reset()
+
+    def init_app(self, app):
+        self.enabled = app.config.get("REPORT_CLUSTERING_ENABLED", True)
+        self.window = timedelta(minutes=app.config.get("REPORT_CLUSTER_WINDOW_MINUTES", 360))
+        self.threshold = app.config.get("REPORT_CLUSTER_THRESHOLD", 0.65)
+        self.bands = app.config.get("REPORT_CLUSTER_BANDS", 16)
+        permutations = app.config.get("REPORT_CLUSTER_PERMUTATIONS", 64)
+        if permutations % self.bands:
+            raise ValueError("REPORT_CLUSTER_PERMUTATIONS must be a multiple of REPORT_CLUSTER_BANDS")
+        self.hasher = MinHasher(permutations)
+        self._cached_signature = None
+        self.reset()
+
+    def reset(self):
+        # Forget the index; the next assign() reloads the window from the database.
+        with self._lock:
+            self._index = _LSHIndex(self.bands, self.hasher.permutations // self.bands)
+            self._last_id = None
+
+    def _signature(self, row):
+        # Exact repeats (copy-pasted or re-sent reports) are common during an incident.
+        if self._cached_signature is None:
+            self._cached_signature = lru_cache(maxsize=4096)(
+                lambda location, description: self.hasher.signature(report_features(location, description)))
+        return self._cached_signature(row.location, row.description)
+
+    def _catch_up(self):
+        # Index every clustered report committed since the last call, whichever worker wrote it.
+        # Called inside the writing transaction, which holds SQLite's write lock, so no report
+        # with a lower id can still commit after this read.
+        columns = (CommunityReport.id, CommunityReport.cluster_id, CommunityReport.disaster_type,
+                   CommunityReport.location, CommunityReport.description, CommunityReport.created_at)
+        if self._last_id is None:
+            horizon = datetime.utcnow() - self.window
+            query = (select(*columns).join(ReportCluster, ReportCluster.id == CommunityReport.cluster_id)
+                     .where(ReportCluster.last_seen_at >= horizon, CommunityReport.created_at >= horizon))
+            self._last_id = db.session.execute(select(func.max(CommunityReport.id))).scalar() or 0
+        else:
+            query = select(*columns).where(CommunityReport.id > self._last_id, CommunityReport.cluster_id.isnot(None))
+        for row in db.session.execute(query.order_by(CommunityReport.id)):
+            if not self._index.full(row.cluster_id):
+                self._index.add(row.id, row.cluster_id, row.disaster_type, row.created_at, self._signature(row))
+            self._last_id = max(self._last_id, row.id)
+            self.metrics["loaded"] += 1
+
+    def assign(self, reports):
+        # Cluster freshly inserted (flushed, uncommitted) reports, in the caller's transaction:
+        # joins the best match at or above REPORT_CLUSTER_THRESHOLD or opens a new cluster, then
+        # sets cluster_id with one executemany UPDATE (the triggers update the counts).
+        # `reports` are CommunityReport objects or rows with the same attributes. If the
+        # transaction rolls back, the index is reset (see _discard_on_rollback).
+        if not self.enabled or not reports:
+            return {}
+        signatures = [(report, self._signature(report)) for report in reports]
+        assignments = {}
+        db.session.info["report_clusters"] = True
+        with self._lock:
+            self._catch_up()
+            newest = None
+            for report, signature in signatures:
+                created_at = report.created_at or datetime.utcnow()
+                newest = created_at if newest is None else max(newest, created_at)
+                cluster_id, score = None, 0.0
+                if signature is not None:
+                    cluster_id, score, candidates = self._index.best_match(
+                        report.disaster_type, created_at, signature, self.window)
+                    self.metrics["candidates"] += candidates
+                    if score < self.threshold:
+                        cluster_id = None
+                if cluster_id is None:
+                    cluster_id = db.session.execute(insert(ReportCluster).values(
+                        disaster_type=report.disaster_type, location=report.location,
+                        first_seen_at=created_at, last_seen_at=created_at).returning(ReportCluster.id)).scalar()
+                    self.metrics["created"] += 1
+                else:
+                    self.metrics["joined"] += 1
+                if score < _NEAR_COPY and not self._index.full(cluster_id):
+                    self._index.add(report.id, cluster_id, report.disaster_type, created_at, signature)
+                self._last_id = max(self._last_id, report.id)
+                assignments[report.id] = cluster_id
+            self.metrics["assigned"] += len(assignments)
+            self.metrics["evicted"] += self._index.evict(self.window, newest)
+        db.session.execute(
+            update(CommunityReport.__table__).where(CommunityReport.__table__.c.id == bindparam("report_id"))
+            .values(cluster_id=bindparam("new_cluster_id")),
+            [{"report_id": report_id, "new_cluster_id": cluster_id} for report_id, cluster_id in assignments.items()])
+        return assignments
+
+    def stats(self):
+        with self._lock:
+            indexed = len(self._index.entries) if self._index else 0
+            buckets = len(self._index.buckets) if self._index else 0
+            return dict(self.metrics, enabled=self.enabled, indexed_reports=indexed, buckets=buckets,
+                        window_minutes=self.window.total_seconds() / 60, threshold=self.threshold)
+
+
+report_clusters = ReportClusterer()
+
+
+@event.listens_for(Session, "after_commit")
+def _keep_on_commit(session):
+    session.info.pop("report_clusters", None)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session):
+    # Reports indexed in a transaction that rolled back were never stored.
+    if session.info.pop("report_clusters", None):
+        report_clusters.reset()
+
+
+def cluster_reports(hours, batch_size=1000):
+    # Backfill for reports created in the last `hours` that have no cluster (older data,
+    # imports, or clustering switched off), in created_at order, committing per batch.
+    # Drops clusters left empty by deletes.
+    since = datetime.utcnow() - timedelta(hours=hours)
+    report_clusters.reset()
+    assigned = 0
+    if not report_clusters.enabled:
+        return {"assigned": 0, "empty_clusters_removed": 0}
+    while True:
+        rows = db.session.execute(
+            select(CommunityReport.id, CommunityReport.disaster_type, CommunityReport.location,
+                   CommunityReport.description, CommunityReport.created_at)
+            .where(CommunityReport.cluster_id.is_(None), CommunityReport.created_at >= since)
+            .order_by(CommunityReport.created_at, CommunityReport.id).limit(batch_size)).all()
+        if not rows:
+            break
+        assigned += len(report_clusters.assign(rows))
+        db.session.commit()
+    removed = db.session.execute(text("DELETE FROM report_cluster WHERE report_count <= 0")).rowcount
+    db.session.commit()
+    return {"assigned": assigned, "empty_clusters_removed": removed}
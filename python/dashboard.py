@@ -0,0 +1,60 @@
+# Explanation: Per-user dashboard summary built in one query and held in an in-process cache.
+from types import SimpleNamespace
+from sqlalchemy import select
+from python.cache import TTLCache
+from python.models import db, User, CommunityReport, SafetyCheck, EmergencyPlan
+
+# Per-worker cache; writes in this worker invalidate immediately, other workers within the TTL.
+dashboard_cache = TTLCache()
+
+
+def init_app(app):
+    dashboard_cache.maxsize = app.config.get("DASHBOARD_CACHE_SIZE", 1024)
+    dashboard_cache.ttl = app.config.get("DASHBOARD_CACHE_TTL", 30)
+
+
+def _snapshot(obj, exclude=()):
+    # Plain copy of the row's columns so cached values never touch a (closed) session.
+    if obj is None:
+        return None
+    return SimpleNamespace(**{c.key: getattr(obj, c.key) for c in obj.__table__.columns if c.key not in exclude})
+
+
+def build_dashboard_summary(user_id, report_limit=5):
+    # One round-trip: the user row, joined to its latest safety check, latest plan and
+    # last `report_limit` reports (one result row per report, at least one row overall).
+    latest_safety = (select(SafetyCheck.id).where(SafetyCheck.user_id == user_id)
+                     .order_by(SafetyCheck.created_at.desc(), SafetyCheck.id.desc()).limit(1)
+                     .correlate(None).scalar_subquery())
+    latest_plan = (select(EmergencyPlan.id).where(EmergencyPlan.user_id == user_id)
+                   .order_by(EmergencyPlan.created_at.desc(), EmergencyPlan.id.desc()).limit(1)
+                   .correlate(None).scalar_subquery())
+    recent_reports = (select(CommunityReport.id).where(CommunityReport.user_id == user_id)
+                      .order_by(CommunityReport.created_at.desc(), CommunityReport.id.desc()).limit(report_limit)
+                      .correlate(None))
+    rows = db.session.execute(
+        select(User, SafetyCheck, EmergencyPlan, CommunityReport)
+        .select_from(User)
+        .outerjoin(SafetyCheck, SafetyCheck.id == latest_safety)
+        .outerjoin(EmergencyPlan, EmergencyPlan.id == latest_plan)
+        .outerjoin(CommunityReport, CommunityReport.id.in_(recent_reports))
+        .where(User.id == user_id)
+        .order_by(CommunityReport.created_at.desc(), CommunityReport.id.desc())
+    ).all()
+    if not rows:
+        return None
+    user, safety, plan, _ = rows[0]
+    return SimpleNamespace(
+        user=_snapshot(user, exclude=("password_hash",)),
+        safety=_snapshot(safety),
+        plan=_snapshot(plan),
+        reports=[_snapshot(report) for *_, report in rows if report is not None],
+    )
+
+
+def get_dashboard_summary(user_id):
+    return dashboard_cache.get_or_set(user_id, lambda: build_dashboard_summary(user_id))
+
+
+def invalidate_dashboard(user_id):
+    dashboard_cache.invalidate(user_id)
@@ -0,0 +1,247 @@
+# Explanation: Resumable bulk import of CSV table dumps (instance/data/*.txt or `flask export` output).
+import csv
+import json
+import os
+from datetime import datetime
+from decimal import Decimal
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+from python.models import db, User, Article, Resource, CommunityReport, EmergencyPlan, SafetyCheck
+from python.clustering import CLUSTER_SCHEMA
+from python.pagecache import CONTENT_VERSION_SCHEMA, bump_content_versions
+from python.archive import backfill_history_rollups
+from python.rollups import ROLLUP_SCHEMA
+from python.safetystatus import SAFETY_STATUS_SCHEMA, reconcile_safety_status
+from python.search import SEARCH_SCHEMA, rebuild_search_index
+
+# Foreign-key order: users before anything that references them.
+IMPORT_ORDER = [User, Article, Resource, CommunityReport, EmergencyPlan, SafetyCheck]
+TABLES = {model.__tablename__: model for model in IMPORT_ORDER}
+
+
+def _timestamp(value):
+    # Validate, then store in SQLAlchemy's SQLite DateTime format so ORM reads and range filters work.
+    return datetime.fromisoformat(value).isoformat(" ", "microseconds")
+
+
+# Values are bound straight to the sqlite3 driver (no SQLAlchemy per-row processing), so parse
+# into what the driver stores: ints, floats for Numeric columns, canonical timestamp text.
+_PARSERS = {int: int, Decimal: float, datetime: _timestamp}
+
+
+def find_sources(paths):
+    # Map table name -> file for snapshot names ("user table.txt") and export names ("user.csv").
+    sources = {}
+    for path in paths:
+        files = [os.path.join(path, f) for f in sorted(os.listdir(path))] if os.path.isdir(path) else [path]
+        for file in files:
+            stem = os.path.basename(file).split(".")[0]
+            table = stem[:-len(" table")] if stem.endswith(" table") else stem
+            if table in TABLES:
+                sources[table] = file
+    return [(name, sources[name]) for name in TABLES if name in sources]
+
+
+def _converters(model, header):
+    columns = model.__table__.columns
+    unknown = [name for name in header if name not in columns]
+    if unknown:
+        raise ValueError(f"{model.__tablename__}: unknown columns {', '.join(unknown)}")
+    # A NOT NULL column with no default that the file lacks would reject every row (e.g. a
+    # `flask export user` file has no password_hash), so the file is refused instead.
+    missing = [column.name for column in columns if not column.nullable and not column.primary_key
+               and column.default is None and column.server_default is None and column.name not in header]
+    if missing:
+        raise ValueError(f"{model.__tablename__}: missing required columns {', '.join(missing)}")
+    converters = []
+    for name in header:
+        column = columns[name]
+        parse = _PARSERS.get(column.type.python_type, str)
+        converters.append((name, parse, column.nullable or column.primary_key))
+    return converters
+
+
+def _defaults(model, header):
+    # Model defaults for columns the file lacks (e.g. created_at), evaluated once per file
+    # because the raw insert bypasses SQLAlchemy's default handling.
+    defaults = {}
+    for column in model.__table__.columns:
+        if column.name in header or column.default is None:
+            continue
+        value = column.default.arg(None) if column.default.is_callable else column.default.arg
+        defaults[column.name] = _timestamp(value.isoformat()) if isinstance(value, datetime) else value
+    return defaults
+
+
+def _convert(converters, values):
+    # Empty cells are NULL; a NULL in a NOT NULL column rejects the row.
+    if len(values) != len(converters):
+        raise ValueError("wrong number of fields")
+    row = []
+    for (name, parse, nullable), value in zip(converters, values):
+        if value == "":
+            if not nullable:
+                raise ValueError(f"{name} is required")
+            row.append(None)
+        else:
+            row.append(parse(value))
+    return tuple(row)
+
+
+def _insert_statement(model, names):
+    # Only an already-imported id is skipped; any other constraint failure rejects the row.
+    columns = ", ".join(f'"{name}"' for name in names)
+    return (f'INSERT INTO "{model.__tablename__}" ({columns}) VALUES ({", ".join("?" * len(names))}) '
+            f'ON CONFLICT (id) DO NOTHING')
+
+
+def _insert_rows(statement, rows):
+    # One executemany per batch. If a row breaks a constraint (NOT NULL, CHECK, a unique email,
+    # a foreign key) the batch is rolled back and retried row by row so only that row is rejected.
+    # Returns (inserted, rejected).
+    try:
+        return db.session.connection().exec_driver_sql(statement, rows).rowcount, 0
+    except IntegrityError:
+        db.session.rollback()
+    connection = db.session.connection()
+    inserted = rejected = 0
+    for row in rows:
+        try:
+            inserted += connection.exec_driver_sql(statement, [row]).rowcount
+        except IntegrityError:
+            rejected += 1
+    return inserted, rejected
+
+
+class ImportState:
+    # Progress checkpoint: rows consumed per source file, keyed by size and mtime so a
+    # changed file starts over. Saved after every committed batch.
+    def __init__(self, path):
+        self.path = path
+        self.files = {}
+        if path and os.path.exists(path):
+            with open(path) as handle:
+                self.files = json.load(handle)
+
+    def entry(self, source):
+        stat = os.stat(source)
+        fingerprint = [stat.st_size, int(stat.st_mtime)]
+        entry = self.files.get(os.path.abspath(source))
+        if not entry or entry["fingerprint"] != fingerprint:
+            entry = {"fingerprint": fingerprint, "rows": 0, "inserted": 0, "rejected": 0, "done": False}
+            self.files[os.path.abspath(source)] = entry
+        return entry
+
+    def save(self):
+        if not self.path:
+            return
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as handle:
+            json.dump(self.files, handle, indent=2)
+        os.replace(tmp, self.path)
+
+
+def _drop_triggers(table):
+    names = db.session.execute(text("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = :t"),
+                               {"t": table}).scalars().all()
+    for name in names:
+        db.session.execute(text(f'DROP TRIGGER "{name}"'))
+    db.session.commit()
+
+
+def _drop_indexes(model):
+    for index in model.__table__.indexes:
+        index.drop(db.session.connection(), checkfirst=True)
+    db.session.commit()
+
+
+def _create_indexes(model):
+    for index in model.__table__.indexes:
+        index.create(db.session.connection(), checkfirst=True)
+    db.session.commit()
+
+
+def restore_triggers():
+    for statement in SEARCH_SCHEMA + ROLLUP_SCHEMA + SAFETY_STATUS_SCHEMA + CONTENT_VERSION_SCHEMA + CLUSTER_SCHEMA:
+        db.session.execute(text(statement))
+    db.session.commit()
+
+
+def import_file(model, source, state, batch_size=20000, progress=None):
+    # Stream one CSV file into its table in batch_size transactions. Inserts skip ids that
+    # already exist, so replaying a batch after a crash between the commit and the checkpoint
+    # write is harmless.
+    entry = state.entry(source)
+    if entry["done"]:
+        if progress:
+            progress(model.__tablename__, entry)
+        return entry
+    with open(source, newline="", encoding="utf-8-sig") as handle, db.session.no_autoflush:
+        reader = csv.reader(handle)
+        header = next(reader)
+        converters = _converters(model, header)
+        defaults = _defaults(model, header)
+        statement = _insert_statement(model, header + list(defaults))
+        extra = tuple(defaults.values())
+        for _ in range(entry["rows"]):
+            if next(reader, None) is None:
+                break
+        batch, consumed, rejected = [], 0, 0
+        for values in reader:
+            consumed += 1
+            try:
+                batch.append(_convert(converters, values) + extra)
+            except (ValueError, ArithmeticError):
+                rejected += 1
+            if len(batch) >= batch_size:
+                inserted, failed = _insert_rows(statement, batch)
+                db.session.commit()
+                entry["inserted"] += inserted
+                entry["rows"] += consumed
+                entry["rejected"] += rejected + failed
+                batch, consumed, rejected = [], 0, 0
+                state.save()
+                if progress:
+                    progress(model.__tablename__, entry)
+        inserted, failed = _insert_rows(statement, batch) if batch else (0, 0)
+        db.session.commit()
+        entry["inserted"] += inserted
+        entry["rows"] += consumed
+        entry["rejected"] += rejected + failed
+    entry["done"] = True
+    state.save()
+    if progress:
+        progress(model.__tablename__, entry)
+    return entry
+
+
+def import_data(paths, state_path=None, batch_size=20000, offline=False, restart=False, progress=None):
+    # offline=True drops each table's secondary indexes and search/rollup/status triggers while
+    # loading, then rebuilds them once at the end: much faster for restoring a node, but only
+    # safe with no live writers. Dropped indexes and triggers are recreated even on error.
+    if restart and state_path and os.path.exists(state_path):
+        os.remove(state_path)
+    state = ImportState(state_path)
+    sources = find_sources(paths)
+    # Check every file's header before loading any, so a bad file does not leave a partial import.
+    for name, source in sources:
+        with open(source, newline="", encoding="utf-8-sig") as handle:
+            _converters(TABLES[name], next(csv.reader(handle), []))
+    summary = {}
+    try:
+        for name, source in sources:
+            if offline:
+                _drop_triggers(name)
+                _drop_indexes(TABLES[name])
+            summary[name] = dict(import_file(TABLES[name], source, state, batch_size, progress), source=source)
+    finally:
+        if offline:
+            for name, _ in sources:
+                _create_indexes(TABLES[name])
+        restore_triggers()
+    if offline and sources:
+        rebuild_search_index()
+        backfill_history_rollups()
+        reconcile_safety_status()
+        bump_content_versions()
+    return summary
@@ -0,0 +1,182 @@
+# Explanation: In-process pub/sub for admin live updates, with a bounded replay buffer for SSE resume.
+import asyncio
+import json
+import queue
+import threading
+from collections import deque
+from datetime import datetime
+
+
+class _Subscriber:
+    def __init__(self, maxsize):
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.closed = False
+
+    def offer(self, event):
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except queue.Full:
+            return False
+
+    def close(self):
+        self.closed = True
+
+
+class _AsyncSubscriber:
+    # Subscriber living on an asyncio loop (the ASGI SSE feed): publishers on other threads
+    # append to a deque and wake the loop, so a waiting client holds no thread.
+    def __init__(self, maxsize, loop):
+        self.events = deque()
+        self.maxsize = maxsize
+        self.loop = loop
+        self.ready = asyncio.Event()
+        self.closed = False
+
+    def _wake(self):
+        try:
+            self.loop.call_soon_threadsafe(self.ready.set)
+        except RuntimeError:  # loop already closed
+            self.closed = True
+
+    def offer(self, event):
+        if len(self.events) >= self.maxsize:
+            return False
+        self.events.append(event)
+        self._wake()
+        return True
+
+    def close(self):
+        self.closed = True
+        self._wake()
+
+    async def get(self, timeout):
+        # Next event, or None once closed; raises TimeoutError after `timeout` seconds idle.
+        while not self.events and not self.closed:
+            self.ready.clear()
+            if self.events or self.closed:
+                break
+            await asyncio.wait_for(self.ready.wait(), timeout)
+        return self.events.popleft() if self.events else None
+
+
+class EventBroker:
+    # publish() appends to a ring buffer and fans out to every subscriber's bounded queue.
+    # A subscriber that falls too far behind is dropped; its client reconnects with
+    # Last-Event-ID and catches up from the buffer.
+    def __init__(self, buffer_size=1000, subscriber_queue_size=1000):
+        self._lock = threading.Lock()
+        self._last_id = 0
+        self._buffer = deque(maxlen=buffer_size)
+        self._subscribers = set()
+        self.subscriber_queue_size = subscriber_queue_size
+        self.published = 0
+        self.dropped_subscribers = 0
+
+    def init_app(self, app):
+        with self._lock:
+            self._buffer = deque(self._buffer, maxlen=app.config.get("EVENT_BUFFER_SIZE", 1000))
+        self.subscriber_queue_size = app.config.get("EVENT_SUBSCRIBER_QUEUE_SIZE", 1000)
+
+    def publish(self, event_type, data):
+        payload = json.dumps(data, default=_encode)
+        with self._lock:
+            self._last_id += 1
+            event = (self._last_id, event_type, payload)
+            self._buffer.append(event)
+            self.published += 1
+            for subscriber in list(self._subscribers):
+                if not subscriber.offer(event):
+                    subscriber.close()
+                    self._subscribers.discard(subscriber)
+                    self.dropped_subscribers += 1
+        return event[0]
+
+    def subscribe(self, last_event_id=None, loop=None):
+        # Returns (backlog, subscriber). backlog is None when events after last_event_id have
+        # already been evicted from the buffer, or when last_event_id is ahead of this process
+        # (ids are per-process counters: a restart or another worker), i.e. the client should reload.
+        # With `loop`, the subscriber is consumed from that asyncio loop (see astream()).
+        if loop is None:
+            subscriber = _Subscriber(self.subscriber_queue_size)
+        else:
+            subscriber = _AsyncSubscriber(self.subscriber_queue_size, loop)
+        with self._lock:
+            backlog = []
+            if last_event_id is not None:
+                oldest = self._buffer[0][0] if self._buffer else self._last_id + 1
+                if last_event_id + 1 < oldest or last_event_id > self._last_id:
+                    backlog = None
+                else:
+                    backlog = [event for event in self._buffer if event[0] > last_event_id]
+            self._subscribers.add(subscriber)
+        return backlog, subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def stats(self):
+        with self._lock:
+            return {"subscribers": len(self._subscribers), "buffered": len(self._buffer),
+                    "last_id": self._last_id, "published": self.published,
+                    "dropped_subscribers": self.dropped_subscribers}
+
+    def stream(self, last_event_id=None, heartbeat=15.0):
+        # Server-sent events: replay, then live events, with comment heartbeats so proxies
+        # keep the connection open and dead clients are noticed on the next write.
+        backlog, subscriber = self.subscribe(last_event_id)
+        try:
+            yield "retry: 3000\n\n"
+            if backlog is None:
+                yield format_sse(None, "reset", json.dumps({"reason": "missed events"}))
+            for event in backlog or ():
+                yield format_sse(*event)
+            while not subscriber.closed:
+                try:
+                    event = subscriber.queue.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_sse(*event)
+            yield format_sse(None, "reset", json.dumps({"reason": "fell behind"}))
+        finally:
+            self.unsubscribe(subscriber)
+
+
+    async def astream(self, last_event_id=None, heartbeat=15.0):
+        # stream() for the ASGI server: same frames, awaited instead of blocking a thread.
+        backlog, subscriber = self.subscribe(last_event_id, loop=asyncio.get_running_loop())
+        try:
+            yield "retry: 3000\n\n"
+            if backlog is None:
+                yield format_sse(None, "reset", json.dumps({"reason": "missed events"}))
+            for event in backlog or ():
+                yield format_sse(*event)
+            while not subscriber.closed:
+                try:
+                    event = await subscriber.get(timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if event is not None:
+                    yield format_sse(*event)
+            yield format_sse(None, "reset", json.dumps({"reason": "fell behind"}))
+        finally:
+            self.unsubscribe(subscriber)
+
+
+def format_sse(event_id, event_type, data):
+    lines = [] if event_id is None else [f"id: {event_id}"]
+    lines.append(f"event: {event_type}")
+    lines.extend(f"data: {line}" for line in data.splitlines() or [""])
+    return "\n".join(lines) + "\n\n"
+
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+admin_events = EventBroker()
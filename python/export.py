@@ -0,0 +1,98 @@
+# Explanation: Streaming CSV/NDJSON exports that hold one chunk of rows in memory at a time.
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from decimal import Decimal
+from sqlalchemy import select
+from python.models import db, User, CommunityReport, SafetyCheck, Resource, EmergencyPlan
+from python.archive import ARCHIVES, history_query
+
+# Exportable tables: model, the column used for since/until filters, and columns never exported.
+EXPORTS = {
+    "community_report": (CommunityReport, "created_at", ("cluster_id",)),
+    "safety_check": (SafetyCheck, "created_at", ()),
+    "resource": (Resource, "updated_at", ()),
+    "user": (User, "created_at", ("password_hash",)),
+    "emergency_plan": (EmergencyPlan, "created_at", ()),
+}
+FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+def export_columns(name):
+    model, _, excluded = EXPORTS[name]
+    return [column for column in model.__table__.columns if column.name not in excluded]
+
+
+def export_query(name, since=None, until=None):
+    # Archived tables include the archive partitions the range reaches into.
+    model, time_column, _ = EXPORTS[name]
+    if name in ARCHIVES:
+        query = history_query(name, export_columns(name), since, until)
+        return query.order_by(query.selected_columns.id)
+    query = select(*export_columns(name)).order_by(model.id)
+    if since:
+        query = query.where(getattr(model, time_column) >= since)
+    if until:
+        query = query.where(getattr(model, time_column) < until)
+    return query
+
+
+def iter_row_chunks(name, since=None, until=None, chunk_size=1000):
+    # yield_per streams from one cursor (and one consistent read snapshot) in chunk_size batches.
+    result = db.session.execute(export_query(name, since, until).execution_options(yield_per=chunk_size))
+    for partition in result.partitions():
+        yield partition
+
+
+def _csv_value(value):
+    # Same text as the instance/data snapshots: "YYYY-MM-DD HH:MM:SS.ffffff", empty for NULL.
+    return "" if value is None else value
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def iter_csv(name, chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow([column.name for column in export_columns(name)])
+    for rows in chunks:
+        writer.writerows([[_csv_value(v) for v in row] for row in rows])
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def iter_ndjson(name, chunks):
+    keys = [column.name for column in export_columns(name)]
+    for rows in chunks:
+        yield "".join(json.dumps(dict(zip(keys, row)), default=_json_default, ensure_ascii=False) + "\n"
+                      for row in rows).encode("utf-8")
+
+
+def gzip_chunks(chunks, level=6):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def iter_export(name, fmt="csv", since=None, until=None, compress=False, chunk_size=1000):
+    encode = iter_csv if fmt == "csv" else iter_ndjson
+    chunks = encode(name, iter_row_chunks(name, since, until, chunk_size))
+    return gzip_chunks(chunks) if compress else chunks
+
+
+def export_filename(name, fmt, compress=False):
+    return f"{name}.{fmt}" + (".gz" if compress else "")
@@ -0,0 +1,212 @@
+# Explanation: Streaming bulk ingestion of community reports (JSON array or NDJSON bodies).
+import codecs
+import json
+from datetime import datetime
+from types import SimpleNamespace
+from sqlalchemy import insert, select, text
+from sqlalchemy.exc import IntegrityError
+from wtforms.validators import DataRequired, Length
+from python.clustering import report_clusters
+from python.forms import ReportForm
+from python.models import db, CommunityReport
+
+
+def _field_rules(unbound_field):
+    # Read required/max-length/choices straight off the ReportForm field definition.
+    validators = unbound_field.kwargs.get("validators", [])
+    max_length = next((v.max for v in validators if isinstance(v, Length) and v.max != -1), None)
+    required = any(isinstance(v, DataRequired) for v in validators)
+    choices = unbound_field.kwargs.get("choices")
+    return required, max_length, {value for value, _ in choices} if choices else None
+
+
+# The same rules ReportForm applies, compiled once instead of building a form per record.
+REPORT_RULES = {name: _field_rules(getattr(ReportForm, name)) for name in ("disaster_type", "location", "description")}
+CLIENT_REF_LENGTH = CommunityReport.client_ref.type.length
+
+
+def validate_report_record(record):
+    # Returns (clean_row, errors); errors maps field name to a list of messages like WTForms.
+    if not isinstance(record, dict):
+        return None, {"record": ["Expected a JSON object."]}
+    row, errors = {}, {}
+    for name, (required, max_length, choices) in REPORT_RULES.items():
+        value = record.get(name)
+        value = value.strip() if isinstance(value, str) else value
+        if required and not value:
+            errors[name] = ["This field is required."]
+        elif value is not None and not isinstance(value, str):
+            errors[name] = ["Must be a string."]
+        elif max_length is not None and len(value) > max_length:
+            errors[name] = [f"Field cannot be longer than {max_length} characters."]
+        elif choices is not None and value not in choices:
+            errors[name] = ["Not a valid choice."]
+        else:
+            row[name] = value
+    # Offline clients may send the time the report was written.
+    created_at = record.get("created_at")
+    if created_at is not None:
+        try:
+            row["created_at"] = datetime.fromisoformat(created_at)
+        except (TypeError, ValueError):
+            errors["created_at"] = ["Not a valid ISO 8601 datetime."]
+    # Optional client-side id: a record whose client_ref this user already sent is not stored again.
+    client_ref = record.get("client_ref")
+    if client_ref is not None:
+        if not isinstance(client_ref, str) or not client_ref.strip() or len(client_ref) > CLIENT_REF_LENGTH:
+            errors["client_ref"] = [f"Must be a non-empty string of at most {CLIENT_REF_LENGTH} characters."]
+        else:
+            row["client_ref"] = client_ref
+    return (None, errors) if errors else (row, None)
+
+
+def _iter_lines(stream, chunk_size=64 * 1024):
+    # Split a request stream on newlines, reading large chunks rather than line by line.
+    pending = b""
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        lines = (pending + chunk).split(b"\n")
+        pending = lines.pop()
+        yield from lines
+    if pending:
+        yield pending
+
+
+def iter_ndjson(stream):
+    # One JSON document per line; blank lines are skipped, bad lines yield a ValueError marker.
+    for line in _iter_lines(stream):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as exc:
+            yield exc
+
+
+def iter_json_array(stream, chunk_size=64 * 1024):
+    # Incrementally decode the elements of a top-level JSON array without reading the whole body.
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    separators = " \t\r\n,"
+    buffer, pos, started, eof = "", 0, False, False
+    while True:
+        while True:
+            while pos < len(buffer) and buffer[pos] in separators:
+                pos += 1
+            if pos == len(buffer):
+                break
+            if not started:
+                if buffer[pos] != "[":
+                    raise ValueError("Expected a JSON array of reports.")
+                started, pos = True, pos + 1
+                continue
+            if buffer[pos] == "]":
+                return
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except ValueError:
+                if eof:
+                    raise ValueError("Truncated JSON array.")
+                break
+            if end == len(buffer) and not eof:
+                # A scalar cut at the chunk boundary would still decode; wait for more input.
+                break
+            pos = end
+            yield item
+        if eof:
+            raise ValueError("Truncated JSON array.")
+        chunk = stream.read(chunk_size)
+        eof = not chunk
+        buffer = buffer[pos:] + utf8.decode(chunk, final=eof)
+        pos = 0
+
+
+def _stored_refs(user_id, refs):
+    # client_ref -> id of this user's reports already stored under those refs.
+    if not refs:
+        return {}
+    return dict(db.session.execute(
+        select(CommunityReport.client_ref, CommunityReport.id)
+        .where(CommunityReport.user_id == user_id, CommunityReport.client_ref.in_(refs))).all())
+
+
+def ingest_reports(records, user_id, batch_size=1000):
+    # Validate each record and insert valid ones in chunks, committing once per chunk. A body that
+    # stops parsing part way (truncated upload) keeps what was read: those rows are stored and
+    # the summary carries the parse error, so a client can resume after the last reported index.
+    results, batch, batch_indexes = [], [], []
+    first_seen = {}  # client_ref -> index of its first record in this upload
+    received_at = datetime.utcnow()
+
+    def insert_batch():
+        # Records whose client_ref is already stored are reported as duplicates, not inserted.
+        stored = _stored_refs(user_id, [row["client_ref"] for row in batch if row.get("client_ref")])
+        fresh = [(index, row) for index, row in zip(batch_indexes, batch) if row.get("client_ref") not in stored]
+        for index, row in zip(batch_indexes, batch):
+            if row.get("client_ref") in stored:
+                results[index] = {"index": index, "status": "duplicate", "id": stored[row["client_ref"]]}
+        if not fresh:
+            return
+        rows = [row for _, row in fresh]
+        # Plain executemany on the table. The chunk's inserts run back to back while this
+        # transaction holds SQLite's write lock, so rowids are allocated consecutively and
+        # last_insert_rowid() identifies the whole chunk.
+        db.session.execute(insert(CommunityReport.__table__), rows)
+        last_id = db.session.execute(text("SELECT last_insert_rowid()")).scalar()
+        first_id = last_id - len(rows) + 1
+        report_clusters.assign([SimpleNamespace(id=first_id + offset, **row) for offset, row in enumerate(rows)])
+        db.session.commit()
+        for offset, (index, _) in enumerate(fresh):
+            results[index] = {"index": index, "status": "created", "id": first_id + offset}
+
+    def flush():
+        if not batch:
+            return
+        try:
+            insert_batch()
+        except IntegrityError:
+            # A concurrent upload stored one of these client_refs after the lookup; the retry sees it.
+            db.session.rollback()
+            insert_batch()
+        batch.clear()
+        batch_indexes.clear()
+
+    error = None
+    try:
+        for index, record in enumerate(records):
+            if isinstance(record, ValueError):
+                row, errors = None, {"record": [f"Invalid JSON: {record}"]}
+            else:
+                row, errors = validate_report_record(record)
+            if errors:
+                results.append({"index": index, "status": "error", "errors": errors})
+                continue
+            ref = row.get("client_ref")
+            if ref is not None and ref in first_seen:
+                results.append({"index": index, "status": "duplicate", "of": first_seen[ref]})
+                continue
+            if ref is not None:
+                first_seen[ref] = index
+            row.update(user_id=user_id, status="pending", client_ref=ref)
+            row.setdefault("created_at", received_at)
+            results.append(None)
+            batch.append(row)
+            batch_indexes.append(index)
+            if len(batch) >= batch_size:
+                flush()
+    except ValueError as exc:
+        error = str(exc)
+    flush()
+    for result in results:
+        if result["status"] == "duplicate" and "of" in result:
+            result["id"] = results[result["of"]].get("id")
+    created = sum(1 for r in results if r["status"] == "created")
+    duplicates = sum(1 for r in results if r["status"] == "duplicate")
+    summary = {"created": created, "duplicates": duplicates, "rejected": len(results) - created - duplicates,
+               "results": results}
+    if error is not None:
+        summary["error"] = error
+    return summary
@@ -0,0 +1,232 @@
+# Explanation: Opt-in request instrumentation (METRICS_ENABLED): route latency, SQL statement
+# counts/time, template render time and password hashing time as Prometheus text, a slow-query
+# log with EXPLAIN QUERY PLAN, and a one-request cProfile hook (X-Profile header).
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextlib import contextmanager
+from flask import before_render_template, g, has_request_context, request, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+class Counter:
+    def __init__(self, name, help_text, labels):
+        self.name, self.help, self.labels = name, help_text, labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for values, total in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labels, values)} {total}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels, buckets=HTTP_BUCKETS):
+        self.name, self.help, self.labels, self.buckets = name, help_text, labels, buckets
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, seconds, *label_values):
+        with self._lock:
+            series = self._values.get(label_values)
+            if series is None:
+                series = self._values[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            index = bisect_left(self.buckets, seconds)
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += seconds
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for values, (counts, total, count) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(f"{self.name}_bucket{_labels(self.labels + ('le',), values + (repr(bound),))} {cumulative}")
+                lines.append(f"{self.name}_bucket{_labels(self.labels + ('le',), values + ('+Inf',))} {count}")
+                lines.append(f"{self.name}_sum{_labels(self.labels, values)} {total:.6f}")
+                lines.append(f"{self.name}_count{_labels(self.labels, values)} {count}")
+        return lines
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in values)
+    return "{" + ",".join(f'{n}="{v}"' for n, v in zip(names, escaped)) + "}"
+
+
+# Per-process registry; with several workers, scrape each one (or sum them in the query).
+requests_total = Counter("http_requests_total", "Requests by endpoint, method and status.",
+                         ("endpoint", "method", "status"))
+request_seconds = Histogram("http_request_duration_seconds", "Request latency by endpoint.", ("endpoint", "method"))
+sql_seconds = Histogram("db_statement_duration_seconds", "SQL statement time by endpoint (count = statements).",
+                        ("endpoint",), FAST_BUCKETS)
+slow_statements = Counter("db_slow_statements_total", "Statements slower than METRICS_SLOW_QUERY_MS.", ("endpoint",))
+template_seconds = Histogram("template_render_duration_seconds", "Jinja render time by template.", ("template",),
+                             FAST_BUCKETS)
+password_seconds = Histogram("password_hash_duration_seconds", "Password hashing time by operation.",
+                             ("operation",), HTTP_BUCKETS)
+REGISTRY = [requests_total, request_seconds, sql_seconds, slow_statements, template_seconds, password_seconds]
+
+_state = {"enabled": False, "slow_seconds": 0.1, "logger": None, "current_user": None}
+
+
+def enabled():
+    return _state["enabled"]
+
+
+def _endpoint():
+    return (request.endpoint or "unmatched") if has_request_context() else "background"
+
+
+@contextmanager
+def timer(histogram, *label_values):
+    # Observe the block's duration when instrumentation is on; a bare yield otherwise.
+    if not _state["enabled"]:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.observe(time.perf_counter() - start, *label_values)
+
+
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    # The start time lives on the statement's execution context, so a statement that fails
+    # (no after_cursor_execute) leaves nothing behind on the pooled connection.
+    if context is not None:
+        context._metrics_start = time.perf_counter()
+
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "_metrics_start", None)
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+    endpoint = _endpoint()
+    sql_seconds.observe(elapsed, endpoint)
+    if elapsed >= _state["slow_seconds"]:
+        slow_statements.inc(endpoint)
+        _log_slow(cursor, statement, parameters, executemany, elapsed, endpoint)
+
+
+def _log_slow(cursor, statement, parameters, executemany, elapsed, endpoint):
+    plan = ""
+    if not executemany and statement.lstrip().upper().startswith(("SELECT", "WITH", "UPDATE", "DELETE")):
+        try:
+            # Raw DBAPI connection: no SQLAlchemy events, so this is not itself timed.
+            rows = cursor.connection.execute("EXPLAIN QUERY PLAN " + statement, parameters or ()).fetchall()
+            plan = "\n".join("  " + row[-1] for row in rows)
+        except Exception as exc:
+            plan = f"  (EXPLAIN failed: {exc})"
+    _state["logger"].warning("Slow query (%.1f ms, %s): %s\n%s", elapsed * 1000, endpoint, statement, plan)
+
+
+def _before_render(sender, template, context, **extra):
+    if has_request_context():
+        g.setdefault("metrics_templates", []).append(time.perf_counter())
+
+
+def _rendered(sender, template, context, **extra):
+    if has_request_context() and g.get("metrics_templates"):
+        template_seconds.observe(time.perf_counter() - g.metrics_templates.pop(), template.name or "string")
+
+
+def _is_admin():
+    # Role of the stored user (the current_user loader given to init_app), not the session cookie's
+    # copy, so a demotion applies on the next request. python.models imports this module, hence
+    # the loader is passed in rather than imported.
+    user = _state["current_user"]() if _state["current_user"] else None
+    return user is not None and user.role == "admin"
+
+
+def _profile_allowed(app):
+    header = request.headers.get("X-Profile")
+    if not header:
+        return False
+    token = app.config.get("METRICS_PROFILE_TOKEN")
+    return (token is not None and header == token) or _is_admin()
+
+
+def render_metrics():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def metrics_authorized(app):
+    # Admin user, or a scraper sending "Authorization: Bearer <METRICS_TOKEN>".
+    token = app.config.get("METRICS_TOKEN")
+    if token and request.headers.get("Authorization") == f"Bearer {token}":
+        return True
+    return _is_admin()
+
+
+def init_app(app, current_user=None):
+    _state["current_user"] = current_user
+    if not app.config.get("METRICS_ENABLED"):
+        return
+    _state.update(enabled=True, slow_seconds=app.config.get("METRICS_SLOW_QUERY_MS", 100) / 1000.0,
+                  logger=app.logger)
+    event.listen(Engine, "before_cursor_execute", _before_execute)
+    event.listen(Engine, "after_cursor_execute", _after_execute)
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_rendered, app)
+    profile_dir = app.config.get("METRICS_PROFILE_DIR") or os.path.join(app.instance_path, "profiles")
+
+    @app.before_request
+    def start_request_timer():
+        g.metrics_start = time.perf_counter()
+        if _profile_allowed(app):
+            g.profiler = cProfile.Profile()
+            g.profiler.enable()
+
+    @app.after_request
+    def record_request(response):
+        profiler = g.pop("profiler", None)
+        if profiler is not None:
+            profiler.disable()
+            os.makedirs(profile_dir, exist_ok=True)
+            name = f"{time.strftime('%Y%m%d-%H%M%S')}-{request.endpoint or 'unmatched'}-{uuid.uuid4().hex[:6]}"
+            profiler.dump_stats(os.path.join(profile_dir, name + ".prof"))
+            summary = io.StringIO()
+            pstats.Stats(profiler, stream=summary).sort_stats("cumulative").print_stats(40)
+            with open(os.path.join(profile_dir, name + ".txt"), "w") as handle:
+                handle.write(summary.getvalue())
+            response.headers["X-Profile-Id"] = name
+        endpoint = request.endpoint or "unmatched"
+        requests_total.inc(endpoint, request.method, str(response.status_code))
+        request_seconds.observe(time.perf_counter() - g.get("metrics_start", time.perf_counter()),
+                                endpoint, request.method)
+        return response
+
+
+def profile_report(app, name):
+    # Text summary of a profile saved by the X-Profile hook (None if unknown).
+    profile_dir = app.config.get("METRICS_PROFILE_DIR") or os.path.join(app.instance_path, "profiles")
+    path = os.path.join(profile_dir, os.path.basename(name) + ".txt")
+    if not os.path.exists(path):
+        return None
+    with open(path) as handle:
+        return handle.read()
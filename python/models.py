@@ -1,9 +1,23 @@
 # SQLAlchemy models and a single shared db instance.
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
+from python.metrics import password_seconds, timer
+from python.passwords import HasherBusy, passwords
+from python.sqlite import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
+
+
+class UserHistoryMixin:
+    # Per-user history tables share one "newest first" ordering, backed by a
+    # composite (user_id, created_at DESC, id DESC) index on each table.
+    @classmethod
+    def history_order(cls):
+        return (cls.created_at.desc(), cls.id.desc())
+
+    @classmethod
+    def latest_for_user(cls, user_id):
+        return cls.query.filter_by(user_id=user_id).order_by(*cls.history_order())
 
 class User(db.Model):
     # User accounts with roles ('user' or 'admin').
@@ -19,10 +33,22 @@ class User(db.Model):
 
     # Password helpers for secure storage and checking.
     def set_password(self, raw_password: str):
-        self.password_hash = generate_password_hash(raw_password)
+        with timer(password_seconds, "set"):
+            self.password_hash = passwords.hash(raw_password)
 
     def check_password(self, raw_password: str) -> bool:
-        return check_password_hash(self.password_hash, raw_password)
+        with timer(password_seconds, "check"):
+            valid = passwords.verify(self.password_hash, raw_password)
+        # Upgrade a hash made with an older method/cost; the caller commits it. Under load the
+        # upgrade is skipped (the password is already verified) and retried on the next login.
+        if valid and passwords.needs_rehash(self.password_hash):
+            try:
+                with timer(password_seconds, "rehash"):
+                    self.password_hash = passwords.hash(raw_password)
+            except HasherBusy:
+                return valid
+            passwords.count("rehashed")
+        return valid
 
 
 class Article(db.Model):
@@ -34,8 +60,13 @@ class Article(db.Model):
     content = db.Column(db.Text, nullable=False)
     published_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # Keyset pagination order for the educational hub.
+    __table_args__ = (
+        db.Index("ix_article_published", published_at.desc(), id.desc()),
+    )
+
 
-class CommunityReport(db.Model):
+class CommunityReport(UserHistoryMixin, db.Model):
     # Disaster/hazard reports submitted by users.
     __tablename__ = "community_report"
     id = db.Column(db.Integer, primary_key=True)
@@ -46,10 +77,46 @@ class CommunityReport(db.Model):
     status = db.Column(db.String(50), default="pending", nullable=False)  # pending, verified, resolved
     verified_by_admin_id = db.Column(db.Integer, db.ForeignKey("user.id"))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Incident this report duplicates (python/clustering.py). Derived data, so no foreign key:
+    # imports and exports leave it out and `flask cluster-reports` rebuilds it.
+    cluster_id = db.Column(db.Integer)
+    # Client-chosen id of an offline report (POST /api/reports/bulk), unique per user, so a
+    # re-sent upload does not store the report twice.
+    client_ref = db.Column(db.String(64))
 
     # Relationships to user/admin.
     user = db.relationship("User", foreign_keys=[user_id])
     verified_by_admin = db.relationship("User", foreign_keys=[verified_by_admin_id])
+    cluster = db.relationship("ReportCluster", primaryjoin="ReportCluster.id == foreign(CommunityReport.cluster_id)",
+                              viewonly=True)
+
+    # Indexes for per-user history, status queues and cluster members.
+    __table_args__ = (
+        db.Index("ix_community_report_user_created", user_id, created_at.desc(), id.desc()),
+        db.Index("ix_community_report_status_created", status, created_at),
+        db.Index("ix_community_report_cluster", cluster_id),
+        db.Index("ux_community_report_client_ref", user_id, client_ref, unique=True,
+                 sqlite_where=client_ref.isnot(None)),
+    )
+
+
+class ReportCluster(db.Model):
+    # One incident reported many times: near-duplicate reports of the same disaster type within
+    # the clustering window. report_count, latest_report_id and last_seen_at are maintained by
+    # triggers on community_report (python/clustering.py).
+    __tablename__ = "report_cluster"
+    id = db.Column(db.Integer, primary_key=True)
+    disaster_type = db.Column(db.String(100), nullable=False)
+    location = db.Column(db.String(255), nullable=False)  # of the first report
+    report_count = db.Column(db.Integer, default=0, nullable=False)
+    latest_report_id = db.Column(db.Integer)
+    first_seen_at = db.Column(db.DateTime, nullable=False)
+    last_seen_at = db.Column(db.DateTime, nullable=False)
+
+    # Clusters still inside the window are reloaded from here when a worker starts.
+    __table_args__ = (
+        db.Index("ix_report_cluster_last_seen", last_seen_at),
+    )
 
 
 class Resource(db.Model):
@@ -64,8 +131,14 @@ class Resource(db.Model):
     longitude = db.Column(db.Numeric(9, 6))
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    # Keyset pagination orders for the public directory and the admin list.
+    __table_args__ = (
+        db.Index("ix_resource_category", category, id),
+        db.Index("ix_resource_updated", updated_at.desc(), id.desc()),
+    )
 
-class EmergencyPlan(db.Model):
+
+class EmergencyPlan(UserHistoryMixin, db.Model):
     # For Personalizing emergency plans per user.
     __tablename__ = "emergency_plan"
     id = db.Column(db.Integer, primary_key=True)
@@ -80,8 +153,12 @@ class EmergencyPlan(db.Model):
     #  Relationship to user.
     user = db.relationship("User")
 
+    __table_args__ = (
+        db.Index("ix_emergency_plan_user_created", user_id, created_at.desc(), id.desc()),
+    )
+
 
-class SafetyCheck(db.Model):
+class SafetyCheck(UserHistoryMixin, db.Model):
     # Safety status entries ('Safe', 'Needs Help', 'Missing').
     __tablename__ = "safety_check"
     id = db.Column(db.Integer, primary_key=True)
@@ -92,3 +169,58 @@ class SafetyCheck(db.Model):
 
     # Explanation: Relationship to user.
     user = db.relationship("User")
+
+    __table_args__ = (
+        db.Index("ix_safety_check_user_created", user_id, created_at.desc(), id.desc()),
+    )
+
+
+class ReportRollup(db.Model):
+    # Situation-report counters: reports per created-at bucket, disaster type, current
+    # status and normalized area. Maintained by triggers (python/rollups.py).
+    __tablename__ = "report_rollup"
+    granularity = db.Column(db.String(10), primary_key=True)  # minute, hour
+    bucket = db.Column(db.DateTime, primary_key=True)
+    disaster_type = db.Column(db.String(100), primary_key=True)
+    status = db.Column(db.String(50), primary_key=True)
+    area = db.Column(db.String(255), primary_key=True)
+    count = db.Column(db.Integer, default=0, nullable=False)
+
+    __table_args__ = {"sqlite_with_rowid": False}
+
+
+class SafetyRollup(db.Model):
+    # Safety check-ins per created-at bucket and status. Maintained by triggers.
+    __tablename__ = "safety_rollup"
+    granularity = db.Column(db.String(10), primary_key=True)
+    bucket = db.Column(db.DateTime, primary_key=True)
+    status = db.Column(db.String(50), primary_key=True)
+    count = db.Column(db.Integer, default=0, nullable=False)
+
+    __table_args__ = {"sqlite_with_rowid": False}
+
+
+class CurrentSafetyStatus(db.Model):
+    # Latest safety check-in per user, upserted by triggers on safety_check (python/safetystatus.py).
+    __tablename__ = "current_safety_status"
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), primary_key=True)
+    safety_check_id = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.String(50), nullable=False)
+    note = db.Column(db.Text)
+    checked_at = db.Column(db.DateTime, nullable=False)
+
+    user = db.relationship("User")
+
+    # Roster order: status, then most recent check-in first.
+    __table_args__ = (
+        db.Index("ix_current_safety_status_status", status, checked_at.desc(), user_id.desc()),
+    )
+
+
+class ContentVersion(db.Model):
+    # Version counters for public content ("articles", "resources"), bumped by triggers on
+    # every write; the rendered-page cache keys on them (python/pagecache.py).
+    __tablename__ = "content_version"
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
@@ -0,0 +1,64 @@
+# Explanation: Bulk moderation of community reports (verify/resolve many at once).
+from sqlalchemy import select, update
+from python.models import db, CommunityReport
+from python.rollups import area_key, area_matches
+
+# Action -> status it sets. Verifying also records the admin, as the single-report route does.
+ACTIONS = {"verify": "verified", "resolve": "resolved"}
+STATUSES = ("pending", "verified", "resolved")
+FILTERS = ("disaster_type", "area", "status", "since", "until", "cluster_id")
+
+
+def moderation_targets(ids=None, disaster_type=None, area=None, status=None, since=None, until=None, cluster_id=None):
+    # SELECT of the matching report ids. `area` matches like the rollups' area filter (whole parts);
+    # status + created_at use ix_community_report_status_created; cluster_id selects one incident.
+    query = select(CommunityReport.id)
+    if ids is not None:
+        query = query.where(CommunityReport.id.in_(ids))
+    if cluster_id is not None:
+        query = query.where(CommunityReport.cluster_id == cluster_id)
+    if disaster_type:
+        query = query.where(CommunityReport.disaster_type == disaster_type)
+    if area:
+        query = query.where(area_matches(area_key(CommunityReport.location), area))
+    if status:
+        query = query.where(CommunityReport.status == status)
+    if since:
+        query = query.where(CommunityReport.created_at >= since)
+    if until:
+        query = query.where(CommunityReport.created_at < until)
+    return query.order_by(CommunityReport.id)
+
+
+def moderate_reports(action, admin_id, ids=None, batch_size=1000, **filters):
+    # Applies the action to every matching report: one UPDATE ... WHERE id IN (...) RETURNING
+    # user_id per batch, all in one transaction (rollups follow via their triggers).
+    # Returns counts plus the owners whose dashboards need invalidating.
+    new_status = ACTIONS[action]
+    values = {"status": new_status}
+    if action == "verify":
+        values["verified_by_admin_id"] = admin_id
+    matched = db.session.execute(moderation_targets(ids, **filters)).scalars().all()
+    # Skip rows already done; a status filter is re-applied in case a report moved meanwhile.
+    guard = [CommunityReport.status != new_status]
+    if filters.get("status"):
+        guard.append(CommunityReport.status == filters["status"])
+    updated, user_ids = 0, set()
+    try:
+        for start in range(0, len(matched), batch_size):
+            batch = matched[start:start + batch_size]
+            owners = db.session.execute(
+                update(CommunityReport)
+                .where(CommunityReport.id.in_(batch), *guard)
+                .values(**values)
+                .returning(CommunityReport.user_id)
+                .execution_options(synchronize_session=False)
+            ).scalars().all()
+            updated += len(owners)
+            user_ids.update(owners)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return {"action": action, "status": new_status, "matched": len(matched), "updated": updated,
+            "skipped": len(matched) - updated, "user_ids": user_ids}
@@ -0,0 +1,173 @@
+# Explanation: Offline-first static bundle: pre-rendered public pages plus a compact JSON of
+# resources and articles, content-hashed and precompressed, served by a service worker.
+import fcntl
+import gzip
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from flask import render_template
+from sqlalchemy import Float, select, type_coerce
+from python.models import db, Article, ContentVersion, Resource
+from python.pagination import KeysetPage
+
+try:
+    import brotli
+except ImportError:  # optional: .br files are only written when the brotli package is installed
+    brotli = None
+
+# Logical file -> content it is built from (content_version names).
+ARTIFACTS = {
+    "educationalhub.html": ("articles",),
+    "resourcedirectory.html": ("resources",),
+    "data.json": ("articles", "resources"),
+}
+# Same-origin assets the pages need, precached by the service worker with the bundle.
+ASSETS = ["/static/css/style.css"]
+
+
+def _articles():
+    return Article.query.order_by(Article.published_at.desc(), Article.id.desc()).all()
+
+
+def _resources():
+    return Resource.query.order_by(Resource.category.asc(), Resource.id.asc()).all()
+
+
+def _whole(rows):
+    # The snapshot is a single page: no cursors, no "older" link.
+    return KeysetPage(rows, max(len(rows), 1))
+
+
+def render_data_json():
+    resources = db.session.execute(
+        select(Resource.id, Resource.name, Resource.category, Resource.address, Resource.contact,
+               type_coerce(Resource.latitude, Float).label("lat"), type_coerce(Resource.longitude, Float).label("lon"),
+               Resource.updated_at).order_by(Resource.id)).mappings().all()
+    articles = db.session.execute(
+        select(Article.id, Article.title, Article.category, Article.content, Article.published_at)
+        .order_by(Article.published_at.desc(), Article.id.desc())).mappings().all()
+
+    def plain(row):
+        return {k: v.isoformat() if isinstance(v, datetime) else v for k, v in row.items()}
+
+    payload = {"resources": [plain(r) for r in resources], "articles": [plain(a) for a in articles]}
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+class OfflineBundle:
+    # Builds are incremental: an artifact is re-rendered only when a content_version it depends
+    # on moved since the last manifest. Unchanged content keeps its hashed file name, so CDNs
+    # and service workers keep their copies. A file lock serializes builds across workers.
+    def __init__(self):
+        self.app = None
+        self.directory = None
+        self.auto_rebuild = False
+        self.delay = 2.0
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        self.directory = app.config.get("OFFLINE_BUNDLE_DIR") or os.path.join(app.static_folder, "offline")
+        self.auto_rebuild = app.config.get("OFFLINE_AUTO_REBUILD", True)
+        self.delay = app.config.get("OFFLINE_REBUILD_DELAY", 2.0)
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.directory, "manifest.json")
+
+    def _render(self, name):
+        if name == "data.json":
+            return render_data_json()
+        with self.app.test_request_context("/" + name[:-len(".html")]):
+            if name == "educationalhub.html":
+                html = render_template("educationalhub.html", articles=_whole(_articles()))
+            else:
+                html = render_template("resourcedirectory.html", resources=_whole(_resources()))
+        return html.encode("utf-8")
+
+    def _write(self, name, body):
+        stem, ext = name.rsplit(".", 1)
+        hashed = f"{stem}.{hashlib.sha256(body).hexdigest()[:12]}.{ext}"
+        path = os.path.join(self.directory, hashed)
+        if not os.path.exists(path):
+            variants = [(path + ".gz", gzip.compress(body, 9, mtime=0))]
+            if brotli is not None:
+                variants.append((path + ".br", brotli.compress(body)))
+            for target, data in variants + [(path, body)]:
+                _atomic_write(target, data)
+        return hashed
+
+    def build(self, force=False):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, ".lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            previous = self.manifest()
+            versions = dict(db.session.execute(select(ContentVersion.name, ContentVersion.version)).all())
+            files, rebuilt = {}, []
+            for name, content in ARTIFACTS.items():
+                old = previous.get("files", {}).get(name)
+                unchanged = all(previous.get("content_versions", {}).get(c) == versions.get(c, 0) for c in content)
+                if not force and old and unchanged and os.path.exists(os.path.join(self.directory, old)):
+                    files[name] = old
+                    continue
+                files[name] = self._write(name, self._render(name))
+                rebuilt.append(name)
+            manifest = {
+                "version": hashlib.sha256(json.dumps(files, sort_keys=True).encode()).hexdigest()[:12],
+                "generated_at": datetime.utcnow().isoformat(),
+                "content_versions": {name: versions.get(name, 0) for name in {c for v in ARTIFACTS.values() for c in v}},
+                "files": files,
+                "assets": ASSETS,
+                # Kept one generation so clients mid-update can still fetch the files they listed.
+                "previous_files": sorted(set(previous.get("files", {}).values()) - set(files.values())),
+            }
+            _atomic_write(self.manifest_path, json.dumps(manifest, indent=2).encode("utf-8"))
+            self._prune(set(files.values()) | set(manifest["previous_files"]))
+        return dict(manifest, rebuilt=rebuilt)
+
+    def _prune(self, keep):
+        for entry in os.scandir(self.directory):
+            base = entry.name
+            for suffix in (".gz", ".br"):
+                if base.endswith(suffix):
+                    base = base[:-len(suffix)]
+            if base.count(".") == 2 and base not in keep:
+                os.remove(entry.path)
+
+    def manifest(self):
+        try:
+            with open(self.manifest_path) as handle:
+                return json.load(handle)
+        except (OSError, ValueError):
+            return {}
+
+    def schedule_rebuild(self):
+        # Debounced background rebuild after an admin write; only once a bundle has been built.
+        if not self.auto_rebuild or not os.path.exists(self.manifest_path):
+            return
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.delay, self._rebuild)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _rebuild(self):
+        with self.app.app_context():
+            try:
+                self.build()
+            except Exception:
+                self.app.logger.exception("Offline bundle rebuild failed")
+
+
+def _atomic_write(path, data):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as handle:
+        handle.write(data)
+    os.replace(tmp, path)
+
+
+offline_bundle = OfflineBundle()
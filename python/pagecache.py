@@ -0,0 +1,223 @@
+# Explanation: Rendered-page cache for anonymous GETs of public pages, with ETag/Last-Modified.
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+import time
+from datetime import datetime
+from functools import wraps
+from flask import Response, make_response, request, session
+from sqlalchemy import event, select, text
+from python.cache import TTLCache
+from python.models import db, ContentVersion
+
+# Content name -> tables whose writes change it. Triggers bump the version inside the writing
+# transaction, so admin_add_article(), admin_resources(), imports and raw SQL all invalidate.
+CONTENT_TABLES = {"articles": ("article",), "resources": ("resource",)}
+
+
+def _bump(name):
+    return (f"INSERT INTO content_version (name, version, updated_at) "
+            f"VALUES ('{name}', 1, strftime('%Y-%m-%d %H:%M:%S.000000', 'now')) "
+            f"ON CONFLICT (name) DO UPDATE SET version = version + 1, updated_at = excluded.updated_at; ")
+
+
+CONTENT_VERSION_SCHEMA = [
+    f"CREATE TRIGGER IF NOT EXISTS content_version_{table}_{op[0].lower()} AFTER {op} ON {table} BEGIN {_bump(name)}END"
+    for name, tables in CONTENT_TABLES.items() for table in tables for op in ("INSERT", "UPDATE", "DELETE")
+]
+
+
+@event.listens_for(db.metadata, "after_create")
+def create_content_version_triggers(target, connection, **kw):
+    if connection.dialect.name == "sqlite":
+        for statement in CONTENT_VERSION_SCHEMA:
+            connection.exec_driver_sql(statement)
+
+
+def bump_content_versions(names=CONTENT_TABLES):
+    for name in names:
+        db.session.execute(text(_bump(name)))
+    db.session.commit()
+
+
+def versions_query(names):
+    return (select(ContentVersion.name, ContentVersion.version, ContentVersion.updated_at)
+            .where(ContentVersion.name.in_(names)))
+
+
+def content_versions(names, rows):
+    # (version per name, newest updated_at) from versions_query() rows; missing names are 0.
+    found = {row.name: row for row in rows}
+    versions = tuple(found[name].version if name in found else 0 for name in names)
+    last_modified = max((row.updated_at for row in rows), default=datetime(2000, 1, 1))
+    return versions, last_modified
+
+
+class MemoryBackend:
+    # Per-worker LRU; each gunicorn worker warms its own copy.
+    def __init__(self, maxsize=512, ttl=300.0):
+        self.cache = TTLCache(maxsize, ttl)
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, entry):
+        self.cache.set(key, entry)
+
+    def clear(self):
+        self.cache.clear()
+
+    def stats(self):
+        stats = self.cache.stats()
+        return {"backend": "memory", "size": stats["size"], "maxsize": stats["maxsize"], "evictions": stats["evictions"]}
+
+
+class FileSystemBackend:
+    # One pickle per key in a shared directory, so every worker on the host reuses a render.
+    # Point it at /dev/shm for a shared-memory store. Writes are atomic (rename); entries
+    # older than `ttl` are ignored and swept every `sweep_every` writes.
+    def __init__(self, directory, ttl=300.0, sweep_every=200):
+        self.directory = directory
+        self.ttl = ttl
+        self.sweep_every = sweep_every
+        self._writes = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".page")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            if os.path.getmtime(path) + self.ttl < time.time():
+                return None
+            with open(path, "rb") as handle:
+                entry = pickle.load(handle)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        return entry if entry.get("key") == key else None
+
+    def set(self, key, entry):
+        handle = tempfile.NamedTemporaryFile(dir=self.directory, suffix=".tmp", delete=False)
+        with handle:
+            pickle.dump(dict(entry, key=key), handle, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(handle.name, self._path(key))
+        self._writes += 1
+        if self._writes % self.sweep_every == 0:
+            self._sweep()
+
+    def _sweep(self):
+        cutoff = time.time() - self.ttl
+        for entry in os.scandir(self.directory):
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+            except OSError:
+                pass
+
+    def clear(self):
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".page"):
+                os.remove(entry.path)
+
+    def stats(self):
+        return {"backend": "filesystem", "directory": self.directory,
+                "size": sum(1 for e in os.scandir(self.directory) if e.name.endswith(".page"))}
+
+
+class PageCache:
+    # Anonymous GETs are keyed on (endpoint, path with query string, content versions): a write
+    # bumps the version, so the next request misses and renders fresh. Logged-in users, flash
+    # messages and non-200 responses are never cached.
+    def __init__(self):
+        self.enabled = True
+        self.backend = MemoryBackend()
+        self._lock = threading.Lock()
+        self.counts = {"hits": 0, "misses": 0, "not_modified": 0, "bypassed": 0}
+
+    def init_app(self, app):
+        self.enabled = app.config.get("PAGE_CACHE_ENABLED", True)
+        ttl = app.config.get("PAGE_CACHE_TTL", 300)
+        if app.config.get("PAGE_CACHE_BACKEND", "memory") == "filesystem":
+            directory = app.config.get("PAGE_CACHE_DIR") or os.path.join(app.instance_path, "page_cache")
+            self.backend = FileSystemBackend(directory, ttl)
+        else:
+            self.backend = MemoryBackend(app.config.get("PAGE_CACHE_SIZE", 512), ttl)
+
+    def _count(self, name):
+        with self._lock:
+            self.counts[name] += 1
+
+    def versions(self, names):
+        return content_versions(names, db.session.execute(versions_query(names)).all())
+
+    def bypass(self):
+        # Only anonymous GETs with no pending flash messages share a cached render.
+        if (not self.enabled or request.method not in ("GET", "HEAD")
+                or session.get("user_id") or session.get("_flashes")):
+            self._count("bypassed")
+            return True
+        return False
+
+    def key(self, versions):
+        return f"{request.endpoint}|{request.full_path}|{versions}"
+
+    def lookup(self, key):
+        entry = self.backend.get(key)
+        self._count("misses" if entry is None else "hits")
+        return entry
+
+    def store(self, key, response, last_modified):
+        # Returns the stored entry, or None for responses that must not be cached.
+        if response.status_code != 200 or response.direct_passthrough:
+            return None
+        body = response.get_data()
+        entry = {"body": body, "mimetype": response.mimetype, "last_modified": last_modified,
+                 "etag": hashlib.sha1(body).hexdigest()[:20]}
+        self.backend.set(key, entry)
+        return entry
+
+    def respond(self, entry):
+        response = Response(entry["body"], mimetype=entry["mimetype"])
+        response.set_etag(entry["etag"])
+        response.last_modified = entry["last_modified"]
+        # Browsers revalidate every time; unchanged pages cost a 304 with no body.
+        response.cache_control.no_cache = True
+        response.vary.add("Cookie")
+        response = response.make_conditional(request)
+        if response.status_code == 304:
+            self._count("not_modified")
+        return response
+
+    def cached(self, *content):
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if self.bypass():
+                    return view(*args, **kwargs)
+                versions, last_modified = self.versions(content)
+                key = self.key(versions)
+                entry = self.lookup(key)
+                if entry is None:
+                    response = make_response(view(*args, **kwargs))
+                    entry = self.store(key, response, last_modified)
+                    if entry is None:
+                        return response
+                return self.respond(entry)
+            return wrapper
+        return decorator
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self.counts)
+        lookups = counts["hits"] + counts["misses"]
+        return dict(counts, **self.backend.stats(), enabled=self.enabled,
+                    hit_ratio=round(counts["hits"] / lookups, 4) if lookups else 0.0)
+
+
+page_cache = PageCache()
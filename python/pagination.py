@@ -0,0 +1,144 @@
+# Explanation: Keyset (cursor) pagination so list views fetch one bounded page per request.
+import base64
+import json
+from datetime import datetime
+from flask import abort, current_app, request, url_for
+from sqlalchemy import and_, false, or_
+from sqlalchemy.sql import operators
+
+
+class KeysetPage:
+    # One page of rows plus an opaque cursor pointing just past the last row.
+    def __init__(self, items, per_page, cursor=None, next_cursor=None):
+        self.items = items
+        self.per_page = per_page
+        self.cursor = cursor
+        self.next_cursor = next_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def _url(self, cursor):
+        # Same endpoint and query string, with the cursor swapped.
+        args = request.args.to_dict()
+        args.pop("cursor", None)
+        if cursor:
+            args["cursor"] = cursor
+        return url_for(request.endpoint, **(request.view_args or {}), **args)
+
+    @property
+    def next_url(self):
+        return self._url(self.next_cursor) if self.has_next else None
+
+    @property
+    def first_url(self):
+        return self._url(None)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def _split(expr):
+    # `Model.col.desc()` -> (col, True); a bare column or `.asc()` -> (col, False).
+    modifier = getattr(expr, "modifier", None)
+    if modifier is operators.desc_op:
+        return expr.element, True
+    if modifier is operators.asc_op:
+        return expr.element, False
+    return expr, False
+
+
+def encode_cursor(values):
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, order):
+    # Raises ValueError on anything that is not a cursor produced for this ordering.
+    raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+    values = json.loads(raw)
+    if not isinstance(values, list) or len(values) != len(order):
+        raise ValueError("cursor does not match ordering")
+    decoded = []
+    for expr, value in zip(order, values):
+        column, _ = _split(expr)
+        if value is not None and column.type.python_type is datetime:
+            value = datetime.fromisoformat(value)
+        decoded.append(value)
+    return decoded
+
+
+def keyset_filter(order, values):
+    # Rows strictly after `values` in `order`, written as range conditions SQLite can seek on.
+    # NULLs sort first ascending and last descending; a descending NULL tail is fetched
+    # separately by keyset_paginate so the OR here never defeats the index.
+    clauses = []
+    for i, (expr, value) in enumerate(zip(order, values)):
+        column, descending = _split(expr)
+        if value is None:
+            after = false() if descending else column.isnot(None)
+        else:
+            after = column < value if descending else column > value
+        equal_prefix = [_split(e)[0].is_(None) if v is None else _split(e)[0] == v
+                        for e, v in zip(order[:i], values[:i])]
+        clauses.append(and_(*equal_prefix, after))
+    return or_(*clauses)
+
+
+def _page_params(order, per_page, cursor):
+    # Reads ?cursor= and ?per_page= from the request (like Flask-SQLAlchemy's paginate),
+    # aborting with 400 on a malformed cursor.
+    max_per_page = current_app.config.get("MAX_PAGE_SIZE", 100)
+    if per_page is None:
+        per_page = request.args.get("per_page", current_app.config.get("PAGE_SIZE", 20), type=int)
+    per_page = max(1, min(per_page, max_per_page))
+    if cursor is None:
+        cursor = request.args.get("cursor") or None
+    values = None
+    if cursor:
+        try:
+            values = decode_cursor(cursor, order)
+        except (ValueError, TypeError):
+            abort(400)
+    return per_page, cursor, values
+
+
+def _needs_null_tail(order, values, rows, per_page):
+    # Non-null range of a descending nullable leading key exhausted: continue into its NULL rows.
+    lead, lead_descending = _split(order[0])
+    return bool(values and values[0] is not None and lead_descending and lead.nullable and len(rows) <= per_page)
+
+
+def _make_page(rows, order, per_page, cursor):
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last = rows[-1]
+        next_cursor = encode_cursor([getattr(last, _split(expr)[0].key) for expr in order])
+    return KeysetPage(rows, per_page, cursor=cursor, next_cursor=next_cursor)
+
+
+def keyset_paginate(query, order, per_page=None, cursor=None):
+    # `order` must end in a unique column (id).
+    per_page, cursor, values = _page_params(order, per_page, cursor)
+    base = query.order_by(None).order_by(*order)
+    rows = (base.filter(keyset_filter(order, values)) if values else base).limit(per_page + 1).all()
+    if _needs_null_tail(order, values, rows, per_page):
+        rows += base.filter(_split(order[0])[0].is_(None)).limit(per_page + 1 - len(rows)).all()
+    return _make_page(rows, order, per_page, cursor)
+
+
+async def keyset_paginate_async(session, statement, order, per_page=None, cursor=None):
+    # keyset_paginate for an AsyncSession and a select() of one entity (the ASGI read path).
+    per_page, cursor, values = _page_params(order, per_page, cursor)
+    base = statement.order_by(None).order_by(*order)
+    page = base.where(keyset_filter(order, values)) if values else base
+    rows = list((await session.execute(page.limit(per_page + 1))).scalars().all())
+    if _needs_null_tail(order, values, rows, per_page):
+        tail = base.where(_split(order[0])[0].is_(None)).limit(per_page + 1 - len(rows))
+        rows += (await session.execute(tail)).scalars().all()
+    return _make_page(rows, order, per_page, cursor)
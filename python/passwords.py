@@ -0,0 +1,174 @@
+# Explanation: Password hashing service. Hashes run in a small process pool so a burst of logins
+# does not hold the GIL in the request threads; the method/cost is configurable and stored hashes
+# made with older settings are upgraded on the next successful login.
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class HasherBusy(Exception):
+    # Raised when PASSWORD_HASH_MAX_PENDING hashes are already queued or running (backpressure).
+    pass
+
+
+class TooManyAttempts(Exception):
+    # Raised when one client IP or one email already has PASSWORD_LOGIN_CONCURRENCY checks in flight.
+    pass
+
+
+def _method_prefix(stored):
+    # "scrypt:32768:8:1$salt$hash" -> "scrypt:32768:8:1"
+    return stored.split("$", 1)[0] if stored else ""
+
+
+def _init_worker(parent_pid):
+    # Forked workers inherit the server's signal handlers (uvicorn, gunicorn): restore SIGTERM,
+    # leave Ctrl-C to the parent, and exit if the parent dies without shutting the pool down.
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    threading.Thread(target=_exit_with_parent, args=(parent_pid,), daemon=True).start()
+
+
+def _exit_with_parent(parent_pid):
+    while os.getppid() == parent_pid:
+        time.sleep(1)
+    os._exit(0)
+
+
+class PasswordHasher:
+    def __init__(self):
+        self.method = "scrypt"
+        self.prefix = None
+        self.workers = 0
+        self.max_pending = 64
+        self.timeout = 10.0
+        self.concurrency = 2
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+        self._metrics_lock = threading.Lock()
+        self.metrics = {"hashed": 0, "checked": 0, "rehashed": 0, "busy": 0, "throttled": 0}
+
+    def init_app(self, app):
+        self.method = app.config.get("PASSWORD_HASH_METHOD", "scrypt")
+        # Canonical prefix of the configured method (werkzeug fills in default cost parameters).
+        self.prefix = _method_prefix(generate_password_hash("", self.method))
+        self.workers = app.config.get("PASSWORD_HASH_WORKERS", os.cpu_count() or 1)
+        self.max_pending = app.config.get("PASSWORD_HASH_MAX_PENDING", 64)
+        self.timeout = app.config.get("PASSWORD_HASH_TIMEOUT", 10.0)
+        self.concurrency = app.config.get("PASSWORD_LOGIN_CONCURRENCY", 2)
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+
+    def count(self, name):
+        with self._metrics_lock:
+            self.metrics[name] += 1
+
+    def _pool(self):
+        # Started lazily and per process, so a pool created before a gunicorn fork is not reused.
+        # Forked (all workers at once, on first use): spawn/forkserver would re-run the main script
+        # of `flask run` or a bench script in every worker. The children only run hashlib.
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context("fork" if "fork" in methods else "spawn")
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=context, initializer=_init_worker,
+                                                     initargs=(os.getpid(),))
+                self._pid = os.getpid()
+            return self._executor
+
+    def _run(self, fn, *args):
+        if self.workers <= 0:
+            return fn(*args)
+        try:
+            return self._wait(fn, *args)
+        except BrokenProcessPool:
+            # A worker died mid-hash (OOM killer, ...): run the hash once more on a fresh pool.
+            return self._wait(fn, *args)
+
+    def _wait(self, fn, *args):
+        # Reject at once beyond max_pending rather than parking the request thread for a slot.
+        if not self._slots.acquire(blocking=False):
+            self.count("busy")
+            raise HasherBusy("password hashing queue is full")
+        try:
+            future = self._submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # The slot is held until the hash finishes, even if this request stops waiting for it.
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            # The request thread waits on the future without holding the GIL.
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            self.count("busy")
+            raise HasherBusy("password hashing timed out")
+
+    def _submit(self, fn, *args):
+        # Submit to the pool, replacing it once if it is broken.
+        executor = self._pool()
+        try:
+            return executor.submit(fn, *args)
+        except BrokenProcessPool:
+            self._discard(executor)
+            return self._pool().submit(fn, *args)
+
+    def _discard(self, executor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False)
+
+    def hash(self, raw_password):
+        self.count("hashed")
+        return self._run(generate_password_hash, raw_password, self.method)
+
+    def verify(self, stored, raw_password):
+        self.count("checked")
+        return self._run(check_password_hash, stored, raw_password)
+
+    def needs_rehash(self, stored):
+        return self.prefix is not None and _method_prefix(stored) != self.prefix
+
+    @contextmanager
+    def limit(self, *keys):
+        # Per-key cap on concurrent checks (e.g. client IP and email) so one client cannot occupy
+        # the whole pool. Keys that are None are ignored.
+        keys = [key for key in keys if key]
+        with self._inflight_lock:
+            if any(self._inflight.get(key, 0) >= self.concurrency for key in keys):
+                self.count("throttled")
+                raise TooManyAttempts("too many concurrent login attempts")
+            for key in keys:
+                self._inflight[key] = self._inflight.get(key, 0) + 1
+        try:
+            yield
+        finally:
+            with self._inflight_lock:
+                for key in keys:
+                    if self._inflight[key] <= 1:
+                        del self._inflight[key]
+                    else:
+                        self._inflight[key] -= 1
+
+    def stats(self):
+        return dict(self.metrics, method=self.prefix, workers=self.workers, max_pending=self.max_pending,
+                    in_flight_keys=len(self._inflight))
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+
+
+passwords = PasswordHasher()
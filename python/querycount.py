@@ -0,0 +1,23 @@
+# Explanation: Per-request SQL statement counter (exposed as an X-Query-Count response header).
+from flask import g, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        g.query_count = g.get("query_count", 0) + 1
+
+
+def request_query_count():
+    # Number of statements the current request has executed so far.
+    return g.get("query_count", 0)
+
+
+def init_app(app):
+    @app.after_request
+    def add_query_count_header(response):
+        if app.config.get("QUERY_COUNT_HEADER"):
+            response.headers["X-Query-Count"] = str(request_query_count())
+        return response
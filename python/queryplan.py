@@ -0,0 +1,39 @@
+# Explanation: EXPLAIN QUERY PLAN helpers that catch full-table scans on hot per-user queries.
+from datetime import datetime
+from sqlalchemy import text
+from python.models import db, CommunityReport, SafetyCheck, EmergencyPlan
+from python.pagination import keyset_filter
+
+
+def history_queries(user_id):
+    # The per-user "latest N" lookups issued by home(), communityreport(), safetycheck()
+    # and emergencyplangenerator().
+    return {
+        "home: recent reports": CommunityReport.latest_for_user(user_id).limit(5),
+        "home: latest safety check": SafetyCheck.latest_for_user(user_id).limit(1),
+        "home: latest plan": EmergencyPlan.latest_for_user(user_id).limit(1),
+        "communityreport: my reports": CommunityReport.latest_for_user(user_id),
+        "safetycheck: history": SafetyCheck.latest_for_user(user_id),
+        "emergencyplangenerator: plans": EmergencyPlan.latest_for_user(user_id),
+        "communityreport: my reports (next page)": _next_page(CommunityReport, user_id),
+        "safetycheck: history (next page)": _next_page(SafetyCheck, user_id),
+        "emergencyplangenerator: plans (next page)": _next_page(EmergencyPlan, user_id),
+    }
+
+
+def _next_page(model, user_id, per_page=20):
+    # A keyset page past an arbitrary cursor, as built by keyset_paginate().
+    order = model.history_order()
+    return model.latest_for_user(user_id).filter(keyset_filter(order, [datetime.utcnow(), 1])).limit(per_page + 1)
+
+
+def explain(query):
+    # Compile the ORM query with inlined parameters and return SQLite's plan steps.
+    compiled = query.statement.compile(db.engine, compile_kwargs={"literal_binds": True})
+    rows = db.session.execute(text("EXPLAIN QUERY PLAN " + str(compiled))).all()
+    return [row[-1] for row in rows]
+
+
+def plan_problems(query):
+    # A full scan ("SCAN ...") or an explicit sort ("USE TEMP B-TREE") means the index is not used.
+    return [step for step in explain(query) if step.startswith("SCAN") or "TEMP B-TREE" in step]
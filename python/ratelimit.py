@@ -0,0 +1,204 @@
+# Explanation: Per-client token-bucket rate limits on the write and auth endpoints (RATE_LIMITS),
+# keyed by route plus client IP and/or account, so bots or panicked retries cannot crowd out
+# everyone else's writes. Buckets live in process memory, or in a small SQLite file (a /dev/shm
+# path makes it shared memory) so every worker on the host enforces the same limits.
+import math
+import os
+import threading
+import time
+from flask import jsonify, make_response, render_template, request, session
+from sqlalchemy import create_engine, text
+from python.models import db
+from python.sqlite import apply_pragmas
+
+RATE_LIMIT_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS rate_bucket (key TEXT PRIMARY KEY, tokens REAL NOT NULL, "
+    "updated_at REAL NOT NULL) WITHOUT ROWID",
+]
+
+
+def busy_response(status, message, retry_after):
+    # 429/503 with Retry-After: JSON for API clients, the busy page for browsers.
+    if request.path.startswith("/api/") or request.is_json:
+        response = jsonify(error=message, retry_after=retry_after)
+        response.status_code = status
+    else:
+        response = make_response(render_template("busy.html", message=message, retry_after=retry_after), status)
+    response.headers["Retry-After"] = str(retry_after)
+    return response
+
+
+def _refill(tokens, updated_at, capacity, rate, now):
+    return min(capacity, tokens + max(0.0, now - updated_at) * rate)
+
+
+class MemoryBucketStore:
+    # Buckets of this process only: with several workers each enforces its own copy of a limit.
+    backend = "memory"
+
+    def __init__(self):
+        self._buckets = {}  # key -> [tokens, updated_at]
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, rate, now, cost=1.0):
+        # (allowed, seconds until `cost` tokens are available).
+        with self._lock:
+            bucket = self._buckets.get(key)
+            tokens = capacity if bucket is None else _refill(bucket[0], bucket[1], capacity, rate, now)
+            if tokens >= cost:
+                self._buckets[key] = [tokens - cost, now]
+                return True, 0.0
+            return False, (cost - tokens) / rate
+
+    def purge(self, now, idle_seconds):
+        # A bucket idle long enough to have refilled is the same as no bucket.
+        with self._lock:
+            stale = [key for key, (_, updated_at) in self._buckets.items() if now - updated_at >= idle_seconds]
+            for key in stale:
+                del self._buckets[key]
+        return len(stale)
+
+    def stats(self):
+        return {"backend": self.backend, "buckets": len(self._buckets)}
+
+
+class SQLiteBucketStore:
+    # Buckets in their own SQLite file, shared by every worker on the host; one UPSERT per check.
+    backend = "sqlite"
+
+    def __init__(self, path, pragmas=None):
+        self.path = path
+        self.engine = create_engine(f"sqlite:///{path}")
+        apply_pragmas(self.engine, dict(pragmas or {}, journal_mode="WAL", synchronous="OFF"))
+        with self.engine.begin() as connection:
+            for statement in RATE_LIMIT_SCHEMA:
+                connection.execute(text(statement))
+
+    def take(self, key, capacity, rate, now, cost=1.0):
+        params = {"key": key, "capacity": capacity, "rate": rate, "now": now, "cost": cost}
+        with self.engine.begin() as connection:
+            # Refill and spend in one statement; the conditional DO UPDATE returns no row when empty.
+            spent = connection.execute(text(
+                "INSERT INTO rate_bucket (key, tokens, updated_at) VALUES (:key, :capacity - :cost, :now) "
+                "ON CONFLICT (key) DO UPDATE SET "
+                "tokens = min(:capacity, tokens + max(0, :now - updated_at) * :rate) - :cost, updated_at = :now "
+                "WHERE min(:capacity, tokens + max(0, :now - updated_at) * :rate) >= :cost "
+                "RETURNING tokens"), params).first()
+            if spent is not None:
+                return True, 0.0
+            row = connection.execute(text("SELECT tokens, updated_at FROM rate_bucket WHERE key = :key"),
+                                     {"key": key}).first()
+        tokens = _refill(row[0], row[1], capacity, rate, now) if row else capacity
+        return False, max(0.0, cost - tokens) / rate
+
+    def purge(self, now, idle_seconds):
+        with self.engine.begin() as connection:
+            return connection.execute(text("DELETE FROM rate_bucket WHERE updated_at <= :cutoff"),
+                                      {"cutoff": now - idle_seconds}).rowcount
+
+    def stats(self):
+        with self.engine.connect() as connection:
+            buckets = connection.execute(text("SELECT count(*) FROM rate_bucket")).scalar()
+        return {"backend": self.backend, "path": self.path, "buckets": buckets}
+
+
+class RateLimiter:
+    def __init__(self):
+        self.enabled = False
+        self.store = None
+        self.rules = {}  # endpoint -> {scope: (burst, per_seconds)}
+        self.methods = ("POST",)
+        self.idle_seconds = 60.0
+        self.purge_seconds = 300
+        self._last_purge = time.time()
+        self._purge_lock = threading.Lock()
+        self._metrics_lock = threading.Lock()
+        self.metrics = {"checked": 0, "limited": 0}
+        self.limited = {}  # endpoint -> requests refused
+
+    def init_app(self, app):
+        self.enabled = app.config.get("RATE_LIMIT_ENABLED", True)
+        self.rules = app.config.get("RATE_LIMITS") or {}
+        self.methods = tuple(app.config.get("RATE_LIMIT_METHODS", ("POST",)))
+        self.purge_seconds = app.config.get("RATE_LIMIT_PURGE_SECONDS", 300)
+        self.idle_seconds = max([per for scopes in self.rules.values() for _, per in scopes.values()] or [60])
+        if not self.enabled or not self.rules:
+            return
+        backend = app.config.get("RATE_LIMIT_BACKEND", "memory")
+        if backend == "sqlite":
+            path = app.config.get("RATE_LIMIT_DATABASE")
+            if not path:
+                with app.app_context():
+                    database = db.engine.url.database
+                if not database or database == ":memory:":
+                    raise ValueError("RATE_LIMIT_BACKEND=sqlite needs RATE_LIMIT_DATABASE with an in-memory database")
+                path = os.path.join(os.path.dirname(os.path.abspath(database)), "ratelimit.db")
+            pragmas = {name: value for name, value in (app.config.get("SQLITE_PRAGMAS") or {}).items()
+                       if name in ("busy_timeout", "cache_size", "temp_store")}
+            self.store = SQLiteBucketStore(path, pragmas)
+        elif backend == "memory":
+            self.store = MemoryBucketStore()
+        else:
+            raise ValueError(f"Unknown RATE_LIMIT_BACKEND {backend!r}")
+
+        @app.before_request
+        def enforce_rate_limits():
+            if request.method in self.methods:
+                scopes = self.rules.get(request.endpoint)
+                if scopes:
+                    return self.check(request.endpoint, scopes)
+
+    def _subject(self, scope):
+        # Who a bucket belongs to: the client IP, or the account (logged-in user, else the email
+        # a login/registration form names).
+        if scope == "ip":
+            return request.remote_addr
+        if session.get("user_id"):
+            return f"id:{session['user_id']}"
+        email = request.form.get("email", "").strip().lower()
+        return f"email:{email}" if email else None
+
+    def check(self, endpoint, scopes):
+        # One bucket per (route, scope, subject); the account bucket is tried first so a refused
+        # request does not also spend the shared IP bucket (many people behind one shelter NAT).
+        now = time.time()
+        self._count(checked=1)
+        for scope in sorted(scopes, key=lambda name: name == "ip"):
+            subject = self._subject(scope)
+            if subject is None:
+                continue
+            burst, per_seconds = scopes[scope]
+            allowed, wait = self.store.take(f"{endpoint}:{scope}:{subject}", burst, burst / per_seconds, now)
+            if not allowed:
+                self._count(limited=1)
+                with self._metrics_lock:
+                    self.limited[endpoint] = self.limited.get(endpoint, 0) + 1
+                return busy_response(429, "Too many requests. Please wait a moment and try again.",
+                                     max(1, math.ceil(wait)))
+        self.maybe_purge(now)
+        return None
+
+    def maybe_purge(self, now):
+        if now - self._last_purge < self.purge_seconds or not self._purge_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_purge = now
+            self.store.purge(now, self.idle_seconds)
+        finally:
+            self._purge_lock.release()
+
+    def _count(self, **deltas):
+        with self._metrics_lock:
+            for key, delta in deltas.items():
+                self.metrics[key] += delta
+
+    def stats(self):
+        stats = dict(self.metrics, enabled=self.enabled, limited_by_endpoint=dict(self.limited),
+                     rules={endpoint: {scope: list(rule) for scope, rule in scopes.items()}
+                            for endpoint, scopes in self.rules.items()})
+        if self.store is not None:
+            stats["store"] = self.store.stats()
+        return stats
+
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,199 @@
+# Explanation: Incremental situation-report rollups (per-minute and per-hour counters).
+from datetime import datetime, timedelta
+from sqlalchemy import bindparam, event, func, literal, select, text, union_all
+from python.models import db, ReportRollup, SafetyRollup
+
+GRANULARITIES = {"minute": "%Y-%m-%d %H:%M:00.000000", "hour": "%Y-%m-%d %H:00:00.000000"}
+REPORT_DIMENSIONS = ("disaster_type", "status", "area")
+
+# Bucket keys are written in SQLAlchemy's SQLite DateTime format so they compare with bound
+# datetimes. Areas are the location lowercased with its comma-separated parts joined by ", "
+# ("01 munlawin sur, alitagtag, batangas"); an area filter matches whole parts, so "Alitagtag"
+# or "Alitagtag, Batangas" selects every address in that municipality.
+_AREA_SQL = "replace(replace(replace(lower(trim({})), ', ', ','), ' ,', ','), ',', ', ')"
+_REPORT_KEY = {
+    "disaster_type": "{row}.disaster_type",
+    "status": "{row}.status",
+    "area": _AREA_SQL.format("{row}.location"),
+}
+
+
+def normalize_area(value):
+    # Python twin of _AREA_SQL for a requested area.
+    return ", ".join(part.strip() for part in value.lower().split(","))
+
+
+def area_key(column):
+    # _AREA_SQL as a SQLAlchemy expression over a location column.
+    value = func.lower(func.trim(column))
+    return func.replace(func.replace(func.replace(value, ", ", ","), " ,", ","), ",", ", ")
+
+
+def area_matches(key, area):
+    # Whether the normalized location `key` contains `area` as whole comma-separated parts.
+    pattern = normalize_area(area).replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return (literal(", ") + key + literal(", ")).like(f"%, {pattern}, %", escape="\\")
+
+
+def _bucket(granularity, column):
+    return f"strftime('{GRANULARITIES[granularity]}', coalesce({column}, CURRENT_TIMESTAMP))"
+
+
+def _report_upserts(row, delta):
+    key = ", ".join(_REPORT_KEY[d].format(row=row) for d in REPORT_DIMENSIONS)
+    return "".join(
+        f"INSERT INTO report_rollup (granularity, bucket, disaster_type, status, area, count) "
+        f"VALUES ('{g}', {_bucket(g, row + '.created_at')}, {key}, {delta}) "
+        f"ON CONFLICT DO UPDATE SET count = count + excluded.count; "
+        for g in GRANULARITIES)
+
+
+def _safety_upserts(row, delta):
+    return "".join(
+        f"INSERT INTO safety_rollup (granularity, bucket, status, count) "
+        f"VALUES ('{g}', {_bucket(g, row + '.created_at')}, {row}.status, {delta}) "
+        f"ON CONFLICT DO UPDATE SET count = count + excluded.count; "
+        for g in GRANULARITIES)
+
+
+# Triggers keep the counters current for every write path (ORM routes, bulk executemany,
+# write-behind, raw SQL) inside the writing transaction. A status change moves one report
+# from its old counter to its new one in the bucket it was created in.
+ROLLUP_SCHEMA = [
+    f"CREATE TRIGGER IF NOT EXISTS report_rollup_ai AFTER INSERT ON community_report BEGIN "
+    f"{_report_upserts('new', 1)}END",
+    f"CREATE TRIGGER IF NOT EXISTS report_rollup_ad AFTER DELETE ON community_report BEGIN "
+    f"{_report_upserts('old', -1)}END",
+    f"CREATE TRIGGER IF NOT EXISTS report_rollup_au AFTER UPDATE OF disaster_type, status, location, created_at "
+    f"ON community_report WHEN old.disaster_type IS NOT new.disaster_type OR old.status IS NOT new.status "
+    f"OR old.location IS NOT new.location OR old.created_at IS NOT new.created_at BEGIN "
+    f"{_report_upserts('old', -1)}{_report_upserts('new', 1)}END",
+    f"CREATE TRIGGER IF NOT EXISTS safety_rollup_ai AFTER INSERT ON safety_check BEGIN "
+    f"{_safety_upserts('new', 1)}END",
+    f"CREATE TRIGGER IF NOT EXISTS safety_rollup_ad AFTER DELETE ON safety_check BEGIN "
+    f"{_safety_upserts('old', -1)}END",
+    f"CREATE TRIGGER IF NOT EXISTS safety_rollup_au AFTER UPDATE OF status, created_at ON safety_check "
+    f"WHEN old.status IS NOT new.status OR old.created_at IS NOT new.created_at BEGIN "
+    f"{_safety_upserts('old', -1)}{_safety_upserts('new', 1)}END",
+]
+
+
+@event.listens_for(db.metadata, "after_create")
+def create_rollup_triggers(target, connection, **kw):
+    if connection.dialect.name == "sqlite":
+        for statement in ROLLUP_SCHEMA:
+            connection.exec_driver_sql(statement)
+
+
+def backfill_rollups(reports, safety_checks):
+    # Recompute every counter in one transaction (writers wait on the lock). `reports` and
+    # `safety_checks` are SELECTs over the full history (archive.history_query: the hot table plus
+    # its archive partitions), so rows that were archived keep their counts.
+    reports, safety_checks = (str(source.compile(dialect=db.engine.dialect)) for source in (reports, safety_checks))
+    db.session.execute(text("DELETE FROM report_rollup"))
+    db.session.execute(text("DELETE FROM safety_rollup"))
+    key = ", ".join(_REPORT_KEY[d].format(row="r") for d in REPORT_DIMENSIONS)
+    for g in GRANULARITIES:
+        db.session.execute(text(
+            f"INSERT INTO report_rollup (granularity, bucket, disaster_type, status, area, count) "
+            f"SELECT '{g}', {_bucket(g, 'r.created_at')} AS b, {key}, count(*) FROM ({reports}) r "
+            f"GROUP BY b, {key}"))
+        db.session.execute(text(
+            f"INSERT INTO safety_rollup (granularity, bucket, status, count) "
+            f"SELECT '{g}', {_bucket(g, 's.created_at')} AS b, s.status, count(*) FROM ({safety_checks}) s "
+            f"GROUP BY b, s.status"))
+    db.session.commit()
+    return {
+        "report_rollup": db.session.query(func.count()).select_from(ReportRollup).scalar(),
+        "safety_rollup": db.session.query(func.count()).select_from(SafetyRollup).scalar(),
+    }
+
+
+def preserve_rollups(table, ids):
+    # Archiving moves rows out of the hot tables, and their delete triggers take them out of the
+    # counters. Adding the rows back first (same transaction) keeps the rollups counting history.
+    if table == "community_report":
+        key = ", ".join(_REPORT_KEY[d].format(row="r") for d in REPORT_DIMENSIONS)
+        statements = [
+            f"INSERT INTO report_rollup (granularity, bucket, disaster_type, status, area, count) "
+            f"SELECT '{g}', {_bucket(g, 'r.created_at')} AS b, {key}, count(*) FROM community_report r "
+            f"WHERE r.id IN :ids GROUP BY b, {key} ON CONFLICT DO UPDATE SET count = count + excluded.count"
+            for g in GRANULARITIES]
+    else:
+        statements = [
+            f"INSERT INTO safety_rollup (granularity, bucket, status, count) "
+            f"SELECT '{g}', {_bucket(g, 's.created_at')} AS b, s.status, count(*) FROM safety_check s "
+            f"WHERE s.id IN :ids GROUP BY b, s.status ON CONFLICT DO UPDATE SET count = count + excluded.count"
+            for g in GRANULARITIES]
+    for statement in statements:
+        db.session.execute(text(statement).bindparams(bindparam("ids", expanding=True)), {"ids": list(ids)})
+
+
+def floor_time(moment, granularity):
+    moment = moment.replace(second=0, microsecond=0)
+    return moment.replace(minute=0) if granularity == "hour" else moment
+
+
+def _ceil_time(moment, granularity):
+    floored = floor_time(moment, granularity)
+    step = timedelta(hours=1) if granularity == "hour" else timedelta(minutes=1)
+    return floored if floored == moment else floored + step
+
+
+def _segments(start, end):
+    # Cover [start, end) with whole hour buckets in the middle and minute buckets at the
+    # edges, so a window costs at most ~118 minute rows plus one row per hour per key.
+    start, end = floor_time(start, "minute"), _ceil_time(end, "minute")
+    first_hour, last_hour = _ceil_time(start, "hour"), floor_time(end, "hour")
+    if first_hour >= last_hour:
+        return [("minute", start, end)]
+    segments = [("minute", start, first_hour), ("hour", first_hour, last_hour), ("minute", last_hour, end)]
+    return [s for s in segments if s[1] < s[2]]
+
+
+def _rollup_counts(model, dimensions, filters, start, end, interval=None):
+    group = [getattr(model, d) for d in dimensions]
+    segments = [(interval, floor_time(start, interval), end)] if interval else _segments(start, end)
+    parts = []
+    for granularity, low, high in segments:
+        query = select(*group, model.bucket, model.count).where(
+            model.granularity == granularity, model.bucket >= low, model.bucket < high)
+        for name, value in filters.items():
+            column = getattr(model, name)
+            query = query.where(area_matches(column, value) if name == "area" else column == value)
+        parts.append(query)
+    rows = union_all(*parts).subquery()
+    keys = [rows.c[d] for d in dimensions] + ([rows.c.bucket] if interval else [])
+    total = func.sum(rows.c.count).label("count")
+    query = select(*keys, total).group_by(*keys).having(total > 0)
+    if interval:
+        query = query.order_by(rows.c.bucket)
+    results = [dict(row) for row in db.session.execute(query).mappings()]
+    for row in results:
+        if "bucket" in row:
+            row["bucket"] = row["bucket"].isoformat()
+    return results
+
+
+def report_counts(start, end, group_by=REPORT_DIMENSIONS, interval=None, **filters):
+    # Reports created in [start, end), counted by their current status.
+    return _rollup_counts(ReportRollup, group_by, filters, start, end, interval)
+
+
+def safety_counts(start, end, interval=None, **filters):
+    # Safety check-ins logged in [start, end) per status.
+    return _rollup_counts(SafetyRollup, ("status",), filters, start, end, interval)
+
+
+def situation_report(start=None, end=None, group_by=REPORT_DIMENSIONS, interval=None, **filters):
+    end = end or datetime.utcnow()
+    start = start or end - timedelta(hours=1)
+    safety_filters = {"status": filters["safety_status"]} if filters.get("safety_status") else {}
+    report_filters = {k: v for k, v in filters.items() if k in REPORT_DIMENSIONS and v}
+    reports = report_counts(start, end, group_by, interval, **report_filters)
+    safety = safety_counts(start, end, interval, **safety_filters)
+    return {
+        "since": start.isoformat(), "until": end.isoformat(), "interval": interval,
+        "reports": {"total": sum(r["count"] for r in reports), "groups": reports},
+        "safety_checks": {"total": sum(s["count"] for s in safety), "groups": safety},
+    }
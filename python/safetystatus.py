@@ -0,0 +1,76 @@
+# Explanation: current_safety_status keeps each user's latest check-in so "who is Missing or
+# Needs Help right now" is an index range scan instead of a newest-per-user query over history.
+from sqlalchemy import event, func, text
+from sqlalchemy.orm import joinedload
+from python.models import db, CurrentSafetyStatus
+
+ATTENTION_STATUSES = ("Missing", "Needs Help")
+
+# Newest history row for one user; (created_at, id) matches SafetyCheck.history_order().
+_LATEST_FOR = ("INSERT OR IGNORE INTO current_safety_status (user_id, safety_check_id, status, note, checked_at) "
+               "SELECT user_id, id, status, note, coalesce(created_at, CURRENT_TIMESTAMP) FROM safety_check "
+               "WHERE user_id = {row}.user_id ORDER BY created_at DESC, id DESC LIMIT 1; ")
+
+# Triggers cover every write path (form, write-behind, journal replay). The insert upsert only
+# moves forward, so a late or replayed older check-in never overwrites a newer status.
+SAFETY_STATUS_SCHEMA = [
+    """CREATE TRIGGER IF NOT EXISTS current_safety_status_ai AFTER INSERT ON safety_check BEGIN
+        INSERT INTO current_safety_status (user_id, safety_check_id, status, note, checked_at)
+        VALUES (new.user_id, new.id, new.status, new.note, coalesce(new.created_at, CURRENT_TIMESTAMP))
+        ON CONFLICT (user_id) DO UPDATE SET safety_check_id = excluded.safety_check_id,
+            status = excluded.status, note = excluded.note, checked_at = excluded.checked_at
+        WHERE (excluded.checked_at, excluded.safety_check_id)
+              >= (current_safety_status.checked_at, current_safety_status.safety_check_id);
+    END""",
+    "CREATE TRIGGER IF NOT EXISTS current_safety_status_ad AFTER DELETE ON safety_check BEGIN "
+    "DELETE FROM current_safety_status WHERE user_id = old.user_id AND safety_check_id = old.id; "
+    + _LATEST_FOR.format(row="old") + "END",
+    "CREATE TRIGGER IF NOT EXISTS current_safety_status_au AFTER UPDATE OF user_id, status, note, created_at "
+    "ON safety_check BEGIN "
+    "DELETE FROM current_safety_status WHERE user_id IN (old.user_id, new.user_id); "
+    + _LATEST_FOR.format(row="old") + _LATEST_FOR.format(row="new") + "END",
+]
+
+_LATEST_ALL = """
+    SELECT user_id, id, status, note, coalesce(created_at, CURRENT_TIMESTAMP) AS checked_at FROM (
+        SELECT *, row_number() OVER (PARTITION BY user_id ORDER BY created_at DESC, id DESC) AS n
+        FROM safety_check) WHERE n = 1"""
+
+
+@event.listens_for(db.metadata, "after_create")
+def create_safety_status_triggers(target, connection, **kw):
+    if connection.dialect.name == "sqlite":
+        for statement in SAFETY_STATUS_SCHEMA:
+            connection.exec_driver_sql(statement)
+
+
+def reconcile_safety_status():
+    # Rebuild the table from history in one transaction; returns how many rows had drifted.
+    drift = db.session.execute(text(f"""
+        WITH latest AS ({_LATEST_ALL})
+        SELECT (SELECT count(*) FROM latest l LEFT JOIN current_safety_status c ON c.user_id = l.user_id
+                WHERE c.safety_check_id IS NOT l.id OR c.status IS NOT l.status)
+             + (SELECT count(*) FROM current_safety_status c
+                WHERE NOT EXISTS (SELECT 1 FROM latest l WHERE l.user_id = c.user_id))""")).scalar()
+    db.session.execute(text("DELETE FROM current_safety_status"))
+    db.session.execute(text(
+        f"INSERT INTO current_safety_status (user_id, safety_check_id, status, note, checked_at) {_LATEST_ALL}"))
+    db.session.commit()
+    total = db.session.query(func.count()).select_from(CurrentSafetyStatus).scalar()
+    return {"users": total, "drifted": drift}
+
+
+def roster_order():
+    return (CurrentSafetyStatus.status, CurrentSafetyStatus.checked_at.desc(), CurrentSafetyStatus.user_id.desc())
+
+
+def attention_roster(statuses=ATTENTION_STATUSES):
+    # Everyone whose latest check-in is not Safe, Missing first, most recent check-in first.
+    return (CurrentSafetyStatus.query.options(joinedload(CurrentSafetyStatus.user))
+            .filter(CurrentSafetyStatus.status.in_(statuses)))
+
+
+def status_counts():
+    rows = (db.session.query(CurrentSafetyStatus.status, func.count())
+            .group_by(CurrentSafetyStatus.status).all())
+    return dict(rows)
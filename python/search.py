@@ -0,0 +1,104 @@
+# Explanation: SQLite FTS5 full-text search over articles and community reports.
+import re
+from markupsafe import Markup, escape
+from sqlalchemy import DateTime, event, text
+from python.models import db
+
+# External-content FTS5 tables mirror the source rows; triggers keep them in sync for every
+# write path (ORM, bulk executemany, write-behind, raw SQL). Report status changes do not
+# touch the index because the update trigger only fires on location/description.
+SEARCH_SCHEMA = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS article_fts USING fts5(
+        title, content, content='article', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3')""",
+    """CREATE TRIGGER IF NOT EXISTS article_fts_ai AFTER INSERT ON article BEGIN
+        INSERT INTO article_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS article_fts_ad AFTER DELETE ON article BEGIN
+        INSERT INTO article_fts(article_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS article_fts_au AFTER UPDATE OF title, content ON article BEGIN
+        INSERT INTO article_fts(article_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+        INSERT INTO article_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END""",
+    """CREATE VIRTUAL TABLE IF NOT EXISTS community_report_fts USING fts5(
+        location, description, content='community_report', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3')""",
+    """CREATE TRIGGER IF NOT EXISTS community_report_fts_ai AFTER INSERT ON community_report BEGIN
+        INSERT INTO community_report_fts(rowid, location, description) VALUES (new.id, new.location, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS community_report_fts_ad AFTER DELETE ON community_report BEGIN
+        INSERT INTO community_report_fts(community_report_fts, rowid, location, description)
+        VALUES ('delete', old.id, old.location, old.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS community_report_fts_au AFTER UPDATE OF location, description ON community_report BEGIN
+        INSERT INTO community_report_fts(community_report_fts, rowid, location, description)
+        VALUES ('delete', old.id, old.location, old.description);
+        INSERT INTO community_report_fts(rowid, location, description) VALUES (new.id, new.location, new.description);
+    END""",
+]
+
+# Highlight markers that cannot occur in user text; swapped for <mark> after HTML-escaping.
+_OPEN, _CLOSE = "\x02", "\x03"
+_TOKEN = re.compile(r"\w+\*?", re.UNICODE)
+
+
+@event.listens_for(db.metadata, "after_create")
+def create_search_schema(target, connection, **kw):
+    # `flask init-db` / create_all() builds the index alongside the tables.
+    if connection.dialect.name == "sqlite":
+        for statement in SEARCH_SCHEMA:
+            connection.exec_driver_sql(statement)
+
+
+def rebuild_search_index():
+    for table in ("article_fts", "community_report_fts"):
+        db.session.execute(text(f"INSERT INTO {table}({table}) VALUES ('rebuild')"))
+    db.session.commit()
+
+
+def fts_query(user_query):
+    # Turn free text into a safe FTS5 query: every word must match, quoted so operators and
+    # punctuation are literal; a trailing "*" (or the last word while typing) is a prefix match.
+    tokens = _TOKEN.findall(user_query or "")
+    if not tokens:
+        return None
+    terms = []
+    for i, token in enumerate(tokens):
+        word = token.rstrip("*")
+        prefix = token.endswith("*") or (i == len(tokens) - 1 and not user_query.rstrip().endswith(" "))
+        terms.append(f'"{word}"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+
+def _highlight(snippet):
+    return Markup(str(escape(snippet)).replace(_OPEN, "<mark>").replace(_CLOSE, "</mark>"))
+
+
+def search_articles(user_query, limit=20):
+    match = fts_query(user_query)
+    if match is None:
+        return []
+    rows = db.session.execute(text(
+        "SELECT a.id, a.title, a.category, a.published_at, "
+        "snippet(article_fts, 1, :open, :close, '…', 16) AS snippet, "
+        "bm25(article_fts, 10.0, 1.0) AS rank "
+        "FROM article_fts JOIN article a ON a.id = article_fts.rowid "
+        "WHERE article_fts MATCH :match ORDER BY rank LIMIT :limit").columns(published_at=DateTime),
+        {"match": match, "limit": limit, "open": _OPEN, "close": _CLOSE}).mappings().all()
+    return [dict(row, snippet=_highlight(row["snippet"])) for row in rows]
+
+
+def search_reports(user_query, limit=20, status=None):
+    match = fts_query(user_query)
+    if match is None:
+        return []
+    rows = db.session.execute(text(
+        "SELECT r.id, r.disaster_type, r.location, r.status, r.created_at, r.user_id, "
+        "snippet(community_report_fts, -1, :open, :close, '…', 16) AS snippet, "
+        "bm25(community_report_fts, 2.0, 1.0) AS rank "
+        "FROM community_report_fts JOIN community_report r ON r.id = community_report_fts.rowid "
+        "WHERE community_report_fts MATCH :match AND (:status IS NULL OR r.status = :status) "
+        "ORDER BY rank LIMIT :limit").columns(created_at=DateTime),
+        {"match": match, "limit": limit, "status": status, "open": _OPEN, "close": _CLOSE}).mappings().all()
+    return [dict(row, snippet=_highlight(row["snippet"])) for row in rows]
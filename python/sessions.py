@@ -0,0 +1,327 @@
+# Explanation: Server-side sessions. The cookie carries only a random token; the session data,
+# its user and expiry live in a store (a separate SQLite file, /dev/shm for a shared-memory
+# store, or per-process memory), so logouts and admin revocations take effect on the next
+# request. The logged-in user's identity and role are cached per worker and checked against a
+# per-user version counter that comes back with the session row, so the auth decorators need
+# no User query.
+import hashlib
+import os
+import secrets
+import threading
+import time
+from types import SimpleNamespace
+from flask import g, session
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SecureCookieSession, SessionInterface
+from sqlalchemy import create_engine, text
+from python.cache import TTLCache
+from python.models import db, User
+from python.sqlite import apply_pragmas
+
+SESSION_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS session (key TEXT PRIMARY KEY, user_id INTEGER, data TEXT NOT NULL, "
+    "expires_at REAL NOT NULL) WITHOUT ROWID",
+    "CREATE INDEX IF NOT EXISTS ix_session_user ON session (user_id)",
+    "CREATE INDEX IF NOT EXISTS ix_session_expires ON session (expires_at)",
+    # Bumped when a user's sessions are revoked or their identity/role changes.
+    "CREATE TABLE IF NOT EXISTS session_user (user_id INTEGER PRIMARY KEY, version INTEGER NOT NULL)",
+]
+
+
+class SQLiteSessionStore:
+    # Sessions in their own SQLite file, so session writes never wait on the main database's
+    # write lock. Every worker on the host shares it.
+    def __init__(self, path, pragmas=None):
+        self.path = path
+        self.engine = create_engine(f"sqlite:///{path}")
+        apply_pragmas(self.engine, dict(pragmas or {}, journal_mode="WAL", synchronous="NORMAL"))
+        with self.engine.begin() as connection:
+            for statement in SESSION_SCHEMA:
+                connection.execute(text(statement))
+
+    def load(self, key, now):
+        # (data, user_id, version, expires_at) in one query, or None if missing or expired.
+        with self.engine.connect() as connection:
+            row = connection.execute(text(
+                "SELECT s.data, s.user_id, coalesce(v.version, 0), s.expires_at FROM session s "
+                "LEFT JOIN session_user v ON v.user_id = s.user_id WHERE s.key = :key AND s.expires_at > :now"),
+                {"key": key, "now": now}).first()
+        return tuple(row) if row else None
+
+    def save(self, key, data, user_id, expires_at):
+        with self.engine.begin() as connection:
+            connection.execute(text(
+                "INSERT INTO session (key, user_id, data, expires_at) VALUES (:key, :user_id, :data, :expires_at) "
+                "ON CONFLICT (key) DO UPDATE SET user_id = excluded.user_id, data = excluded.data, "
+                "expires_at = excluded.expires_at"),
+                {"key": key, "user_id": user_id, "data": data, "expires_at": expires_at})
+
+    def touch(self, key, expires_at):
+        with self.engine.begin() as connection:
+            connection.execute(text("UPDATE session SET expires_at = :expires_at WHERE key = :key"),
+                               {"key": key, "expires_at": expires_at})
+
+    def delete(self, key):
+        with self.engine.begin() as connection:
+            connection.execute(text("DELETE FROM session WHERE key = :key"), {"key": key})
+
+    def bump(self, user_id, revoke=False):
+        # Returns the number of sessions removed (revoke=True logs the user out everywhere).
+        with self.engine.begin() as connection:
+            removed = 0
+            if revoke:
+                removed = connection.execute(text("DELETE FROM session WHERE user_id = :user_id"),
+                                             {"user_id": user_id}).rowcount
+            connection.execute(text(
+                "INSERT INTO session_user (user_id, version) VALUES (:user_id, 1) "
+                "ON CONFLICT (user_id) DO UPDATE SET version = version + 1"), {"user_id": user_id})
+        return removed
+
+    def revoke_all(self):
+        with self.engine.begin() as connection:
+            removed = connection.execute(text("DELETE FROM session")).rowcount
+            connection.execute(text("UPDATE session_user SET version = version + 1"))
+        return removed
+
+    def purge(self, now):
+        with self.engine.begin() as connection:
+            return connection.execute(text("DELETE FROM session WHERE expires_at <= :now"), {"now": now}).rowcount
+
+    def stats(self):
+        with self.engine.connect() as connection:
+            total, users = connection.execute(text("SELECT count(*), count(user_id) FROM session")).one()
+        return {"backend": "sqlite", "path": self.path, "sessions": total, "user_sessions": users}
+
+
+class MemorySessionStore:
+    # Per-process store for a single worker (flask run, tests); other workers cannot see it.
+    def __init__(self):
+        self._sessions = {}  # key -> (data, user_id, expires_at)
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def load(self, key, now):
+        with self._lock:
+            item = self._sessions.get(key)
+            if item is None or item[2] <= now:
+                return None
+            return item[0], item[1], self._versions.get(item[1], 0), item[2]
+
+    def save(self, key, data, user_id, expires_at):
+        with self._lock:
+            self._sessions[key] = (data, user_id, expires_at)
+
+    def touch(self, key, expires_at):
+        with self._lock:
+            if key in self._sessions:
+                data, user_id, _ = self._sessions[key]
+                self._sessions[key] = (data, user_id, expires_at)
+
+    def delete(self, key):
+        with self._lock:
+            self._sessions.pop(key, None)
+
+    def bump(self, user_id, revoke=False):
+        with self._lock:
+            removed = 0
+            if revoke:
+                keys = [key for key, item in self._sessions.items() if item[1] == user_id]
+                for key in keys:
+                    del self._sessions[key]
+                removed = len(keys)
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+        return removed
+
+    def revoke_all(self):
+        with self._lock:
+            removed = len(self._sessions)
+            self._sessions.clear()
+            self._versions = {user_id: version + 1 for user_id, version in self._versions.items()}
+        return removed
+
+    def purge(self, now):
+        with self._lock:
+            expired = [key for key, item in self._sessions.items() if item[2] <= now]
+            for key in expired:
+                del self._sessions[key]
+        return len(expired)
+
+    def stats(self):
+        with self._lock:
+            users = sum(1 for item in self._sessions.values() if item[1] is not None)
+            return {"backend": "memory", "sessions": len(self._sessions), "user_sessions": users}
+
+
+class ServerSideSession(SecureCookieSession):
+    # Flask's session dict (modified/accessed tracking) plus where it came from in the store.
+    def __init__(self, initial=None, key=None, user_id=None, version=None, expires_at=None):
+        super().__init__(initial)
+        self.key = key  # sha256 of the cookie token; None for a new session
+        self.user_id = user_id  # owner when loaded, to detect login/logout
+        self.version = version  # the owner's session_user version when loaded
+        self.expires_at = expires_at
+
+
+class ServerSideSessionInterface(SessionInterface):
+    serializer = TaggedJSONSerializer()
+
+    def __init__(self, manager):
+        self.manager = manager
+
+    @staticmethod
+    def _key(token):
+        # Only a hash is stored, so a copy of the session table holds no usable tokens.
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def open_session(self, app, request):
+        token = request.cookies.get(self.get_cookie_name(app))
+        if token:
+            key = self._key(token)
+            record = self.manager.store.load(key, time.time())
+            if record is not None:
+                try:
+                    data = self.serializer.loads(record[0])
+                except ValueError:
+                    data = None
+                if data is not None:
+                    return ServerSideSession(data, key=key, user_id=record[1], version=record[2],
+                                             expires_at=record[3])
+        return ServerSideSession()
+
+    def save_session(self, app, session, response):
+        manager = self.manager
+        name, domain, path = self.get_cookie_name(app), self.get_cookie_domain(app), self.get_cookie_path(app)
+        if session.accessed:
+            response.vary.add("Cookie")
+        if not session:
+            if session.key is not None:
+                manager.store.delete(session.key)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+        now = time.time()
+        user_id = session.get("user_id")
+        # A new token whenever the session's user changes (login), against session fixation.
+        rotate = session.key is None or user_id != session.user_id
+        if not rotate and not session.modified and not manager.due_for_touch(session, now):
+            return
+        expires_at = now + manager.idle_seconds
+        if rotate:
+            if session.key is not None:
+                manager.store.delete(session.key)
+            token = secrets.token_urlsafe(32)
+            manager.store.save(self._key(token), self.serializer.dumps(dict(session)), user_id, expires_at)
+            response.set_cookie(name, token, expires=self.get_expiration_time(app, session),
+                                httponly=self.get_cookie_httponly(app), domain=domain, path=path,
+                                secure=self.get_cookie_secure(app), samesite=self.get_cookie_samesite(app))
+        elif session.modified:
+            manager.store.save(session.key, self.serializer.dumps(dict(session)), user_id, expires_at)
+        else:
+            manager.store.touch(session.key, expires_at)
+        manager.maybe_purge(now)
+
+
+class SessionManager:
+    def __init__(self):
+        self.backend = "cookie"
+        self.store = None
+        self.idle_seconds = 12 * 3600
+        self.touch_seconds = 300
+        self.purge_seconds = 600
+        self._last_purge = time.time()
+        self._purge_lock = threading.Lock()
+        # user id -> (session version when loaded, identity)
+        self.identities = TTLCache(maxsize=4096, ttl=300)
+
+    def init_app(self, app):
+        self.backend = app.config.get("SESSION_BACKEND", "sqlite")
+        self.idle_seconds = app.config.get("SESSION_IDLE_MINUTES", 720) * 60
+        self.touch_seconds = app.config.get("SESSION_TOUCH_SECONDS", 300)
+        self.purge_seconds = app.config.get("SESSION_PURGE_SECONDS", 600)
+        self.identities.maxsize = app.config.get("SESSION_IDENTITY_CACHE_SIZE", 4096)
+        self.identities.ttl = app.config.get("SESSION_IDENTITY_CACHE_TTL", 300)
+        if self.backend == "cookie":
+            # Flask's signed-cookie sessions: nothing to revoke server-side; identities expire by TTL.
+            return
+        path = app.config.get("SESSION_DATABASE")
+        if self.backend == "sqlite" and not path:
+            with app.app_context():
+                database = db.engine.url.database
+            if database and database != ":memory:":
+                path = os.path.join(os.path.dirname(os.path.abspath(database)), "sessions.db")
+        if self.backend == "sqlite" and path:
+            pragmas = {name: value for name, value in (app.config.get("SQLITE_PRAGMAS") or {}).items()
+                       if name in ("busy_timeout", "cache_size", "mmap_size", "temp_store")}
+            self.store = SQLiteSessionStore(path, pragmas)
+        elif self.backend in ("sqlite", "memory"):
+            self.backend = "memory"
+            self.store = MemorySessionStore()
+        else:
+            raise ValueError(f"Unknown SESSION_BACKEND {self.backend!r}")
+        app.session_interface = ServerSideSessionInterface(self)
+
+    def due_for_touch(self, session, now):
+        # Sliding expiry, written at most once per SESSION_TOUCH_SECONDS for an unchanged session.
+        last_write = session.expires_at - self.idle_seconds
+        return now - last_write >= self.touch_seconds
+
+    def maybe_purge(self, now):
+        if now - self._last_purge < self.purge_seconds or not self._purge_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_purge = now
+            self.store.purge(now)
+        finally:
+            self._purge_lock.release()
+
+    def current_user(self):
+        # The logged-in user's identity (id, email, full_name, role...), from the per-worker cache
+        # while its version matches the session's; None when anonymous or the user is gone.
+        if "user" in g:
+            return g.user
+        user_id = session.get("user_id")
+        identity = None
+        if user_id:
+            version = getattr(session, "version", None)
+            cached = self.identities.get(user_id)
+            if cached is not None and cached[0] == version:
+                identity = cached[1]
+            else:
+                user = db.session.get(User, user_id)
+                if user is not None:
+                    identity = SimpleNamespace(**{column.key: getattr(user, column.key)
+                                                  for column in User.__table__.columns
+                                                  if column.key != "password_hash"})
+                    self.identities.set(user_id, (version, identity))
+        g.user = identity
+        return identity
+
+    def user_changed(self, user_id):
+        # Role or profile changed: every worker reloads the identity on that user's next request.
+        self.identities.invalidate(user_id)
+        if self.store is not None:
+            self.store.bump(user_id)
+
+    def revoke(self, user_id):
+        # Log the user out everywhere, effective on their next request in any worker.
+        self.identities.invalidate(user_id)
+        return self.store.bump(user_id, revoke=True) if self.store is not None else 0
+
+    def revoke_all(self):
+        self.identities.clear()
+        return self.store.revoke_all() if self.store is not None else 0
+
+    def purge(self):
+        return self.store.purge(time.time()) if self.store is not None else 0
+
+    def stats(self):
+        stats = {"backend": self.backend, "identity_cache": self.identities.stats()}
+        if self.store is not None:
+            stats["store"] = self.store.stats()
+        return stats
+
+
+user_sessions = SessionManager()
+
+
+def current_user():
+    return user_sessions.current_user()
@@ -0,0 +1,145 @@
+# Explanation: In-memory grid index over resource coordinates for "nearest k" lookups.
+import heapq
+import math
+import threading
+import time
+from collections import defaultdict
+from sqlalchemy import Float, func, select, type_coerce
+from python.models import db, Resource
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class GridIndex:
+    # Points bucketed into cell_deg x cell_deg cells; a query walks square rings of cells outward
+    # from the query cell and stops once no unvisited cell can beat the current k-th distance.
+    def __init__(self, points, cell_deg=0.05):
+        self.cell_deg = cell_deg
+        self.lon_cells = int(round(360 / cell_deg))
+        self.lat_cells = int(round(180 / cell_deg))
+        self.cells = defaultdict(list)
+        floor, lon_cells = math.floor, self.lon_cells
+        for point in points:
+            self.cells[int(floor(point[1] / cell_deg)), int(floor(point[2] / cell_deg)) % lon_cells].append(point)
+        self.points = points
+        self.size = len(points)
+
+    def _cell(self, lat, lon):
+        return int(math.floor(lat / self.cell_deg)), int(math.floor(lon / self.cell_deg)) % self.lon_cells
+
+    def _ring(self, cy, cx, r):
+        if r == 0:
+            yield cy, cx
+            return
+        for dx in range(-r, r + 1):
+            yield cy - r, (cx + dx) % self.lon_cells
+            yield cy + r, (cx + dx) % self.lon_cells
+        for dy in range(-r + 1, r):
+            yield cy + dy, (cx - r) % self.lon_cells
+            yield cy + dy, (cx + r) % self.lon_cells
+
+    def _covered_km(self, lat, r):
+        # Every point closer than this lies in rings 0..r: the gap to the ring's outer edge,
+        # measured along longitude at the widest latitude the ring reaches.
+        edge_lat = min(90.0, abs(lat) + (r + 1) * self.cell_deg)
+        return r * self.cell_deg * KM_PER_DEGREE * math.cos(math.radians(edge_lat))
+
+    def nearest(self, lat, lon, k=5):
+        cy, cx = self._cell(lat, lon)
+        best = []  # max-heap of (-distance, id, point)
+        for r in range(max(self.lat_cells, self.lon_cells // 2) + 1):
+            if (2 * r + 1) ** 2 > 4 * len(self.cells):
+                # Far from everything: scanning the points beats walking mostly empty rings.
+                return self._scan(lat, lon, k)
+            for cell in self._ring(cy, cx, r):
+                for point in self.cells.get(cell, ()):
+                    d = haversine_km(lat, lon, point[1], point[2])
+                    if len(best) < k:
+                        heapq.heappush(best, (-d, point[0], point))
+                    elif d < -best[0][0]:
+                        heapq.heapreplace(best, (-d, point[0], point))
+            if len(best) == min(k, self.size) and (not best or -best[0][0] <= self._covered_km(lat, r)):
+                break
+        return sorted(((-nd, point) for nd, _, point in best), key=lambda item: item[0])
+
+    def _scan(self, lat, lon, k):
+        distances = ((haversine_km(lat, lon, p[1], p[2]), p[0], p) for p in self.points)
+        return [(d, point) for d, _, point in heapq.nsmallest(k, distances)]
+
+
+class NearbyResources:
+    # Per-worker grid indexes (one for all resources, one per category), rebuilt lazily after
+    # invalidate() or when the resource table's (count, max updated_at) changes in another worker.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._indexes = None
+        self._version = None
+        self._checked_at = 0.0
+        self.cell_deg = 0.05
+        self.check_interval = 5.0
+        self.rebuilds = 0
+
+    def init_app(self, app):
+        self.cell_deg = app.config.get("NEARBY_CELL_DEG", 0.05)
+        self.check_interval = app.config.get("NEARBY_INDEX_CHECK_SECONDS", 5.0)
+
+    def invalidate(self):
+        with self._lock:
+            self._indexes = None
+
+    def _table_version(self):
+        return tuple(db.session.query(func.count(Resource.id), func.max(Resource.updated_at)).one())
+
+    def _current(self):
+        now = time.monotonic()
+        if self._indexes is not None and now - self._checked_at < self.check_interval:
+            return self._indexes
+        version = self._table_version()
+        with self._lock:
+            self._checked_at = now
+            if self._indexes is None or version != self._version:
+                self._indexes = self._build()
+                self._version = version
+                self.rebuilds += 1
+            return self._indexes
+
+    def _build(self):
+        # Read coordinates as floats; Numeric's Decimal conversion dominates the build otherwise.
+        rows = db.session.execute(
+            select(Resource.id, type_coerce(Resource.latitude, Float).label("latitude"),
+                   type_coerce(Resource.longitude, Float).label("longitude"), Resource.name,
+                   Resource.category, Resource.address, Resource.contact)
+            .where(Resource.latitude.isnot(None), Resource.longitude.isnot(None))).all()
+        points = [(row.id, row.latitude, row.longitude, row) for row in rows]
+        by_category = defaultdict(list)
+        for point in points:
+            by_category[point[3].category].append(point)
+        indexes = {None: GridIndex(points, self.cell_deg)}
+        indexes.update({category: GridIndex(group, self.cell_deg) for category, group in by_category.items()})
+        return indexes
+
+    def nearest(self, lat, lon, k=5, category=None):
+        index = self._current().get(category)
+        if index is None:
+            return []
+        return [{
+            "id": row.id,
+            "name": row.name,
+            "category": row.category,
+            "address": row.address,
+            "contact": row.contact,
+            "latitude": row.latitude,
+            "longitude": row.longitude,
+            "distance_km": round(distance, 3),
+        } for distance, (_, _, _, row) in index.nearest(lat, lon, k)]
+
+
+nearby_resources = NearbyResources()
@@ -0,0 +1,52 @@
+# Explanation: SQLite tuning: per-connection PRAGMAs and an optional read-only engine for GET requests.
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event
+from sqlalchemy.sql import Select
+
+
+class RoutingSession(Session):
+    # Sends plain SELECTs issued while handling a GET/HEAD request to the read-only engine
+    # (when SQLITE_READ_SPLIT is on); flushes and every other statement use the primary.
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and isinstance(clause, Select)
+                and has_request_context() and g.get("read_only_db")):
+            read_engine = current_app.extensions.get("sqlite_read_engine")
+            if read_engine is not None:
+                return read_engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def apply_pragmas(engine, pragmas):
+    # Run on every new DBAPI connection, so pooled connections all share the same settings.
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+def init_app(app, db):
+    with app.app_context():
+        engine = db.engine
+    if engine.dialect.name != "sqlite":
+        return
+    pragmas = app.config.get("SQLITE_PRAGMAS") or {}
+    if pragmas:
+        apply_pragmas(engine, pragmas)
+
+    path = engine.url.database
+    if not app.config.get("SQLITE_READ_SPLIT") or not path or path == ":memory:":
+        return
+    # Read-only URI connections; journal_mode is a property of the file, set by the primary.
+    read_engine = create_engine(f"sqlite:///file:{path}?mode=ro&uri=true",
+                                **app.config.get("SQLITE_READ_ENGINE_OPTIONS", {}))
+    read_pragmas = {name: value for name, value in pragmas.items() if name != "journal_mode"}
+    apply_pragmas(read_engine, dict(read_pragmas, query_only=1))
+    app.extensions["sqlite_read_engine"] = read_engine
+
+    @app.before_request
+    def route_reads_to_replica():
+        if request.method in ("GET", "HEAD"):
+            g.read_only_db = True
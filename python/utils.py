@@ -1,22 +1,27 @@
 # Explanation: Auth helpers and decorators for route protection.
 from functools import wraps
 from flask import session, redirect, url_for, flash
+from python.sessions import current_user
 
 def login_required(f):
-    # Explanation: Ensures a user is logged in.
+    # Explanation: Ensures a user is logged in. The user's identity (cached per worker) is in g.user.
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        if not session.get("user_id"):
+        if current_user() is None:
+            # A deleted account's stale login is dropped too.
+            session.pop("user_id", None)
+            session.pop("role", None)
             flash("Please log in to access this page.")
             return redirect(url_for("login"))
         return f(*args, **kwargs)
     return decorated_function
 
 def admin_required(f):
-    # Explanation: Ensures current user is an admin.
+    # Explanation: Ensures current user is an admin, by the stored role rather than the session's copy.
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        if not session.get("user_id") or session.get("role") != "admin":
+        user = current_user()
+        if user is None or user.role != "admin":
             flash("Admin access required.")
             return redirect(url_for("adminlogin"))
         return f(*args, **kwargs)
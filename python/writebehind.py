@@ -0,0 +1,269 @@
+# Explanation: Write-behind queue that group-commits rows from a background thread, with an
+# optional append-only journal so queued rows survive a crash and are replayed on startup.
+import fcntl
+import glob
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import insert
+
+
+class QueueFull(Exception):
+    # Raised by submit() when the queue stays full past the enqueue timeout (backpressure).
+    pass
+
+
+class WriteBehindQueue:
+    def __init__(self, model, name):
+        self.model = model
+        self.name = name
+        self.app = None
+        self.enabled = False
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self._journal_lock = threading.Lock()
+        self._journal = None
+        self._stopping = threading.Event()
+        self._seq = 0
+        self._inflight = 0  # journaled but not yet enqueued (or cancelled)
+        self._metrics_lock = threading.Lock()
+        # Callables run with the list of committed row dicts (cache invalidation, fan-out, ...).
+        self.on_commit = []
+        self.metrics = {"enqueued": 0, "committed": 0, "rejected": 0, "replayed": 0, "batches": 0,
+                        "failed_batches": 0, "dead_lettered": 0, "last_commit_ms": 0.0, "max_commit_ms": 0.0, "total_commit_ms": 0.0}
+
+    def init_app(self, app):
+        self.app = app
+        self.enabled = app.config.get("WRITE_BEHIND_ENABLED", False)
+        self.maxsize = app.config.get("WRITE_BEHIND_MAX_QUEUE", 10000)
+        self.batch_size = app.config.get("WRITE_BEHIND_BATCH_SIZE", 500)
+        self.flush_interval = app.config.get("WRITE_BEHIND_FLUSH_MS", 50) / 1000.0
+        self.enqueue_timeout = app.config.get("WRITE_BEHIND_ENQUEUE_TIMEOUT", 0.5)
+        self.durability = app.config.get("WRITE_BEHIND_DURABILITY", "fsync")  # fsync, journal or none
+        self.journal_dir = app.config.get("WRITE_BEHIND_JOURNAL_DIR") or os.path.join(app.instance_path, "journal")
+
+    # -- producer side -------------------------------------------------------
+
+    def submit(self, row):
+        # Journal (if enabled) then enqueue; returns immediately once the row is durable per settings.
+        self._ensure_started()
+        record = {c.name: row.get(c.name) for c in self.model.__table__.columns if c.name in row}
+        with self._journal_lock:
+            self._seq += 1
+            self._inflight += 1
+            seq = self._seq
+            if self._journal is not None:
+                self._journal.write(json.dumps({"seq": seq, "row": record}, default=_encode) + "\n")
+                self._journal.flush()
+                if self.durability == "fsync":
+                    os.fsync(self._journal.fileno())
+        try:
+            self._queue.put((seq, record), timeout=self.enqueue_timeout)
+        except queue.Full:
+            self._count(rejected=1)
+            self._journal_note({"cancel": seq}, inflight_done=True)
+            raise QueueFull(f"{self.name} write-behind queue is full")
+        with self._journal_lock:
+            self._inflight -= 1
+        self._count(enqueued=1)
+
+    def _count(self, **deltas):
+        with self._metrics_lock:
+            for key, delta in deltas.items():
+                self.metrics[key] += delta
+
+    def stats(self):
+        committed_batches = self.metrics["batches"] or 1
+        return dict(self.metrics,
+                    enabled=self.enabled,
+                    depth=self._queue.qsize() if self._queue else 0,
+                    maxsize=self.maxsize if self.app else None,
+                    avg_commit_ms=round(self.metrics["total_commit_ms"] / committed_batches, 3),
+                    durability=self.durability if self.app else None)
+
+    # -- lifecycle -----------------------------------------------------------
+
+    def start(self):
+        # Replays orphaned journals and starts the writer; a no-op when disabled or already running.
+        if self.enabled:
+            self._ensure_started()
+
+    def _ensure_started(self):
+        # Started lazily so each (forked) worker process gets its own queue, thread and journal.
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=self.maxsize)
+            self._stopping.clear()
+            if self.durability != "none":
+                os.makedirs(self.journal_dir, exist_ok=True)
+                self._replay_orphaned_journals()
+                path = os.path.join(self.journal_dir, f"{self.name}-{os.getpid()}.journal")
+                self._journal = open(path, "a", encoding="utf-8")
+                fcntl.flock(self._journal, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            self._thread = threading.Thread(target=self._run, name=f"{self.name}-writer", daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def stop(self, timeout=10):
+        # Drain and commit whatever is queued, then stop the writer (registered with atexit).
+        if self._pid != os.getpid() or self._thread is None:
+            return
+        self._stopping.set()
+        self._thread.join(timeout)
+        self._pid = None
+
+    # -- consumer side -------------------------------------------------------
+
+    def _run(self):
+        while not (self._stopping.is_set() and self._queue.empty()):
+            batch = self._collect()
+            if batch:
+                self._commit(batch)
+
+    def _collect(self):
+        # Wait for a first row, then keep taking rows until the batch is full or the window closes.
+        try:
+            first = self._queue.get(timeout=self.flush_interval)
+        except queue.Empty:
+            return []
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _commit(self, batch):
+        rows = [row for _, row in batch]
+        start = time.perf_counter()
+        committed = self._insert(rows)
+        elapsed = (time.perf_counter() - start) * 1000
+        with self._metrics_lock:
+            self.metrics["batches"] += 1
+            self.metrics["committed"] += len(committed)
+            self.metrics["last_commit_ms"] = round(elapsed, 3)
+            self.metrics["max_commit_ms"] = max(self.metrics["max_commit_ms"], round(elapsed, 3))
+            self.metrics["total_commit_ms"] += elapsed
+        # The batch's own seqs, not a high-water mark: concurrent submitters can enqueue out of seq
+        # order, so a later seq may commit while an earlier one is still queued.
+        self._journal_note({"done": [seq for seq, _ in batch]})
+        if committed:
+            for callback in self.on_commit:
+                callback(committed)
+
+    def _insert(self, rows, attempts=3):
+        # One multi-row INSERT per batch. Transient failures (e.g. "database is locked") are
+        # retried; if the batch keeps failing, rows are inserted one by one so a single bad
+        # row is logged and moved to the dead-letter file instead of blocking every check-in behind it.
+        db = self.app.extensions["sqlalchemy"]
+        with self.app.app_context():
+            try:
+                for attempt in range(attempts):
+                    try:
+                        db.session.execute(insert(self.model.__table__), rows)
+                        db.session.commit()
+                        return rows
+                    except Exception:
+                        db.session.rollback()
+                        time.sleep(0.05 * (attempt + 1))
+                self._count(failed_batches=1)
+                committed, dropped = [], []
+                for row in rows:
+                    try:
+                        db.session.execute(insert(self.model.__table__), [row])
+                        db.session.commit()
+                        committed.append(row)
+                    except Exception:
+                        db.session.rollback()
+                        self.app.logger.exception("%s write-behind dropped row %r", self.name, row)
+                        dropped.append(row)
+                if dropped:
+                    self._dead_letter(dropped)
+                return committed
+            finally:
+                db.session.remove()
+
+    def _dead_letter(self, rows):
+        # Rows that cannot be inserted are appended to <journal dir>/<name>.deadletter (shared by
+        # every worker, one JSON line each) so they can be fixed and re-imported, not just logged.
+        os.makedirs(self.journal_dir, exist_ok=True)
+        with open(os.path.join(self.journal_dir, f"{self.name}.deadletter"), "a", encoding="utf-8") as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            for row in rows:
+                handle.write(json.dumps({"at": datetime.utcnow().isoformat(), "row": row}, default=_encode) + "\n")
+            handle.flush()
+            os.fsync(handle.fileno())
+        self._count(dead_lettered=len(rows))
+
+    # -- journal -------------------------------------------------------------
+
+    def _journal_note(self, entry, inflight_done=False):
+        with self._journal_lock:
+            if inflight_done:
+                self._inflight -= 1
+            if self._journal is None:
+                return
+            if "done" in entry and not self._inflight and self._queue.empty():
+                # Called by the writer between batches: nothing is queued or being submitted,
+                # so every journaled row is committed or cancelled and the journal can restart.
+                self._journal.seek(0)
+                self._journal.truncate()
+            else:
+                self._journal.write(json.dumps(entry) + "\n")
+            self._journal.flush()
+
+    def _replay_orphaned_journals(self):
+        # Replay journals whose owning process is gone (its flock was released with it).
+        for path in glob.glob(os.path.join(self.journal_dir, f"{self.name}-*.journal")):
+            with open(path, "r+", encoding="utf-8") as handle:
+                try:
+                    fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    continue
+                rows = self._pending_rows(handle)
+                for i in range(0, len(rows), self.batch_size):
+                    committed = self._insert(rows[i:i + self.batch_size])
+                    self._count(replayed=len(committed))
+                    for callback in self.on_commit:
+                        callback(committed)
+            os.remove(path)
+
+    def _pending_rows(self, handle):
+        # Journaled rows minus those committed (or dead-lettered) and those rejected at enqueue time.
+        pending, finished = [], set()
+        for line in handle:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                break  # torn final write
+            if "done" in entry:
+                finished.update(entry["done"])
+            elif "cancel" in entry:
+                finished.add(entry["cancel"])
+            else:
+                pending.append(entry)
+        return [self._decode(entry["row"]) for entry in pending if entry["seq"] not in finished]
+
+    def _decode(self, row):
+        columns = self.model.__table__.columns
+        return {key: datetime.fromisoformat(value) if value is not None and columns[key].type.python_type is datetime
+                else value for key, value in row.items()}
+
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot journal {type(value).__name__}")
@@ -0,0 +1,113 @@
+// Explanation: Service worker for the offline bundle built by `flask build-offline`.
+// Public pages are fetched network-first; when the network fails or is slow, the pre-rendered
+// snapshot from the bundle is served instead. Served from /sw.js so its scope is the whole site.
+const BUNDLE = "/static/offline/";
+const PAGES = { "/educationalhub": "educationalhub.html", "/resourcedirectory": "resourcedirectory.html" };
+const NETWORK_TIMEOUT_MS = 3000;
+const REFRESH_INTERVAL_MS = 5 * 60 * 1000;
+let lastRefresh = 0;
+
+async function fetchManifest() {
+  const response = await fetch(BUNDLE + "manifest.json", { cache: "no-cache" });
+  if (!response.ok) {
+    throw new Error("Offline bundle not built");
+  }
+  return response.json();
+}
+
+async function precache(manifest) {
+  const name = "offline-" + manifest.version;
+  if (!(await caches.has(name))) {
+    const cache = await caches.open(name);
+    const urls = Object.values(manifest.files).map((file) => BUNDLE + file).concat(manifest.assets || []);
+    await cache.addAll(urls);
+    await cache.put(BUNDLE + "manifest.json", new Response(JSON.stringify(manifest),
+      { headers: { "Content-Type": "application/json" } }));
+  }
+  for (const key of await caches.keys()) {
+    if (key.startsWith("offline-") && key !== name) {
+      await caches.delete(key);
+    }
+  }
+  lastRefresh = Date.now();
+}
+
+async function currentBundle() {
+  const key = (await caches.keys()).find((k) => k.startsWith("offline-"));
+  if (!key) {
+    return null;
+  }
+  const cache = await caches.open(key);
+  const manifest = await (await cache.match(BUNDLE + "manifest.json")).json();
+  return { cache, manifest };
+}
+
+async function fromBundle(logicalName) {
+  const bundle = await currentBundle();
+  return bundle ? bundle.cache.match(BUNDLE + bundle.manifest.files[logicalName]) : undefined;
+}
+
+function refreshInBackground() {
+  if (Date.now() - lastRefresh > REFRESH_INTERVAL_MS) {
+    lastRefresh = Date.now();
+    fetchManifest().then(precache).catch(() => {});
+  }
+}
+
+async function networkFirst(request, logicalName) {
+  const timeout = new Promise((resolve) => setTimeout(resolve, NETWORK_TIMEOUT_MS));
+  try {
+    const response = await Promise.race([fetch(request), timeout]);
+    if (response && response.ok) {
+      refreshInBackground();
+      return response;
+    }
+  } catch (err) {
+    // Network failure: fall through to the snapshot.
+  }
+  return (await fromBundle(logicalName)) || fetch(request);
+}
+
+// Precached assets (CSS, JS, images) keep their URLs across releases, so the cached copy is served
+// at once and refreshed from the network behind it; the next load picks up the new file.
+async function staleWhileRevalidate(event) {
+  const cached = await caches.match(event.request);
+  const update = fetch(event.request).then(async (response) => {
+    const bundle = cached && response.ok ? await currentBundle() : null;
+    if (bundle) {
+      await bundle.cache.put(event.request, response.clone());
+    }
+    return response;
+  });
+  if (!cached) {
+    return update;
+  }
+  event.waitUntil(update.catch(() => {}));
+  return cached;
+}
+
+self.addEventListener("install", (event) => {
+  event.waitUntil(fetchManifest().then(precache).then(() => self.skipWaiting()));
+});
+
+self.addEventListener("activate", (event) => {
+  event.waitUntil(self.clients.claim());
+});
+
+self.addEventListener("fetch", (event) => {
+  const url = new URL(event.request.url);
+  if (event.request.method !== "GET" || url.origin !== self.location.origin) {
+    return;
+  }
+  if (event.request.mode === "navigate" && PAGES[url.pathname] && !url.search) {
+    event.respondWith(networkFirst(event.request, PAGES[url.pathname]));
+  } else if (url.pathname === BUNDLE + "data.json") {
+    // Stable alias for the hashed JSON snapshot, for scripts that work offline.
+    event.respondWith(fromBundle("data.json").then((cached) => cached || fetch(event.request)));
+  } else if (url.pathname.startsWith(BUNDLE)) {
+    // Bundle files are content-hashed, so a cached copy is never stale.
+    event.respondWith(caches.match(event.request).then((cached) => cached || fetch(event.request)));
+  } else if (url.pathname.startsWith("/static/")) {
+    event.respondWith(staleWhileRevalidate(event));
+  }
+});